@@ -5,15 +5,13 @@
 # Import statements
 ###
 
-import time, os, sys, argparse, io, re, logging, traceback
-import discord, arrow, cryptocompare, holidays, yfinance as yf, datetime as datetime, matplotlib.pyplot as plt, matplotlib.dates as mdates, numpy as np, plotly.graph_objects as go, pandas as pd
+import os, sys, argparse, io, re, logging, traceback, asyncio
+import discord, arrow, datetime as datetime
+import alerts, cache, crypto_client, crypto_feed, data_access, fx_rates, job_queue, market_calendar, metrics, parsing, price_watch, render, scheduler
 from datetime import datetime
 from random import randint
-from discord.ext import commands, tasks
+from discord.ext import commands
 from itertools import cycle
-from googlesearch import search
-from plotly.subplots import make_subplots
-from currency_converter import CurrencyConverter
 
 # Parse args
 parser = argparse.ArgumentParser()
@@ -94,7 +92,18 @@ intents.members = True
 intents.typing = True
 intents.presences = True
 intents.message_content = True
-client = commands.Bot(command_prefix='/', case_insensitive=True, intents=intents)
+# Closes the pooled upstream sessions along with the Discord connection
+class StonkBot(commands.Bot):
+	async def close(self):
+		try:
+			await crypto_client.client.close()
+		finally:
+			await super().close()
+		# End try/finally block
+	# End def
+# End class
+
+client = StonkBot(command_prefix='/', case_insensitive=True, intents=intents)
 client.remove_command('help')
 
 # Set a list of activities for the bot to 'be playing' on discord
@@ -113,93 +122,49 @@ activity_list = cycle(
 	]
 )
 
+# The most ticker symbols /compare will plot on one graph
+max_compare_symbols = 10
+
 logging.basicConfig(stream=sys.stdout, format='%(levelname)s:%(message)s', level=logging.DEBUG if args.debug else logging.INFO)
 
 ###
 # Internal Definitions
 ###
 
-async def is_holiday() -> str:
-	holiday_array = [ f for f in holidays.UnitedStates(years=arrow.now().year).items()]
-	now = arrow.now()
-	for _date, name in holiday_array:
-		date = arrow.get(_date)
-		if date.month == now.month and date.day == now.day:
-			return name
-		# End if
-	# End for
-
-	return ""
+# Pushes rendered PNG bytes to Discord as an image attachment
+@metrics.timed("upload")
+async def send_graph(ctx, png: bytes) -> None:
+	image_buffer = io.BytesIO(png)
+	await ctx.send(file=discord.File(image_buffer, 'graph.png'))
+	image_buffer.close()
 # End def
 
-async def create_crypto_graph(ctx, crypto: str, period: str, units: int) -> None:
+@job_queue.heavy
+async def create_crypto_graph(ctx, crypto: str, period: str, units: int, max_points=render.default_max_points) -> None:
 	try:
-		# Get data
-		if period == "minute":
-			res = cryptocompare.get_historical_price_minute(crypto.upper(), 'USD', limit=units, toTs=arrow.utcnow().datetime)
-		elif period == "hour":
-			res = cryptocompare.get_historical_price_hour(crypto.upper(), 'USD', limit=units, toTs=arrow.utcnow().datetime)
-		elif period == "day":
-			res = cryptocompare.get_historical_price_day(crypto.upper(), 'USD', limit=units, toTs=arrow.utcnow().datetime)
-		else:
-			logging.info(f"\"{period}\" is not a vaild period to get historical crypto prices!")
-		# End if/elif/else block
-
-		# Parse data
-		res_time = [ arrow.get(f['time']).to('US/Eastern').datetime for f in res]
-		res_close = [ float("{:.2f}".format(float(f['close']))) for f in res]
-		res_volume = [ float(f['volumefrom']) + float(f['volumeto']) for f in res]
-
-		# Draw figure
-		fig = make_subplots(
-			rows = 2,
-			shared_xaxes = True,
-			vertical_spacing=0.03,
-			subplot_titles=(f'{crypto.upper()} Price Graph', 'Volume'),
-			row_width=[0.2, 0.7]
-		)
+		# Check for an identical graph rendered within the same refresh window
+		meta = {"title": f'{crypto.upper()} Price Graph', "max_points": max_points}
+		key = render.chart_key("price_volume", meta, render.crypto_marker(period, units))
+		png = render.png_cache.get(key)
+
+		if png is None:
+			# Get data
+			res = await data_access.get_crypto_history(crypto, period, units)
+
+			# Parse data
+			res = parsing.parse_crypto_rows(res)
+
+			# Draw figure
+			png = await render.render({
+				"kind": "price_volume",
+				"meta": meta,
+				"data": {"time": res["time"], "close": res["close"], "volume": res["volume"]}
+			}, key=key)
+			render.png_cache.put(key, png)
+		# End if
 
-		# Add traces
-		fig.append_trace(go.Scatter(x=res_time, y=res_close, showlegend=False), row=1, col=1)
-
-		fig.append_trace(go.Scatter(x=res_time, y=res_volume, showlegend=False), row=2, col=1)
-
-		# Configure Axes
-		fig.update_xaxes(rangeslider_visible=False)
-		fig.update_xaxes(
-			tickangle=-45, 
-			tickfont=dict(
-				family='Rockwell', 
-				color='black', 
-				size=14
-			),
-			showline=True,
-			linewidth=2,
-			linecolor='black',
-			tickformat = '%b %d %H:%M'
-		)
-		fig.update_yaxes(
-			showline=True,
-			linewidth=2,
-			linecolor='black',
-			tickprefix = '$',
-			tickformat = ',.3r',
-			row = 1,
-			col = 1
-		)
-		
-		# Save image to buffer
-		image_buffer = io.BytesIO()
-		fig.write_image(image_buffer, format="PNG")
-		image_buffer.seek(0)
-		
 		# Push contents of image buffer to Discord
-		await ctx.send(file=discord.File(image_buffer, 'graph.png'))
-
-		# Close figure and image buffer
-		fig.data = []
-		del(fig)
-		image_buffer.close()
+		await send_graph(ctx, png)
 	except Exception as e:
 		logging.error(f'Ran into an error trying to create a crypto candlestick graph!')
 		logging.exception(e)
@@ -207,451 +172,290 @@ async def create_crypto_graph(ctx, crypto: str, period: str, units: int) -> None
 		
 # End def
 
-async def create_crypto_candlestick_graph(ctx, crypto: str, period: str, units: int) -> None:
+@job_queue.heavy
+async def create_crypto_candlestick_graph(ctx, crypto: str, period: str, units: int, max_points=render.default_max_points) -> None:
 	try:
-		# Get data
-		if period == "minute":
-			res = cryptocompare.get_historical_price_minute(crypto.upper(), 'USD', limit=units, toTs=arrow.utcnow().datetime)
-		elif period == "hour":
-			res = cryptocompare.get_historical_price_hour(crypto.upper(), 'USD', limit=units, toTs=arrow.utcnow().datetime)
-		elif period == "day":
-			res = cryptocompare.get_historical_price_day(crypto.upper(), 'USD', limit=units, toTs=arrow.utcnow().datetime)
-		else:
-			logging.info(f"\"{period}\" is not a vaild period to get historical crypto prices!")
-		# End if/elif/else block
-
-		# Parse data
-		res_time = [ arrow.get(f['time']).to("US/Eastern").datetime for f in res]
-		res_open = [ float("{:.2f}".format(float(f['open']))) for f in res]
-		res_high = [ float("{:.2f}".format(float(f['high']))) for f in res]
-		res_low = [ float("{:.2f}".format(float(f['low']))) for f in res]
-		res_close = [ float("{:.2f}".format(float(f['close']))) for f in res]
-		res_volume = [ float(f['volumefrom']) + float(f['volumeto']) for f in res]
-
-		# Draw figure
-		fig = make_subplots(
-			rows = 2,
-			shared_xaxes = True,
-			vertical_spacing=0.03,
-			subplot_titles=(f'{crypto.upper()} Price Graph', 'Volume'),
-			row_width=[0.2, 0.7]
-		)
-
-		# Add traces
-		# Background line
-		fig.append_trace(go.Scattergl(x=res_time, y=res_close, mode="lines", line_color="black", line = { "width":1}, showlegend=False), row=1, col=1)
-
-		# Candlestick
-		fig.append_trace(go.Candlestick(x=res_time, open=res_open, high=res_high, low=res_low, close=res_close, showlegend=False), row=1, col=1)
-
-		# Volume
-		fig.append_trace(go.Scattergl(x=res_time, y=res_volume, showlegend=False), row=2, col=1)
-
-		# Update Axes
-		fig.update_xaxes(rangeslider_visible=False)
-		fig.update_layout(
-			title = f'{crypto.upper()} Price Graph',
-			xaxis_tickformat = '%b %d %H:%M'
-		)
-		fig.update_xaxes(
-			tickangle=-45, 
-			tickfont=dict(
-				family='Rockwell', 
-				color='black', 
-				size=14
-			),
-			showline=True,
-			linewidth=2,
-			linecolor='black'
-		)
-		fig.update_yaxes(
-			showline=True,
-			linewidth=2,
-			linecolor='black',
-			tickprefix = '$',
-			tickformat = ',.3r',
-			row = 1,
-			col = 1
-		)
+		# Check for an identical graph rendered within the same refresh window
+		meta = {"title": f'{crypto.upper()} Price Graph', "layout_title": f'{crypto.upper()} Price Graph', "max_points": max_points}
+		key = render.chart_key("candlestick", meta, render.crypto_marker(period, units))
+		png = render.png_cache.get(key)
+
+		if png is None:
+			# Get data
+			res = await data_access.get_crypto_history(crypto, period, units)
+
+			# Parse data
+			res = parsing.parse_crypto_rows(res)
+
+			# Draw figure
+			png = await render.render({
+				"kind": "candlestick",
+				"meta": meta,
+				"data": res
+			}, key=key)
+			render.png_cache.put(key, png)
+		# End if
 
-		# Save image to buffer
-		image_buffer = io.BytesIO()
-		fig.write_image(image_buffer, format="PNG")
-		image_buffer.seek(0)
-		
 		# Push contents of image buffer to Discord
-		await ctx.send(file=discord.File(image_buffer, 'graph.png'))
-
-		# Close figure and image buffer
-		fig.data = []
-		del(fig)
-		image_buffer.close()
+		await send_graph(ctx, png)
 	except Exception as e:
 		logging.error(f'Ran into an error trying to create a crypto candlestick graph!')
 		logging.exception(e)
 	# End try/except block	
 # End def
 
-async def create_dual_crypto_graph(ctx, fcrypto: str, scrypto: str, period: str, units: int) -> None:
+@job_queue.heavy
+async def create_dual_crypto_graph(ctx, fcrypto: str, scrypto: str, period: str, units: int, max_points=render.default_max_points) -> None:
 	try:
-		# Get data
-		if period == "minute":
-			first_res = cryptocompare.get_historical_price_minute(fcrypto.upper(), 'USD', limit=units, toTs=arrow.utcnow().datetime)
-			second_res = cryptocompare.get_historical_price_minute(scrypto.upper(), 'USD', limit=units, toTs=arrow.utcnow().datetime)
-		elif period == "hour":
-			first_res = cryptocompare.get_historical_price_hour(fcrypto.upper(), 'USD', limit=units, toTs=arrow.utcnow().datetime)
-			second_res = cryptocompare.get_historical_price_hour(scrypto.upper(), 'USD', limit=units, toTs=arrow.utcnow().datetime)
-		elif period == "day":
-			first_res = cryptocompare.get_historical_price_day(fcrypto.upper(), 'USD', limit=units, toTs=arrow.utcnow().datetime)
-			second_res = cryptocompare.get_historical_price_day(scrypto.upper(), 'USD', limit=units, toTs=arrow.utcnow().datetime)
-		else:
-			logging.info(f"\"{period}\" is not a vaild period to get historical crypto prices!")
-		# End if/elif/else block
-
-		# Parse data
-		first_res_time = [ arrow.get(f['time']).to("US/Eastern").datetime for f in first_res]
-		first_res_close = [ float("{:.2f}".format(float(f['close']))) for f in first_res]
-		first_res_volume = [ float(f['volumefrom']) + float(f['volumeto']) for f in first_res]
-		second_res_time = [ arrow.get(f['time']).to("US/Eastern").datetime for f in second_res]
-		second_res_close = [ float("{:.2f}".format(float(f['close']))) for f in second_res]
-		second_res_volume = [ float(f['volumefrom']) + float(f['volumeto']) for f in second_res]
-
-		# Draw figure
-		fig = make_subplots(
-			rows = 2,
-			shared_xaxes = True,
-			vertical_spacing=0.03,
-			subplot_titles=(f'<b>Price comparison of {fcrypto.upper()} and {scrypto.upper()}</b>', 'Volume'),
-			row_width=[0.2, 0.7],
-			specs=[[{"secondary_y": True}], [{"secondary_y": True}]]
-		)
-
-		# Add traces
-		fig.add_trace(
-			go.Scatter(x=first_res_time, y=first_res_close, name=f"Price of {fcrypto.upper()}", line=dict(color='firebrick')), row=1, col=1,
-			secondary_y=False
-		)
-
-		fig.add_trace(
-			go.Scatter(x=second_res_time, y=second_res_close, name=f"Price of {scrypto.upper()}", line=dict(color='royalblue')), row=1, col=1,
-			secondary_y=True
-		)
-
-		fig.add_trace(
-			go.Scatter(x=first_res_time, y=first_res_volume, showlegend=False, name=f"{fcrypto.upper()} volume", line=dict(color='firebrick')), row=2, col=1, secondary_y=False
-		)
-
-		fig.add_trace(
-			go.Scatter(x=second_res_time, y=second_res_volume, showlegend=False, name=f"{scrypto.upper()} volume", line=dict(color='royalblue')), row=2, col=1, secondary_y=True
-		)
+		# Check for an identical graph rendered within the same refresh window
+		# Both legs end at the same moment so their candles line up exactly
+		to_ts = arrow.utcnow()
+		meta = {"first": fcrypto.upper(), "second": scrypto.upper(), "max_points": max_points}
+		key = render.chart_key("dual_price_volume", meta, render.crypto_marker(period, units, now=to_ts.timestamp()))
+		png = render.png_cache.get(key)
+
+		if png is None:
+			# Get data for both legs at the same time
+			first_res, second_res = await asyncio.gather(
+				data_access.get_crypto_history(fcrypto, period, units, to_ts=to_ts.datetime),
+				data_access.get_crypto_history(scrypto, period, units, to_ts=to_ts.datetime)
+			)
 
-		# Configure Axes
-		fig.update_yaxes(title_text=f"<b>{fcrypto.upper()} price</b>", secondary_y=False, row=1, col=1)
-		fig.update_yaxes(title_text=f"<b>{scrypto.upper()} price</b>", secondary_y=True, row=1, col=1)
-		fig.update_yaxes(tickprefix = '$', tickformat = ',.3r', secondary_y=False, row=1, col=1)
-		fig.update_yaxes(tickprefix = '$', tickformat = ',.3r', secondary_y=True, row=1, col=1)
-		fig.update_xaxes(rangeslider_visible=False)
-		
-		fig.update_xaxes(
-			tickangle=-45, 
-			tickfont=dict(
-				family='Rockwell', 
-				color='black', 
-				size=14
-			),
-			showline=True,
-			linewidth=2,
-			linecolor='black',
-			tickformat = '%b %d %H:%M',
-		)
-		fig.update_yaxes(
-			showline=True,
-			linewidth=2,
-			linecolor='black',
-			row=1,
-			col=1
-		)
+			# Parse data
+			first_res = parsing.parse_crypto_rows(first_res)
+			second_res = parsing.parse_crypto_rows(second_res)
+
+			# Draw figure
+			png = await render.render({
+				"kind": "dual_price_volume",
+				"meta": meta,
+				"data": {
+					"first_time": first_res["time"], "first_close": first_res["close"], "first_volume": first_res["volume"],
+					"second_time": second_res["time"], "second_close": second_res["close"], "second_volume": second_res["volume"]
+				}
+			}, key=key)
+			render.png_cache.put(key, png)
+		# End if
 
-		# Move legend to top right of chart
-		fig.update_layout(legend=dict(
-			orientation="h",
-			yanchor="bottom",
-			y=1.04,
-			xanchor="right",
-			x=1
-		))
-
-		# Save image to buffer
-		image_buffer = io.BytesIO()
-		fig.write_image(image_buffer, format="PNG")
-		image_buffer.seek(0)
-		
 		# Push contents of image buffer to Discord
-		await ctx.send(file=discord.File(image_buffer, 'graph.png'))
-
-		# Close figure and image buffer
-		fig.data = []
-		del(fig)
-		image_buffer.close()
+		await send_graph(ctx, png)
 	except Exception as e:
 		logging.error(f'Ran into an error trying to create a crypto candlestick graph!')
 		logging.exception(e)
 	# End try/except block	
 # End def
 
-async def create_graph(ctx, company: str, interval: str, start=None, end=None, period=None, prepost=False) -> None:
+@job_queue.heavy
+async def create_graph(ctx, company: str, interval: str, start=None, end=None, period=None, prepost=False, max_points=render.default_max_points) -> None:
 	try:
 		# Get stock data
-		ticker = yf.Ticker(company)
-		
-		if period:
-			res = ticker.history(period=period, interval=interval, prepost=prepost)
-		elif start and end:
-			res = ticker.history(start=start, end=end, interval=interval, prepost=prepost)
-		else:
+		res = await data_access.get_history(company, interval, start=start, end=end, period=period, prepost=prepost)
+
+		if res is None:
 			return()
-		# End if/elif/else block
+		# End if
 
 		# Check for empty response
-		if not pd.to_datetime(res.index).to_pydatetime().tolist():
+		if res.empty:
 			await ctx.send("No data returned; the market is probably closed right now!")
 			try: logging.error(f"No data returned? Call result was: {res}")
 			except Exception as e: pass
 			return()
 		# End if
 
-		# Plot graph
-		res['Close'] = [float("{:.2f}".format(float(f))) for f in res['Close']] 
-		res['Close'].plot(title="Stock Price For " + company.upper())
-		plt.xlabel ('Date & Military Time')
-		plt.ylabel ('Price')
+		# Check for an identical graph rendered from the same data
+		meta = {"title": "Stock Price For " + company.upper(), "max_points": max_points}
+		key = render.chart_key("line", meta, render.history_marker(res))
+		png = render.png_cache.get(key)
+
+		if png is None:
+			# Parse data
+			res = parsing.normalize_history(res)
+
+			# Plot graph
+			png = await render.render({
+				"kind": "line",
+				"meta": meta,
+				"data": {"time": res["time"], "close": res["close"]}
+			}, key=key)
+			render.png_cache.put(key, png)
+		# End if
 
-		# Save image to buffer
-		image_buffer = io.BytesIO()
-		plt.savefig(image_buffer, format="PNG")
-		image_buffer.seek(0)
-		
 		# Push contents of image buffer to Discord
-		await ctx.send(file=discord.File(image_buffer, 'graph.png'))
-
-		# Close plot and image buffer
-		plt.close()
-		image_buffer.close()
+		await send_graph(ctx, png)
 	except Exception as e:
 		logging.error(f'Ran into an error trying to create a graph!')
 		logging.exception(e)
 	# End try/except block
 # End def
 
-async def create_candlestick_graph(ctx, company: str, interval: str, start=None, end=None, period=None, prepost=False) -> None:
+@job_queue.heavy
+async def create_candlestick_graph(ctx, company: str, interval: str, start=None, end=None, period=None, prepost=False, max_points=render.default_max_points) -> None:
 	try:
 		# Get stock data
-		ticker = yf.Ticker(company)
-		
-		if period:
-			res = ticker.history(period=period, interval=interval, prepost=prepost)
-		elif start and end:
-			res = ticker.history(start=start, end=end, interval=interval, prepost=prepost)
-		else:
+		res = await data_access.get_history(company, interval, start=start, end=end, period=period, prepost=prepost)
+
+		if res is None:
 			return()
-		# End if/elif/else block
+		# End if
 
 		# Check for empty response
-		if not pd.to_datetime(res.index).to_pydatetime().tolist():
+		if res.empty:
 			await ctx.send("No data returned; the market is probably closed right now!")
 			try: logging.error(f"No data returned? Call result was: {res}")
 			except Exception as e: pass
 			return()
 		# End if
 
-		# Parse data
-		res_time = [ arrow.get(f).to("US/Eastern").datetime for f in pd.to_datetime(res.index).to_pydatetime().tolist()]
-		res_open = [ float("{:.2f}".format(float(f))) for f in res.Open.tolist()]
-		res_high = [ float("{:.2f}".format(float(f))) for f in res.High.tolist()]
-		res_low = [ float("{:.2f}".format(float(f))) for f in res.Low.tolist()]
-		res_close = [ float("{:.2f}".format(float(f))) for f in res.Close.tolist()]
-		res_volume = [ float("{:.2f}".format(float(f))) for f in res.Volume.tolist()]
-
-		# Draw figure
-		fig = make_subplots(
-			rows = 2,
-			shared_xaxes = True,
-			vertical_spacing=0.03,
-			subplot_titles=(f'{company.upper()} Price Graph', 'Volume'),
-			row_width=[0.2, 0.7]
-		)
-
-		# Add traces
-		# Background line
-		fig.append_trace(go.Scattergl(x=res_time, y=res_close, mode="lines", line_color="black", line = { "width":1}, showlegend=False), row=1, col=1)
-
-		# Candlestick
-		fig.append_trace(go.Candlestick(x=res_time, open=res_open, high=res_high, low=res_low, close=res_close, showlegend=False), row=1, col=1)
-
-		# Volume
-		fig.append_trace(go.Scattergl(x=res_time, y=res_volume, showlegend=False), row=2, col=1)
-
-		# Configure Axes
-		fig.update_xaxes(rangeslider_visible=False)
-		fig.update_xaxes(
-			tickangle=-45, 
-			tickfont=dict(
-				family='Rockwell', 
-				color='black', 
-				size=14
-			),
-			showline=True,
-			linewidth=2,
-			linecolor='black',
-			tickformat = '%b %d %H:%M'
-		)
-		fig.update_yaxes(
-			showline=True,
-			linewidth=2,
-			linecolor='black',
-			tickprefix = '$',
-			tickformat = ',.3r',
-			row = 1,
-			col = 1
-		)
+		# Check for an identical graph rendered from the same data
+		meta = {"title": f'{company.upper()} Price Graph', "max_points": max_points}
+		key = render.chart_key("candlestick", meta, render.history_marker(res))
+		png = render.png_cache.get(key)
+
+		if png is None:
+			# Parse data
+			res = parsing.normalize_history(res)
+
+			# Draw figure
+			png = await render.render({
+				"kind": "candlestick",
+				"meta": meta,
+				"data": res
+			}, key=key)
+			render.png_cache.put(key, png)
+		# End if
 
-		# Save image to buffer
-		image_buffer = io.BytesIO()
-		fig.write_image(image_buffer, format="PNG")
-		image_buffer.seek(0)
-		
 		# Push contents of image buffer to Discord
-		await ctx.send(file=discord.File(image_buffer, 'graph.png'))
-
-		# Close figure and image buffer
-		fig.data = []
-		del(fig)
-		image_buffer.close()
+		await send_graph(ctx, png)
 	except Exception as e:
 		logging.error(f'Ran into an error trying to create a stock candlestick graph!')
 		logging.exception(e)
 	# End try/except block	
 # End def
 
-async def create_dual_stock_graph(ctx, fcompany: str, scompany: str, interval: str, start=None, end=None, period=None, prepost=False) -> None:
+@job_queue.heavy
+async def create_dual_stock_graph(ctx, fcompany: str, scompany: str, interval: str, start=None, end=None, period=None, prepost=False, max_points=render.default_max_points) -> None:
 	try:
 		# Get stock data
-		first_ticker = yf.Ticker(fcompany)
-		second_ticker = yf.Ticker(scompany)
-		
-		if period:
-			first_res = first_ticker.history(period=period, interval=interval, prepost=prepost)
-			second_res = second_ticker.history(period=period, interval=interval, prepost=prepost)
-		elif start and end:
-			first_res = first_ticker.history(start=start, end=end, interval=interval, prepost=prepost)
-			second_res = second_ticker.history(start=start, end=end, interval=interval, prepost=prepost)
-		else:
+		res = await data_access.get_histories([fcompany, scompany], interval, start=start, end=end, period=period, prepost=prepost)
+
+		if res is None:
 			return()
-		# End if/elif/else block
+		# End if
+
+		first_res, second_res = res[fcompany.upper()], res[scompany.upper()]
 
 		# Check for empty response
-		if not pd.to_datetime(first_res.index).to_pydatetime().tolist() or not pd.to_datetime(second_res.index).to_pydatetime().tolist():
+		if first_res.empty or second_res.empty:
 			await ctx.send("No data returned; the market is probably closed right now!")
 			try: logging.error(f"No data returned? Call result was: {first_res} \n\n\n and {second_res}")
 			except Exception as e: pass
 			return()
 		# End if
 
-		# Parse data
-		first_res_time = [ arrow.get(f).to("US/Eastern").datetime for f in pd.to_datetime(first_res.index).to_pydatetime().tolist()]
-		first_res_close = [ float("{:.2f}".format(float(f))) for f in first_res.Close.tolist()]
-		second_res_time = [ arrow.get(f).to("US/Eastern").datetime for f in pd.to_datetime(second_res.index).to_pydatetime().tolist()]
-		second_res_close = [ float("{:.2f}".format(float(f))) for f in second_res.Close.tolist()]
+		# Check for an identical graph rendered from the same data
+		meta = {"first": fcompany.upper(), "second": scompany.upper(), "max_points": max_points}
+		key = render.chart_key("dual_line", meta, render.history_marker(first_res), render.history_marker(second_res))
+		png = render.png_cache.get(key)
+
+		if png is None:
+			# Parse data
+			first_res = parsing.normalize_history(first_res)
+			second_res = parsing.normalize_history(second_res)
+
+			# Draw figure
+			png = await render.render({
+				"kind": "dual_line",
+				"meta": meta,
+				"data": {
+					"first_time": first_res["time"], "first_close": first_res["close"],
+					"second_time": second_res["time"], "second_close": second_res["close"]
+				}
+			}, key=key)
+			render.png_cache.put(key, png)
+		# End if
+
+		# Push contents of image buffer to Discord
+		await send_graph(ctx, png)
+	except Exception as e:
+		logging.error(f'Ran into an error trying to create a dual stock graph!')
+		logging.exception(e)
+	# End try/except block	
+# End def
 
-		# Draw figure
-		fig = make_subplots(specs=[[{"secondary_y": True}]])
+@job_queue.heavy
+async def create_compare_graph(ctx, companies: list, interval: str, start=None, end=None, period=None, prepost=False, max_points=render.default_max_points) -> None:
+	try:
+		# Get stock data
+		res = await data_access.get_histories(companies, interval, start=start, end=end, period=period, prepost=prepost)
 
-		# Add traces
-		fig.add_trace(
-			go.Scatter(x=first_res_time, y=first_res_close, name=f"Price of {fcompany.upper()}"),
-			secondary_y=False,
-		)
+		if res is None:
+			return()
+		# End if
 
-		fig.add_trace(
-			go.Scatter(x=second_res_time, y=second_res_close, name=f"Price of {scompany.upper()}"),
-			secondary_y=True,
-		)
+		# Check for empty responses
+		empty = [company for company, company_res in res.items() if company_res.empty]
 
-		# Configure Axes
-		fig.update_yaxes(title_text=f"<b>{fcompany.upper()} price</b>", secondary_y=False)
-		fig.update_yaxes(title_text=f"<b>{scompany.upper()} price</b>", secondary_y=True)
-		fig.update_yaxes(tickprefix = '$', tickformat = ',.3r', secondary_y=False)
-		fig.update_yaxes(tickprefix = '$', tickformat = ',.3r', secondary_y=True)
-		fig.update_xaxes(rangeslider_visible=False)
-		fig.update_layout(title = f'<b>Price comparison of {fcompany.upper()} and {scompany.upper()}</b>')
-		
-		fig.update_xaxes(
-			tickangle=-45, 
-			tickfont=dict(
-				family='Rockwell', 
-				color='black', 
-				size=14
-			),
-			showline=True,
-			linewidth=2,
-			linecolor='black',
-			tickformat = '%b %d %H:%M'
-		)
-		fig.update_yaxes(
-			showline=True,
-			linewidth=2,
-			linecolor='black'
-		)
+		if empty:
+			await ctx.send(f"No data returned for {', '.join(empty)}!")
+			return()
+		# End if
 
-		# Move legend to top right of chart
-		fig.update_layout(legend=dict(
-			orientation="h",
-			yanchor="bottom",
-			y=1.02,
-			xanchor="right",
-			x=1
-		))
-
-		# Save image to buffer
-		image_buffer = io.BytesIO()
-		fig.write_image(image_buffer, format="PNG")
-		image_buffer.seek(0)
-		
-		# Push contents of image buffer to Discord
-		await ctx.send(file=discord.File(image_buffer, 'graph.png'))
+		# Check for an identical graph rendered from the same data
+		meta = {"names": list(res), "max_points": max_points}
+		key = render.chart_key("compare", meta, *[render.history_marker(company_res) for company_res in res.values()])
+		png = render.png_cache.get(key)
+
+		if png is None:
+			# Parse data into % change since the start of the range
+			data = {}
+
+			for i, company_res in enumerate(res.values()):
+				company_res = parsing.normalize_history(company_res)
+				data[f"{i}_time"] = company_res["time"]
+				data[f"{i}_close"] = (company_res["close"] / company_res["close"][0] - 1) * 100
+			# End for
+
+			# Draw figure
+			png = await render.render({
+				"kind": "compare",
+				"meta": meta,
+				"data": data
+			}, key=key)
+			render.png_cache.put(key, png)
+		# End if
 
-		# Close figure and image buffer
-		fig.data = []
-		del(fig)
-		image_buffer.close()
+		# Push contents of image buffer to Discord
+		await send_graph(ctx, png)
 	except Exception as e:
-		logging.error(f'Ran into an error trying to create a dual stock graph!')
+		logging.error(f'Ran into an error trying to create a comparison graph!')
 		logging.exception(e)
 	# End try/except block	
 # End def
 
 async def get_kimchi(ctx) -> None:
-	korean_price_krw = cryptocompare.get_price('ETH', currency='KRW')['ETH']['KRW']
-	american_price = cryptocompare.get_price('ETH', currency='USD')['ETH']['USD']
+	try:
+		prices = (await crypto_feed.feed.get_prices(['ETH'], ['KRW', 'USD']))['ETH']
+		korean_price_krw, american_price = prices['KRW'], prices['USD']
 
-	c = CurrencyConverter()
-	korean_price_usd = c.convert(korean_price_krw, 'KRW', 'USD')
-	kimchi_price = korean_price_usd - american_price
+		await fx_rates.rates.ensure_loaded()
+		korean_price_usd = fx_rates.rates.convert(korean_price_krw, 'KRW', 'USD')
+		kimchi_price = korean_price_usd - american_price
 
-	try:
 		await ctx.send(f'The current kimchi premium is ${kimchi_price:.2f}\n\tThe current USD price is ${american_price:.2f}\n\tThe current KRW price (converted into USD) is ${korean_price_usd:.2f}')
 	except Exception as e:
-		logging.error('Ran into an error trying to send a message!')
+		logging.error('Ran into an error trying to get the kimchi premium!')
 		logging.exception(e)
+		await ctx.send("Couldn't get the kimchi premium!")
 	# End try/except block
 # End def
 
 async def stock_current_price(ctx, company: str) -> None:
 	try:
 		# Get stock data
-		ticker = yf.Ticker(company)
+		ticker_info = await data_access.get_quote(company)
 		
-		await ctx.send(f'Current Price Info for ${company.upper()}:\n\tAsk: ${ticker.info["ask"]}\n\tBid: ${ticker.info["bid"]}\n\tVolume: ${ticker.info["volume"]}')
+		await ctx.send(f'Current Price Info for ${company.upper()}:\n\tAsk: ${ticker_info["ask"]}\n\tBid: ${ticker_info["bid"]}\n\tVolume: ${ticker_info["volume"]}')
 
 	except Exception as e:
 		logging.error(f'Ran into an error trying to display current stock price info!')
@@ -660,8 +464,11 @@ async def stock_current_price(ctx, company: str) -> None:
 # End def
 
 async def crypto_current_price(ctx, crypto: str) -> None:
+	# Set up front so the error message below can show it even when the lookup itself fails
+	base = None
+
 	try:
-		base = cryptocompare.get_price(crypto.upper(), currency='USD')
+		base = await crypto_feed.feed.get_prices([crypto], ['USD'])
 		price = base[crypto.upper()]['USD']
 		
 		await ctx.send(f'Current Price for {crypto.upper()} is: ${price}')
@@ -672,21 +479,145 @@ async def crypto_current_price(ctx, crypto: str) -> None:
 	# End try/except block
 # End def
 
+# Sends the top results for a news search in one message. Cached searches answer straight away,
+# without queueing or spending rate limit tokens; only searches that go out to Google are heavy jobs.
+async def send_news(ctx, query: str, topic: str) -> None:
+	if data_access.cached_news(query) is None:
+		await search_news(ctx, query, topic)
+	else:
+		await show_news(ctx, await data_access.search_news(query), topic)
+	# End if/else block
+# End def
+
+@job_queue.heavy
+async def search_news(ctx, query: str, topic: str) -> None:
+	await ctx.send(f'Checking the internet for the latest {topic} news...')
+	await show_news(ctx, await data_access.search_news(query), topic)
+# End def
+
+async def show_news(ctx, links: list, topic: str) -> None:
+	if links:
+		await ctx.send("\n".join(links))
+	else:
+		await ctx.send(f"Couldn't find any {topic} news!")
+	# End if/else block
+# End def
+
+async def start_watch(ctx, kind: str, symbol: str) -> None:
+	try:
+		price = await price_watch.watcher.add(ctx.channel, kind, symbol)
+
+		if price is None:
+			await ctx.send(f"Couldn't find a price for {symbol.upper()}!")
+		# End if
+	except ValueError as e:
+		await ctx.send(str(e))
+	except Exception as e:
+		logging.error(f'Ran into an error trying to watch {symbol}!')
+		logging.exception(e)
+		await ctx.send(f"Couldn't watch {symbol.upper()}!")
+	# End try/except block
+# End def
+
+async def stop_watch(ctx, kind, symbol: str) -> None:
+	try:
+		if not await price_watch.watcher.remove(ctx.channel, kind, symbol):
+			await ctx.send(f"This channel isn't watching {symbol.upper() or 'anything'}!")
+		# End if
+	except Exception as e:
+		logging.error(f'Ran into an error trying to stop watching {symbol}!')
+		logging.exception(e)
+	# End try/except block
+# End def
+
+async def set_alert(ctx, kind: str, symbol: str, operand: str, threshold: float) -> None:
+	try:
+		if operand in ('>', '>='):
+			above = True
+		elif operand in ('<', '<='):
+			above = False
+		else:
+			await ctx.send("Invalid operand: " + operand + ", use > or <")
+			return
+		# End if/elif/else block
+
+		await alerts.book.load()
+		symbol = symbol.upper()
+		price = (await price_watch.watcher.lookup([(kind, symbol)])).get((kind, symbol))
+
+		if price is None:
+			await ctx.send(f"Couldn't find a price for {symbol}!")
+			return
+		# End if
+
+		if (price >= threshold) if above else (price <= threshold):
+			await ctx.send(f"{symbol} is already at ${price:,.2f}!")
+			return
+		# End if
+
+		new_alert = alerts.book.add((kind, symbol), above, threshold, ctx.author.id, ctx.channel.id)
+		await alerts.book.save()
+		await ctx.send(f"Set alert {new_alert.describe()}, {symbol} is at ${price:,.2f} right now.")
+	except ValueError as e:
+		await ctx.send(str(e))
+	except Exception as e:
+		logging.error(f'Ran into an error trying to set a price alert for {symbol}!')
+		logging.exception(e)
+		await ctx.send("Couldn't set that alert!")
+	# End try/except block
+# End def
+
 ###
 # Events
 ###
 
-# Runs when bot is ready
+# Startup work the bot doesn't wait on, kept referenced until it's done
+background_tasks = set()
+
+def in_background(coro, what: str) -> None:
+	def done(task):
+		background_tasks.discard(task)
+
+		if not task.cancelled() and task.exception() is not None:
+			logging.error(f'Ran into an error trying to {what}!', exc_info=task.exception())
+		# End if
+	# End def
+
+	task = asyncio.ensure_future(coro)
+	background_tasks.add(task)
+	task.add_done_callback(done)
+# End def
+
+# Runs when bot is ready. Each part starts on its own, so one failing doesn't keep the others
+# or the ready message from going, and the slow warmups run in the background.
 @client.event
 async def on_ready():
+	for what, start in (
+		("start the scheduler", schedule.start),
+		("serve metrics", metrics.start_server),
+		("load price alerts", alerts.book.load),
+		("start the crypto feed", crypto_feed.feed.start)
+	):
+		try:
+			started = start()
+
+			if asyncio.iscoroutine(started):
+				await started
+			# End if
+		except Exception as e:
+			logging.error(f'Ran into an error trying to {what}!')
+			logging.exception(e)
+		# End try/except block
+	# End for
+
+	in_background(render.renderer.start(), "warm up the render workers")
+	in_background(fx_rates.rates.ensure_loaded(), "load exchange rates")
+
 	try:
-		change_activity.start()
-		market_open.start()
-		market_close.start()
 		channel = client.get_channel(alternate_channel_id)
 		await channel.send(":robot: Stonk Bot is ready to maximize your gains! :robot:")
 	except Exception as e:
-		logging.error('Ran into an error trying to start the bot!')
+		logging.error('Ran into an error trying to send the ready message!')
 		logging.exception(e)
 	# End try/except block
 # End event
@@ -715,6 +646,17 @@ async def on_member_remove(member):
 	# End try/except block
 # End event
 
+# Labels the stage timers of the command about to run and starts its total timer
+@client.before_invoke
+async def start_command_timer(ctx):
+	metrics.start_command(ctx.command.qualified_name)
+# End def
+
+@client.after_invoke
+async def stop_command_timer(ctx):
+	metrics.finish_command()
+# End def
+
 # Handles errors when they come up
 @client.event
 async def on_command_error(ctx, error):
@@ -745,7 +687,12 @@ async def help(ctx):
 			'\t/whois <Ticker Symbol> - Returns general information about a ticker symbol.\n'+ \
 			'\t/expert <Ticker Symbol> - Returns expert opinions on what a stock is doing.\n'+ \
 			'\t/8ball - Shake the Magic 8 Ball and be told what stock to buy.\n' + \
-			'\t/sp - Get current stock price for any stock.\n'
+			'\t/sp - Get current stock price for any stock.\n' + \
+			'\t/watch <Ticker Symbol> - Keeps a message in this channel updated with a stock\'s price.\n' + \
+			'\t/unwatch <Optional: Ticker Symbol> - Stops watching a stock, or everything if no symbol is given.\n' + \
+			'\t/alert <Ticker Symbol> <">" or "<"> <Price> - Pings you once a stock\'s price goes above or below a price.\n' + \
+			'\t/alerts - Lists the price alerts you have set.\n' + \
+			'\t/unalert <Alert Number> - Removes one of your price alerts.\n'
 		)
 
 		await ctx.author.send('Stock regular graph specific commands: \n'+ \
@@ -774,12 +721,16 @@ async def help(ctx):
 			'\t/dsmg <Ticker Symbol> - Returns a 1 month candlestick graph of two stocks\' price history.\n'+ \
 			'\t/dswg <Ticker Symbol> - Returns a 5 day candlestick graph of two stocks\' price history.\n'+ \
 			'\t/dsdg <Ticker Symbol> - Returns a 1 trading day candlestick graph of two stocks\' price history.\n'+ \
-			'\t/dshg <Ticker Symbol> - Returns a 1 hour candlestick graph of two stocks\' price history.\n'
+			'\t/dshg <Ticker Symbol> - Returns a 1 hour candlestick graph of two stocks\' price history.\n'+ \
+			'\t/compare <Ticker Symbols> - Returns a 1 year graph comparing the performance of up to 10 stocks.\n'
 		)
 
 		# Crypto
 		await ctx.author.send('Other crypto specific commands:\n' + \
-			'\t/sp - Get current stock price for any stock.\n'
+			'\t/sp - Get current stock price for any stock.\n' + \
+			'\t/cwatch <Crypto Symbol> - Keeps a message in this channel updated with a cryptocurrency\'s price.\n' + \
+			'\t/cunwatch <Crypto Symbol> - Stops watching a cryptocurrency.\n' + \
+			'\t/calert <Crypto Symbol> <">" or "<"> <Price> - Pings you once a cryptocurrency\'s price goes above or below a price.\n'
 		)
 
 		await ctx.author.send('Crypto graph specific commands:\n' + \
@@ -819,7 +770,8 @@ async def help(ctx):
 				'\t/clear <Number> - Clears 1-10 messages from the chat permanently.\n'+ \
 				'\t/kick <User> <Optional: Reason> - Kicks a user from the discord.\n'+ \
 				'\t/ban <User> <Optional: Reason> - Bans a user from the discord.\n'+ \
-				'\t/unban <User> - Unbans a User. To use this you must use their name and 4 digit code.'
+				'\t/unban <User> - Unbans a User. To use this you must use their name and 4 digit code.\n'+ \
+				'\t/stats - Shows command latencies, cache hit rates and the bot\'s memory and CPU use.'
 			)
 		# End if
 	except Exception as e:
@@ -829,6 +781,57 @@ async def help(ctx):
 	# End try/except block
 # End command
 
+# Shows where command time goes, how the caches are doing and what the bot process is using
+@client.command()
+@commands.has_permissions(administrator=True)
+async def stats(ctx) -> None:
+	try:
+		process = metrics.process_stats()
+		lines = [
+			f'RSS: {process["rss"] / (1024 * 1024):.0f}MB, CPU: {process["cpu_percent"]:.1f}%, '
+			f'threads: {process["threads"]}, up {process["uptime"] / 3600:.1f}h'
+		]
+
+		lines.append('Commands (count, mean, p50, p95):')
+		for command, stage in sorted(metrics.command_seconds.series):
+			count, mean, p50, p95 = metrics.command_seconds.summary(command, stage)
+			lines.append(f'\t{command} {stage}: {count}, {mean * 1000:.0f}ms, <{p50 * 1000:.0f}ms, <{p95 * 1000:.0f}ms')
+		# End for
+
+		lines.append('Caches (hit rate, entries, size):')
+		for c in cache.caches:
+			lookups = c.hits + c.misses
+			lines.append(f'\t{c.name}: {c.hits / lookups if lookups else 0:.0%} of {lookups}, {len(c)}, {c.bytes / (1024 * 1024):.1f}MB')
+		# End for
+
+		queue = job_queue.jobs.stats()
+		lines.append(f'Jobs: {queue["running"]} running, {queue["waiting"]} waiting, {queue["completed"]} done, {queue["rejected"]} turned away, {queue["limited"]} rate limited')
+
+		renders = render.renderer.stats()
+		lines.append(f'Renders: {renders["renders"]} ({renders["cold_renders"]} cold), {renders["restarts"]} pool restarts, {renders["recycles"]} recycles')
+
+		watches = price_watch.watcher.stats()
+		lines.append(f'Watches: {watches["symbols"]} symbols in {watches["channels"]} channels, {watches["ticks"]} ticks ({watches["skipped"]} skipped)')
+
+		# Discord caps messages at 2000 characters
+		message = ""
+		for line in lines:
+			if len(message) + len(line) > 1900:
+				await ctx.send(message)
+				message = ""
+			# End if
+
+			message += line + "\n"
+		# End for
+
+		await ctx.send(message)
+	except Exception as e:
+		logging.error('Ran into an error trying to send stats!')
+		logging.exception(e)
+		await ctx.send(f"Couldn't get the bot's stats!")
+	# End try/except block
+# End command
+
 # Test the bot's ping
 @client.command()
 async def ping(ctx):
@@ -840,12 +843,7 @@ async def ping(ctx):
 async def news(ctx, *, company="") -> None:
 	try:
 		query = f"stock market news {company}" if company else "stock market news"
-		await ctx.send(f'Checking the internet for the latest {company} financial news...' if company else 'Checking the internet for the latest financial news...')
-
-		for results in search(query, tld='com', lang='en', num=3, start=0, stop=3, pause=1.0):
-			await ctx.send(results)
-			time.sleep(1)
-		# End for
+		await send_news(ctx, query, f"{company} financial" if company else "financial")
 	except Exception as e:
 		logging.error('Ran into an error trying to get stock news!')
 		logging.exception(e)
@@ -858,12 +856,7 @@ async def news(ctx, *, company="") -> None:
 async def cryptonews(ctx, *, crypto="") -> None:
 	try:
 		query = f"crypto market news {crypto}" if crypto else "crypto market news"
-		await ctx.send(f'Checking the internet for the latest {crypto} financial news...'if crypto else 'Checking the internet for the latest crypto news...')
-
-		for results in search(query, tld='com', lang='en', num=3, start=0, stop=3, pause=1.0):
-			await ctx.send(results)
-			time.sleep(1)
-		# End for
+		await send_news(ctx, query, f"{crypto} financial" if crypto else "crypto")
 	except Exception as e:
 		logging.error('Ran into an error trying to get crypto news!')
 		logging.exception(e)
@@ -876,8 +869,7 @@ async def cryptonews(ctx, *, crypto="") -> None:
 async def price(ctx, company: str) -> None:
 	try:
 		await ctx.send(f'Getting price information for '+company+'...')
-		ticker = yf.Ticker(company)
-		ticker_info = ticker.info
+		ticker_info = await data_access.get_quote(company)
 
 		data = 'Opening Price: $' + str(ticker_info['open']) + \
 			'\nLatest ask price: $' + str(ticker_info['ask']) + \
@@ -896,11 +888,11 @@ async def price(ctx, company: str) -> None:
 
 # Gives information about a ticker symbol
 @client.command()
+@job_queue.heavy
 async def whois(ctx, company: str) -> None:
 	try:
 		await ctx.send(f'Getting general information for '+company+'...')
-		ticker = yf.Ticker(company)
-		ticker_info = ticker.info
+		ticker_info = await data_access.get_profile(company)
 
 		try:
 			longName = ticker_info.get('longName', "")
@@ -967,11 +959,11 @@ async def whois(ctx, company: str) -> None:
 
 # Returns expert thoughts on what a stock is doing
 @client.command()
+@job_queue.heavy
 async def expert(ctx, company: str) -> None:
 	try:
 		await ctx.send(f'Let me get expert opinions on ' + company.upper() + ' for you...')
-		ticker = yf.Ticker(company)
-		expert = ticker.recommendations
+		expert = await data_access.get_recommendations(company)
 		output = expert[len(expert)-5:len(expert)]
 		output = str(output)
 		output = output[75:]
@@ -1009,6 +1001,16 @@ async def dsyg(ctx, fcompany: str, scompany: str) -> None:
 	await create_dual_stock_graph(ctx, fcompany=fcompany, scompany=scompany, period="1y", interval="1d")
 # End command
 
+@client.command()
+async def compare(ctx, *companies) -> None:
+	if len(companies) < 2 or len(companies) > max_compare_symbols:
+		await ctx.send(f'Please provide between 2 and {max_compare_symbols} ticker symbols to compare!')
+		return()
+	# End if
+
+	await create_compare_graph(ctx, companies=list(companies), period="1y", interval="1d")
+# End command
+
 @client.command()
 async def monthgraph(ctx, company: str) -> None:
 	await create_graph(ctx, company=company, period="1mo", interval="1d")
@@ -1204,6 +1206,81 @@ async def sp(ctx, company: str) -> None:
 	await stock_current_price(ctx, company=company)
 # End command
 
+@client.command()
+async def watch(ctx, company: str) -> None:
+	await start_watch(ctx, price_watch.STOCK, company)
+# End command
+
+@client.command()
+async def cwatch(ctx, crypto: str) -> None:
+	await start_watch(ctx, price_watch.CRYPTO, crypto)
+# End command
+
+@client.command()
+async def unwatch(ctx, company="") -> None:
+	await stop_watch(ctx, price_watch.STOCK if company else None, company)
+# End command
+
+@client.command()
+async def cunwatch(ctx, crypto: str) -> None:
+	await stop_watch(ctx, price_watch.CRYPTO, crypto)
+# End command
+
+@client.command()
+async def alert(ctx, company: str, operand: str, threshold: float) -> None:
+	# "/alert BTC < 50000" means the coin, so the coins the crypto feed follows are read as cryptocurrencies
+	if company.upper() in crypto_feed.feed.coins:
+		await ctx.send(f"{company.upper()} is a cryptocurrency, so this alert follows its crypto price. Use /calert for cryptocurrencies next time!")
+		await set_alert(ctx, price_watch.CRYPTO, company, operand, threshold)
+	else:
+		await set_alert(ctx, price_watch.STOCK, company, operand, threshold)
+	# End if/else block
+# End command
+
+@client.command()
+async def calert(ctx, crypto: str, operand: str, threshold: float) -> None:
+	await set_alert(ctx, price_watch.CRYPTO, crypto, operand, threshold)
+# End command
+
+# Lists the price alerts the user has set
+@client.command(name='alerts')
+async def list_alerts(ctx) -> None:
+	try:
+		await alerts.book.load()
+		waiting = alerts.book.for_user(ctx.author.id)
+
+		if waiting:
+			await ctx.send('Your price alerts:\n' + '\n'.join(f'\t{a.describe()}' for a in waiting))
+		else:
+			await ctx.send("You don't have any price alerts set!")
+		# End if/else block
+	except Exception as e:
+		logging.error('Ran into an error trying to list price alerts!')
+		logging.exception(e)
+		await ctx.send("Couldn't list your price alerts!")
+	# End try/except block
+# End command
+
+@client.command()
+async def unalert(ctx, number: int) -> None:
+	try:
+		await alerts.book.load()
+		removed = alerts.book.remove(number, ctx.author.id)
+
+		if removed is None:
+			await ctx.send(f"You don't have an alert #{number}!")
+			return
+		# End if
+
+		await alerts.book.save()
+		await ctx.send(f'Removed alert {removed.describe()}')
+	except Exception as e:
+		logging.error('Ran into an error trying to remove a price alert!')
+		logging.exception(e)
+		await ctx.send("Couldn't remove that alert!")
+	# End try/except block
+# End command
+
 # Magic 8 ball to tell you what to buy
 @client.command(aliases=['8ball','magic8ball'])
 async def _8ball(ctx, *, message = ''):
@@ -1383,45 +1460,69 @@ async def unban(ctx, *, member):
 # Tasks
 ###
 
-@tasks.loop(minutes=5) #
-async def change_activity():
+schedule = scheduler.Scheduler("bot")
+
+async def change_activity(when: float) -> None:
 	await client.change_presence(activity=discord.Game(next(activity_list)),status=discord.Status.idle)
-# End task
+# End def
 
-# Sends a message when the market opens at 8:30 am EST
-@tasks.loop(minutes=1)
-async def market_open():
-	try:
-		channel = client.get_channel(main_channel_id)
-		eastern = arrow.utcnow().to('US/Eastern')
-		holiday_name = await is_holiday()
-		if eastern.hour == 9 and eastern.minute == 30 and eastern.weekday() < 5:
-			if not holiday_name:
-				await channel.send(":bell: The stock market is now open! :bell:")
-			else:
-				await channel.send(f":frowning: The stock market is closed today for {holiday_name}! :frowning:")
-			# End if/else block
-		# End if
-	except Exception as e:
-		logging.error('Ran into an error trying to send a market_open message!')
-		logging.exception(e)
-	# End try/except block
-# End task
+# Sends a message when the market opens at 9:30 am EST
+async def market_open(when: float) -> None:
+	channel = client.get_channel(main_channel_id)
+	await channel.send(":bell: The stock market is now open! :bell:")
+# End def
 
-# Sends a message when the market closes at 4:00 pm EST
-@tasks.loop(minutes=1)
-async def market_close():
-	try:
-		channel = client.get_channel(main_channel_id)
-		eastern = arrow.utcnow().to('US/Eastern')
-		if eastern.hour == 16 and eastern.minute == 0 and eastern.weekday() < 5 and not await is_holiday():
-			await channel.send(":bell: The stock market is now closed! :bell:")
-		# End if
-	except Exception as e:
-		logging.error('Ran into an error trying to send a market_close message!')
-		logging.exception(e)
-	# End try/except block
-# End task
+# Sends a message at 9:30 am EST on weekdays the market is closed for a holiday
+async def market_holiday(when: float) -> None:
+	channel = client.get_channel(main_channel_id)
+	holiday_name = market_calendar.holiday_name(arrow.get(when))
+	await channel.send(f":frowning: The stock market is closed today for {holiday_name}! :frowning:")
+# End def
+
+# Sends a message when the market closes, at 4:00 pm EST or 1:00 pm on early close days
+async def market_close(when: float) -> None:
+	channel = client.get_channel(main_channel_id)
+	await channel.send(":bell: The stock market is now closed! :bell:")
+# End def
+
+schedule.add("change_activity", scheduler.every(300), change_activity)
+schedule.add("market_open", lambda after: market_calendar.next_open(arrow.get(after)).timestamp(), market_open)
+schedule.add("market_holiday", lambda after: market_calendar.next_closure(arrow.get(after)).timestamp(), market_holiday)
+schedule.add("market_close", lambda after: market_calendar.next_close(arrow.get(after)).timestamp(), market_close)
+schedule.add("fx_refresh", fx_rates.next_refresh, fx_rates.rates.refresh)
+
+# Pings users whose price alerts the latest watched prices set off
+async def check_alerts(prices: dict) -> None:
+	triggered = alerts.book.check(prices)
+
+	if not triggered:
+		return
+	# End if
+
+	await alerts.book.save()
+
+	for triggered_alert, price in triggered:
+		try:
+			channel = client.get_channel(triggered_alert.channel_id) or client.get_channel(main_channel_id)
+			direction = "above" if triggered_alert.above else "below"
+			await channel.send(
+				f":rotating_light: <@{triggered_alert.user_id}> {triggered_alert.symbol[1]} is at ${price:,.2f}, "
+				f"{direction} your alert at ${triggered_alert.threshold:,.2f}! :rotating_light:"
+			)
+		except Exception as e:
+			logging.error(f'Ran into an error trying to send alert #{triggered_alert.id}!')
+			logging.exception(e)
+		# End try/except block
+	# End for
+# End def
+
+# Alerts are checked against the price watch's batched polls
+price_watch.watcher.sources.append(alerts.book.symbols)
+price_watch.watcher.listeners.append(check_alerts)
+alerts.book.on_change.append(price_watch.watcher.changed)
+price_watch.watcher.run_on(schedule, price_watch.watch_interval)
 
 # Run the bot
-client.run(api_key)
+if __name__ == "__main__":
+	client.run(api_key)
+# End if
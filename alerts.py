@@ -0,0 +1,256 @@
+# Copyright 2020 - Custom License - https://github.com/Tim-Dusek/DiscordStockBot/blob/master/LICENSE
+# Maintained by Tim-Dusek and cdchris12
+
+###
+# Import statements
+###
+
+import os, json, time, heapq, asyncio
+import data_access, metrics
+
+###
+# Price alerts
+###
+
+# Tells `user_id` in `channel_id` once `symbol` (a price_watch symbol) goes above or below `threshold`
+class Alert:
+	def __init__(self, id: int, symbol: tuple, above: bool, threshold: float, user_id: int, channel_id: int, created=None):
+		self.id = id
+		self.symbol = symbol
+		self.above = above
+		self.threshold = threshold
+		self.user_id = user_id
+		self.channel_id = channel_id
+		self.created = created or time.time()
+	# End def
+
+	def describe(self) -> str:
+		return f"#{self.id}: {self.symbol[1]} {'>' if self.above else '<'} ${self.threshold:,.2f}"
+	# End def
+# End class
+
+# Every alert, indexed per symbol by two heaps: one of the thresholds waiting for the price to rise
+# to them, lowest first, and one of the thresholds waiting for it to fall, highest first. A new
+# price only pops the alerts it triggers, so a tick costs O(log n + k) per symbol no matter how
+# many alerts are waiting.
+#
+# Removed alerts are left in the heaps and skipped when popped; a symbol's heaps are rebuilt once
+# most of their entries are dead. Alerts are saved as JSON in `path` after every change, and the
+# functions in `on_change` are called whenever the set of symbols with alerts may have changed.
+class AlertBook:
+	def __init__(self, path: str, max_per_user=20):
+		self.path = path
+		self.max_per_user = max_per_user
+		self.alerts = {}
+		self.books = {}
+		self.live = {}
+		self.per_user = {}
+		self.next_id = 1
+		self.loaded = False
+		self.load_lock = asyncio.Lock()
+		self.save_lock = asyncio.Lock()
+		self.on_change = []
+		self.triggered = 0
+	# End def
+
+	def _push(self, alert: Alert) -> None:
+		rising, falling = self.books.setdefault(alert.symbol, ([], []))
+
+		if alert.above:
+			heapq.heappush(rising, (alert.threshold, alert.id))
+		else:
+			heapq.heappush(falling, (-alert.threshold, alert.id))
+		# End if/else block
+
+		self.live[alert.symbol] = self.live.get(alert.symbol, 0) + 1
+		self.per_user[alert.user_id] = self.per_user.get(alert.user_id, 0) + 1
+	# End def
+
+	# Forgets an alert; its heap entries are skipped from now on
+	def _drop(self, alert: Alert) -> None:
+		del self.alerts[alert.id]
+		self.live[alert.symbol] -= 1
+		self.per_user[alert.user_id] -= 1
+
+		if not self.per_user[alert.user_id]:
+			del self.per_user[alert.user_id]
+		# End if
+
+		if not self.live[alert.symbol]:
+			del self.live[alert.symbol]
+			del self.books[alert.symbol]
+			return
+		# End if
+
+		rising, falling = self.books[alert.symbol]
+
+		if len(rising) + len(falling) > 2 * self.live[alert.symbol] + 16:
+			rising[:] = [entry for entry in rising if entry[1] in self.alerts]
+			falling[:] = [entry for entry in falling if entry[1] in self.alerts]
+			heapq.heapify(rising)
+			heapq.heapify(falling)
+		# End if
+	# End def
+
+	def _changed(self) -> None:
+		for callback in self.on_change:
+			callback()
+		# End for
+	# End def
+
+	# Symbols with at least one alert waiting, for the price watch to poll
+	def symbols(self):
+		return self.live.keys()
+	# End def
+
+	def for_user(self, user_id: int) -> list:
+		return sorted((alert for alert in self.alerts.values() if alert.user_id == user_id), key=lambda alert: alert.id)
+	# End def
+
+	def add(self, symbol: tuple, above: bool, threshold: float, user_id: int, channel_id: int) -> Alert:
+		if self.per_user.get(user_id, 0) >= self.max_per_user:
+			raise ValueError(f"You already have {self.max_per_user} alerts set!")
+		# End if
+
+		alert = Alert(self.next_id, symbol, above, threshold, user_id, channel_id)
+		self.next_id += 1
+		self.alerts[alert.id] = alert
+		self._push(alert)
+		self._changed()
+		return alert
+	# End def
+
+	# Removes one of the user's alerts, returning it or None if they have no alert with that id
+	def remove(self, id: int, user_id: int):
+		alert = self.alerts.get(id)
+
+		if alert is None or alert.user_id != user_id:
+			return None
+		# End if
+
+		self._drop(alert)
+		self._changed()
+		return alert
+	# End def
+
+	# Takes {symbol: price} and returns [(alert, price)] for every alert those prices trigger.
+	# Triggered alerts are removed.
+	def check(self, prices: dict) -> list:
+		triggered = []
+
+		for symbol, price in prices.items():
+			book = self.books.get(symbol)
+
+			if book is None or price is None:
+				continue
+			# End if
+
+			rising, falling = book
+
+			while rising and rising[0][0] <= price:
+				triggered.append(heapq.heappop(rising)[1])
+			# End while
+
+			while falling and -falling[0][0] >= price:
+				triggered.append(heapq.heappop(falling)[1])
+			# End while
+		# End for
+
+		results = []
+
+		for id in triggered:
+			alert = self.alerts.get(id)
+
+			if alert is not None:
+				self._drop(alert)
+				results.append((alert, prices[alert.symbol]))
+			# End if
+		# End for
+
+		if results:
+			self.triggered += len(results)
+			self._changed()
+		# End if
+
+		return results
+	# End def
+
+	def _snapshot(self) -> dict:
+		return {
+			"next_id": self.next_id,
+			"alerts": [
+				{
+					"id": a.id, "kind": a.symbol[0], "symbol": a.symbol[1], "above": a.above, "threshold": a.threshold,
+					"user_id": a.user_id, "channel_id": a.channel_id, "created": a.created
+				}
+				for a in self.alerts.values()
+			]
+		}
+	# End def
+
+	def _write(self, snapshot: dict) -> None:
+		os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+		temp = self.path + ".tmp"
+
+		with open(temp, "w") as f:
+			json.dump(snapshot, f)
+		# End with
+
+		# Replace the file whole so a crash mid write never leaves half a file behind
+		os.replace(temp, self.path)
+	# End def
+
+	def _read(self):
+		try:
+			with open(self.path) as f:
+				return json.load(f)
+			# End with
+		except FileNotFoundError:
+			return None
+		# End try/except block
+	# End def
+
+	async def save(self) -> None:
+		async with self.save_lock:
+			await data_access.run_blocking(self._write, self._snapshot())
+		# End with
+	# End def
+
+	# Loads the saved alerts, once. Commands wait on this before touching the book.
+	async def load(self) -> None:
+		async with self.load_lock:
+			if self.loaded:
+				return
+			# End if
+
+			saved = await data_access.run_blocking(self._read)
+
+			for a in (saved or {}).get("alerts", []):
+				alert = Alert(a["id"], (a["kind"], a["symbol"]), a["above"], a["threshold"], a["user_id"], a["channel_id"], a["created"])
+				self.alerts[alert.id] = alert
+				self._push(alert)
+			# End for
+
+			self.next_id = (saved or {}).get("next_id", 1)
+			self.loaded = True
+			self._changed()
+		# End with
+	# End def
+
+	def stats(self) -> dict:
+		return {
+			"alerts": len(self.alerts),
+			"symbols": len(self.live),
+			"triggered": self.triggered
+		}
+	# End def
+# End class
+
+book = AlertBook(
+	os.path.join(os.environ.get("Data_Dir", "data"), "alerts.json"),
+	max_per_user=int(os.environ.get("Alert_Max_Per_User", 20))
+)
+
+metrics.collectors.append(lambda: [
+	(f"stonkbot_alerts_{k}" + ("_total" if k == "triggered" else ""), {}, v) for k, v in book.stats().items()
+])
@@ -0,0 +1,463 @@
+# Copyright 2020 - Custom License - https://github.com/Tim-Dusek/DiscordStockBot/blob/master/LICENSE
+# Maintained by Tim-Dusek and cdchris12
+
+###
+# Import statements
+###
+
+import os, sys, json, time, argparse, asyncio, statistics, subprocess, tracemalloc
+
+# Offline benchmarks for the graph builders and quote commands in StonkBot.py.
+#
+# Every case runs the real builder with a fake ctx, while data_access is pointed at fixtures instead
+# of yfinance and cryptocompare. Charts are rendered in this process, so the parse, downsample,
+# figure build and PNG encode stages can be timed one by one and peak memory covers all of them.
+#
+#	python benchmark.py --record     # fetch fixtures from the live APIs into benchmarks/fixtures
+#	python benchmark.py              # run every case, compare with the last run and store the results
+#	python benchmark.py -c crypto    # run the cases whose name contains "crypto"
+#	python benchmark.py --synthetic  # run on seeded synthetic data where fixtures are missing
+#
+# Runs need the recorded fixtures, so timings from different machines and commits are taken on the
+# same data. With --synthetic, seeded synthetic data of the same shape stands in for missing ones;
+# every result row notes its data, and a run is only compared with earlier runs on the same data.
+
+bench_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmarks")
+fixture_dir = os.path.join(bench_dir, "fixtures")
+results_path = os.path.join(bench_dir, "results.jsonl")
+
+parser = argparse.ArgumentParser(description="Benchmark Stonk Bot's graph builders and quote commands")
+parser.add_argument("-c", "--case", help="Only run cases whose name contains this", action="store", type=str, default="")
+parser.add_argument("-r", "--repeat", help="Timed runs per case", action="store", type=int, default=5)
+parser.add_argument("-t", "--threshold", help="Percent slowdown against the last run that counts as a regression", action="store", type=float, default=20.0)
+parser.add_argument("-m", "--min-delta", help="Slowdowns of fewer milliseconds than this are noise, whatever the percent", action="store", type=float, default=1.0)
+parser.add_argument("--record", help="Record fixtures from the live APIs, then exit", action="store_true", default=False)
+parser.add_argument("--synthetic", help="Use seeded synthetic data for missing fixtures instead of refusing to run", action="store_true", default=False)
+parser.add_argument("--no-save", help="Don't append this run to the results file", action="store_true", default=False)
+args = parser.parse_args()
+
+# StonkBot parses its own arguments at import and exits without a key and channel
+sys.argv = [sys.argv[0], "-k", "benchmark", "-m", "1"]
+
+import numpy as np, pandas as pd
+import StonkBot, data_access, fx_rates, parsing, render, charts
+
+###
+# Fixtures
+###
+
+# Fixtures are named after the request they answer, e.g. "AAPL_1y_1d" or "BTC_1440_minute"
+def history_name(company: str, interval: str, period=None) -> str:
+	return f"{company.upper()}_{period or 'range'}_{interval}"
+# End def
+
+def crypto_name(crypto: str, period: str, units: int) -> str:
+	return f"{crypto.upper()}_{units}_{period}"
+# End def
+
+def info_name(company: str) -> str:
+	return f"{company.upper()}_info"
+# End def
+
+# Returns the file a case's ("history"|"crypto"|"info", *args) fixture is recorded in
+def fixture_file(kind: str, *fargs) -> str:
+	if kind == "history":
+		return history_name(*fargs) + ".csv"
+	elif kind == "crypto":
+		return crypto_name(*fargs) + ".json"
+	else:
+		return info_name(*fargs) + ".json"
+	# End if/elif/else block
+# End def
+
+# Returns the fixture files the cases need that haven't been recorded
+def missing_fixtures(selected: list) -> list:
+	wanted = {fixture_file(*f) for name in selected for f in cases[name][1]}
+	return sorted(name for name in wanted if not os.path.exists(os.path.join(fixture_dir, name)))
+# End def
+
+def _save_frame(name: str, res) -> None:
+	res.to_csv(os.path.join(fixture_dir, name + ".csv"))
+# End def
+
+def _load_frame(name: str):
+	res = pd.read_csv(os.path.join(fixture_dir, name + ".csv"), index_col=0)
+	res.index = pd.DatetimeIndex(pd.to_datetime(res.index, utc=True)).tz_convert("America/New_York")
+	return res
+# End def
+
+def _save_json(name: str, value) -> None:
+	with open(os.path.join(fixture_dir, name + ".json"), "w") as f:
+		json.dump(value, f, default=str)
+	# End with
+# End def
+
+def _load_json(name: str):
+	with open(os.path.join(fixture_dir, name + ".json")) as f:
+		return json.load(f)
+	# End with
+# End def
+
+# Seeded random walks shaped like yfinance and cryptocompare results, for when nothing is recorded
+bar_counts = {("max", "1d"): 11000, ("1y", "1d"): 252, ("1mo", "1d"): 21, ("range", "5m"): 192, ("range", "1m"): 60}
+bar_steps = {"1d": "1D", "5m": "5min", "1m": "1min"}
+
+def _walk(n: int, seed: int) -> np.ndarray:
+	rng = np.random.default_rng(seed)
+	return 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+# End def
+
+def synthetic_history(company: str, interval: str, period=None):
+	n = bar_counts.get((period or "range", interval), 252)
+	close = _walk(n, sum(map(ord, company)))
+	index = pd.date_range(end="2024-06-28 16:00", periods=n, freq=bar_steps.get(interval, "1D"), tz="America/New_York")
+
+	return pd.DataFrame({
+		"Open": close * 0.998, "High": close * 1.01, "Low": close * 0.99, "Close": close,
+		"Volume": np.full(n, 1e6), "Dividends": np.zeros(n), "Stock Splits": np.zeros(n)
+	}, index=index)
+# End def
+
+def synthetic_crypto(crypto: str, period: str, units: int) -> list:
+	step = data_access.crypto_seconds[period]
+	close = _walk(units + 1, sum(map(ord, crypto)))
+	start = 1719590400 - units * step
+
+	return [
+		{"time": start + i * step, "open": c * 0.999, "high": c * 1.002, "low": c * 0.998, "close": c, "volumefrom": 10.0, "volumeto": 10.0 * c}
+		for i, c in enumerate(close)
+	]
+# End def
+
+def synthetic_info(company: str) -> dict:
+	return {
+		"symbol": company.upper(), "longName": f"{company.upper()} Inc.", "sector": "Technology", "industry": "Software",
+		"open": 100.0, "ask": 100.5, "bid": 100.4, "volume": 1000000, "averageVolume": 900000, "beta": 1.2345,
+		"longBusinessSummary": "A company. " * 50
+	}
+# End def
+
+# Tracks whether any case fell back to synthetic data
+sources = set()
+
+def fixture(name: str, make, load):
+	try:
+		value = load(name)
+		sources.add("fixture")
+	except FileNotFoundError:
+		value = make()
+		sources.add("synthetic")
+	# End try/except block
+
+	return value
+# End def
+
+###
+# Fakes
+###
+
+# Stands in for discord's Context and captures what would have been sent
+class FakeContext:
+	def __init__(self):
+		self.messages = []
+		self.files = []
+		self.upload_ms = 0.0
+	# End def
+
+	async def send(self, content=None, file=None, **kwargs) -> None:
+		started = time.perf_counter()
+
+		if file is not None:
+			self.files.append(file.fp.read())
+		else:
+			self.messages.append(str(content))
+		# End if/else block
+
+		self.upload_ms += (time.perf_counter() - started) * 1000
+	# End def
+# End class
+
+# Stage timings of the case being run
+stages = {}
+
+def _timed(stage: str, func):
+	def wrapper(*a, **kw):
+		started = time.perf_counter()
+
+		try:
+			return func(*a, **kw)
+		finally:
+			stages[stage] = stages.get(stage, 0.0) + (time.perf_counter() - started) * 1000
+		# End try/finally block
+	# End def
+
+	return wrapper
+# End def
+
+async def fake_get_history(company, interval, start=None, end=None, period=None, prepost=False):
+	return fixture(history_name(company, interval, period), lambda: synthetic_history(company, interval, period), _load_frame)
+# End def
+
+async def fake_get_histories(companies, interval, start=None, end=None, period=None, prepost=False):
+	return {c.upper(): await fake_get_history(c, interval, start=start, end=end, period=period, prepost=prepost) for c in companies}
+# End def
+
+async def fake_get_crypto_history(crypto, period, units, to_ts=None):
+	return fixture(crypto_name(crypto, period, units), lambda: synthetic_crypto(crypto, period, units), _load_json)
+# End def
+
+async def fake_get_profile(company):
+	return fixture(info_name(company), lambda: synthetic_info(company), _load_json)
+# End def
+
+async def fake_get_quote(company):
+	info = await fake_get_profile(company)
+	return {f: info[f] for f in data_access.quote_fields if f in info}
+# End def
+
+# The crypto feed isn't streaming here, so /cp and /kimchi fetch anything it doesn't hold yet through this
+async def fake_get_crypto_prices(cryptos, currencies):
+	return {c.upper(): {t: 3500.0 if t.upper() == "USD" else 4800000.0 for t in currencies} for c in cryptos}
+# End def
+
+# Renders in this process so each stage can be timed
+async def local_render(spec, key=None) -> bytes:
+	png, stats = charts.render_job(spec)
+
+	for stage in ("downsample_ms", "build_ms", "encode_ms"):
+		stages[stage[:-3]] = stages.get(stage[:-3], 0.0) + stats[stage]
+	# End for
+
+	return png
+# End def
+
+def install_fakes() -> None:
+	data_access.get_history = fake_get_history
+	data_access.get_histories = fake_get_histories
+	data_access.get_crypto_history = fake_get_crypto_history
+	data_access.get_quote = fake_get_quote
+	data_access.get_profile = fake_get_profile
+	data_access.get_crypto_prices = fake_get_crypto_prices
+	fx_rates.rates.rates = {"EUR": 1.0, "USD": 1.0, "KRW": 1370.0}
+	parsing.normalize_history = _timed("parse", parsing.normalize_history)
+	parsing.parse_crypto_rows = _timed("parse", parsing.parse_crypto_rows)
+	render.render = local_render
+# End def
+
+###
+# Cases
+###
+
+def _day_range() -> dict:
+	return {"start": "2024-06-28 04:00", "end": "2024-06-28 20:00"}
+# End def
+
+# name -> (coroutine factory taking ctx, fixtures to record as ("history"|"crypto"|"info", *args))
+cases = {
+	"graph_1y_1d": (lambda ctx: StonkBot.create_graph(ctx, company="AAPL", interval="1d", period="1y"), [("history", "AAPL", "1d", "1y")]),
+	"graph_max_1d": (lambda ctx: StonkBot.create_graph(ctx, company="AAPL", interval="1d", period="max"), [("history", "AAPL", "1d", "max")]),
+	"graph_1d_5m": (lambda ctx: StonkBot.create_graph(ctx, company="AAPL", interval="5m", prepost=True, **_day_range()), [("history", "AAPL", "5m", None)]),
+	"candlestick_1y_1d": (lambda ctx: StonkBot.create_candlestick_graph(ctx, company="AAPL", interval="1d", period="1y"), [("history", "AAPL", "1d", "1y")]),
+	"candlestick_max_1d": (lambda ctx: StonkBot.create_candlestick_graph(ctx, company="AAPL", interval="1d", period="max"), [("history", "AAPL", "1d", "max")]),
+	"candlestick_1d_5m": (lambda ctx: StonkBot.create_candlestick_graph(ctx, company="AAPL", interval="5m", prepost=True, **_day_range()), [("history", "AAPL", "5m", None)]),
+	"dual_stock_1y_1d": (lambda ctx: StonkBot.create_dual_stock_graph(ctx, fcompany="AAPL", scompany="MSFT", interval="1d", period="1y"), [("history", "AAPL", "1d", "1y"), ("history", "MSFT", "1d", "1y")]),
+	"dual_stock_max_1d": (lambda ctx: StonkBot.create_dual_stock_graph(ctx, fcompany="AAPL", scompany="MSFT", interval="1d", period="max"), [("history", "AAPL", "1d", "max"), ("history", "MSFT", "1d", "max")]),
+	"crypto_1440_minute": (lambda ctx: StonkBot.create_crypto_graph(ctx, crypto="BTC", period="minute", units=1440), [("crypto", "BTC", "minute", 1440)]),
+	"crypto_candlestick_1440_minute": (lambda ctx: StonkBot.create_crypto_candlestick_graph(ctx, crypto="BTC", period="minute", units=1440), [("crypto", "BTC", "minute", 1440)]),
+	"dual_crypto_1440_minute": (lambda ctx: StonkBot.create_dual_crypto_graph(ctx, fcrypto="BTC", scrypto="ETH", period="minute", units=1440), [("crypto", "BTC", "minute", 1440), ("crypto", "ETH", "minute", 1440)]),
+	"stock_current_price": (lambda ctx: StonkBot.stock_current_price(ctx, company="AAPL"), [("info", "AAPL")]),
+	"price": (lambda ctx: StonkBot.price.callback(ctx, company="AAPL"), [("info", "AAPL")]),
+	"whois": (lambda ctx: StonkBot.whois.callback(ctx, company="AAPL"), [("info", "AAPL")]),
+	"crypto_current_price": (lambda ctx: StonkBot.crypto_current_price(ctx, crypto="BTC"), []),
+	"kimchi": (lambda ctx: StonkBot.get_kimchi(ctx), [])
+}
+
+async def record(selected: list) -> None:
+	import arrow, crypto_client
+
+	os.makedirs(fixture_dir, exist_ok=True)
+	wanted = {f for name in selected for f in cases[name][1]}
+
+	try:
+		for kind, *fargs in sorted(wanted, key=str):
+			if kind == "history":
+				company, interval, period = fargs
+
+				if period:
+					res = data_access._history(company, interval, period=period)
+				else:
+					res = data_access._history(company, interval, start=arrow.utcnow().shift(days=-1).datetime, end=arrow.utcnow().datetime, prepost=True)
+				# End if/else block
+
+				_save_frame(history_name(company, interval, period), res)
+			elif kind == "crypto":
+				crypto, period, units = fargs
+				_save_json(crypto_name(crypto, period, units), await crypto_client.client.histo(period, crypto, 'USD', limit=units))
+			else:
+				company, = fargs
+				_save_json(info_name(company), data_access._info(company))
+			# End if/elif/else block
+
+			print(f"Recorded {fixture_file(kind, *fargs)}")
+		# End for
+	finally:
+		await crypto_client.client.close()
+	# End try/finally block
+# End def
+
+###
+# Runner
+###
+
+async def run_case(name: str) -> dict:
+	factory = cases[name][0]
+	totals, stage_runs, sizes = [], [], []
+
+	# One untimed run loads fixtures and imports, then the timed runs
+	for i in range(args.repeat + 1):
+		render.png_cache.clear()
+		stages.clear()
+		ctx = FakeContext()
+
+		started = time.perf_counter()
+		await factory(ctx)
+		total = (time.perf_counter() - started) * 1000
+
+		if not ctx.files and not ctx.messages:
+			raise RuntimeError(f"{name} sent nothing, check the log above for the builder's error")
+		# End if
+
+		if i:
+			totals.append(total)
+			stage_runs.append(dict(stages, upload=ctx.upload_ms))
+			sizes.append(sum(len(f) for f in ctx.files) + sum(len(m) for m in ctx.messages))
+		# End if
+	# End for
+
+	# Peak memory gets its own run, as tracing allocations slows everything else down
+	render.png_cache.clear()
+	tracemalloc.start()
+	await factory(FakeContext())
+	peak = tracemalloc.get_traced_memory()[1]
+	tracemalloc.stop()
+
+	result = {
+		"total_ms": statistics.median(totals),
+		"min_ms": min(totals),
+		"peak_kb": peak // 1024,
+		"output_bytes": sizes[-1]
+	}
+
+	for stage in sorted({s for run in stage_runs for s in run}):
+		result[f"{stage}_ms"] = statistics.median(run.get(stage, 0.0) for run in stage_runs)
+	# End for
+
+	return result
+# End def
+
+# Returns the last result of every case, keyed by (case, data source). Timings on recorded fixtures
+# and on synthetic data aren't comparable, so runs are only compared against the same source.
+def last_results() -> dict:
+	previous = {}
+
+	try:
+		with open(results_path) as f:
+			for line in f:
+				entry = json.loads(line)
+				previous[(entry["case"], entry.get("data", ""))] = entry
+			# End for
+		# End with
+	except FileNotFoundError:
+		pass
+	# End try/except block
+
+	return previous
+# End def
+
+def git_commit() -> str:
+	try:
+		return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, cwd=os.path.dirname(bench_dir)).stdout.strip()
+	except OSError:
+		return ""
+	# End try/except block
+# End def
+
+async def main() -> int:
+	selected = [name for name in cases if args.case in name]
+
+	if args.record:
+		await record(selected)
+		return 0
+	# End if
+
+	missing = missing_fixtures(selected)
+
+	if missing and not args.synthetic:
+		print(f"No recorded fixtures for {', '.join(missing)} in {fixture_dir}.")
+		print("Run `python benchmark.py --record` to record them, or pass --synthetic to run on synthetic data.")
+		return 2
+	# End if
+
+	install_fakes()
+	charts.init_worker()
+	previous = last_results()
+	run_at, commit = time.strftime("%Y-%m-%dT%H:%M:%S"), git_commit()
+	regressions, failures, entries = [], [], []
+
+	print(f"{'case':<32}{'total':>10}{'parse':>9}{'downs':>9}{'build':>9}{'encode':>9}{'upload':>9}{'peak':>10}{'bytes':>10}{'vs last':>10}  data")
+
+	for name in selected:
+		sources.clear()
+
+		try:
+			result = await run_case(name)
+		except Exception as e:
+			print(f"{name:<32}failed: {e}")
+			failures.append(name)
+			continue
+		# End try/except block
+
+		data = "/".join(sorted(sources))
+		last = previous.get((name, data))
+		change = ""
+
+		if last is not None:
+			delta = (result["total_ms"] / last["total_ms"] - 1) * 100
+			change = f"{delta:+.0f}%"
+
+			if delta > args.threshold and result["total_ms"] - last["total_ms"] > args.min_delta:
+				regressions.append(name)
+				change += " !"
+			# End if
+		elif any(case == name for case, _ in previous):
+			change = "new data"
+		# End if/elif block
+
+		print(
+			f"{name:<32}{result['total_ms']:>8.2f}ms" + "".join(f"{result.get(s + '_ms', 0.0):>7.2f}ms" for s in ("parse", "downsample", "build", "encode", "upload")) +
+			f"{result['peak_kb']:>8}KB{result['output_bytes']:>10}{change:>10}  {data or '-'}"
+		)
+
+		entries.append(dict(result, case=name, time=run_at, commit=commit, repeat=args.repeat, data=data))
+	# End for
+
+	if entries and not args.no_save:
+		os.makedirs(bench_dir, exist_ok=True)
+
+		with open(results_path, "a") as f:
+			for entry in entries:
+				f.write(json.dumps(entry) + "\n")
+			# End for
+		# End with
+	# End if
+
+	if regressions:
+		print(f"\n{len(regressions)} case(s) are over {args.threshold:.0f}% and {args.min_delta:g}ms slower than the last run: {', '.join(regressions)}")
+	# End if
+
+	return 1 if regressions or failures else 0
+# End def
+
+if __name__ == "__main__":
+	sys.exit(asyncio.run(main()))
+# End if
@@ -0,0 +1,114 @@
+# Copyright 2020 - Custom License - https://github.com/Tim-Dusek/DiscordStockBot/blob/master/LICENSE
+# Maintained by Tim-Dusek and cdchris12
+
+###
+# Import statements
+###
+
+import sys, time
+from collections import OrderedDict
+
+###
+# Cache
+###
+
+# Every cache created, so their counters can be exported
+caches = []
+
+# An LRU cache with a byte budget and optional per-entry expiry.
+# Entries are evicted least recently used first once the budget is exceeded, and an entry
+# past its expiry time counts as a miss. Only touched from the event loop, so no locking.
+class Cache:
+	def __init__(self, name: str, max_bytes: int, sizeof=sys.getsizeof):
+		self.name = name
+		self.max_bytes = max_bytes
+		self.sizeof = sizeof
+		self.entries = OrderedDict()
+		self.bytes = 0
+		self.hits = 0
+		self.misses = 0
+		self.evictions = 0
+		caches.append(self)
+	# End def
+
+	# Returns the cached value for `key`, or `default` if it is missing or expired
+	def get(self, key, default=None):
+		entry = self.entries.get(key)
+
+		if entry is None:
+			self.misses += 1
+			return default
+		# End if
+
+		value, expires_at, size = entry
+
+		if expires_at is not None and expires_at <= time.time():
+			self._remove(key)
+			self.misses += 1
+			return default
+		# End if
+
+		self.entries.move_to_end(key)
+		self.hits += 1
+		return value
+	# End def
+
+	# Like get, but leaves the counters and the LRU order alone, for callers that only need to know
+	# whether a later get would hit
+	def peek(self, key, default=None):
+		entry = self.entries.get(key)
+
+		if entry is None or (entry[1] is not None and entry[1] <= time.time()):
+			return default
+		# End if
+
+		return entry[0]
+	# End def
+
+	# Stores `value` under `key` until `expires_at` (epoch seconds), or until evicted if `expires_at` is None
+	def put(self, key, value, expires_at=None) -> None:
+		size = self.sizeof(value)
+
+		if key in self.entries:
+			self._remove(key)
+		# End if
+
+		# Never let a single oversized value flush the whole cache
+		if size > self.max_bytes:
+			return
+		# End if
+
+		self.entries[key] = (value, expires_at, size)
+		self.bytes += size
+
+		while self.bytes > self.max_bytes:
+			oldest = next(iter(self.entries))
+			self._remove(oldest)
+			self.evictions += 1
+		# End while
+	# End def
+
+	def _remove(self, key) -> None:
+		value, expires_at, size = self.entries.pop(key)
+		self.bytes -= size
+	# End def
+
+	def clear(self) -> None:
+		self.entries.clear()
+		self.bytes = 0
+	# End def
+
+	def stats(self) -> dict:
+		return {
+			"entries": len(self.entries),
+			"bytes": self.bytes,
+			"hits": self.hits,
+			"misses": self.misses,
+			"evictions": self.evictions
+		}
+	# End def
+
+	def __len__(self) -> int:
+		return len(self.entries)
+	# End def
+# End class
@@ -0,0 +1,496 @@
+# Copyright 2020 - Custom License - https://github.com/Tim-Dusek/DiscordStockBot/blob/master/LICENSE
+# Maintained by Tim-Dusek and cdchris12
+
+###
+# Import statements
+###
+
+# Chart building and PNG encoding. Only render workers import this module, so the bot process
+# never loads matplotlib, plotly or kaleido.
+import os, io, time, logging
+import downsample
+import numpy as np, psutil
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt, plotly.graph_objects as go, pandas as pd
+from plotly.subplots import make_subplots
+
+###
+# Chart specs
+###
+
+# Charts are described by plain, picklable dicts so they can be shipped to a worker process:
+#
+#	{
+#		"kind": "candlestick",
+#		"meta": {"title": "AAPL Price Graph"},
+#		"data": {"time": [...], "open": [...], "high": [...], "low": [...], "close": [...], "volume": [...]}
+#	}
+#
+# "meta" holds titles and axis config, "data" holds the series arrays. Each kind has a builder below.
+
+# Shared x axis styling used by every plotly chart
+def _style_xaxes(fig, tickformat=True) -> None:
+	fig.update_xaxes(rangeslider_visible=False)
+
+	xaxes = dict(
+		tickangle=-45,
+		tickfont=dict(
+			family='Rockwell',
+			color='black',
+			size=14
+		),
+		showline=True,
+		linewidth=2,
+		linecolor='black'
+	)
+
+	if tickformat:
+		xaxes["tickformat"] = '%b %d %H:%M'
+	# End if
+
+	fig.update_xaxes(**xaxes)
+# End def
+
+# Price line on top, volume line below
+def _build_price_volume(meta: dict, data: dict):
+	fig = make_subplots(
+		rows = 2,
+		shared_xaxes = True,
+		vertical_spacing=0.03,
+		subplot_titles=(meta["title"], 'Volume'),
+		row_width=[0.2, 0.7]
+	)
+
+	# Add traces
+	fig.append_trace(go.Scatter(x=data["time"], y=data["close"], showlegend=False), row=1, col=1)
+
+	fig.append_trace(go.Scatter(x=data["time"], y=data["volume"], showlegend=False), row=2, col=1)
+
+	# Configure Axes
+	_style_xaxes(fig)
+	fig.update_yaxes(
+		showline=True,
+		linewidth=2,
+		linecolor='black',
+		tickprefix = '$',
+		tickformat = ',.3r',
+		row = 1,
+		col = 1
+	)
+
+	return fig
+# End def
+
+# Candlesticks over a thin close line on top, volume line below
+def _build_candlestick(meta: dict, data: dict):
+	fig = make_subplots(
+		rows = 2,
+		shared_xaxes = True,
+		vertical_spacing=0.03,
+		subplot_titles=(meta["title"], 'Volume'),
+		row_width=[0.2, 0.7]
+	)
+
+	# Add traces
+	# Background line
+	fig.append_trace(go.Scattergl(x=data["time"], y=data["close"], mode="lines", line_color="black", line = { "width":1}, showlegend=False), row=1, col=1)
+
+	# Candlestick
+	fig.append_trace(go.Candlestick(x=data["time"], open=data["open"], high=data["high"], low=data["low"], close=data["close"], showlegend=False), row=1, col=1)
+
+	# Volume
+	fig.append_trace(go.Scattergl(x=data["time"], y=data["volume"], showlegend=False), row=2, col=1)
+
+	# Configure Axes
+	if meta.get("layout_title"):
+		fig.update_layout(
+			title = meta["layout_title"],
+			xaxis_tickformat = '%b %d %H:%M'
+		)
+		_style_xaxes(fig, tickformat=False)
+	else:
+		_style_xaxes(fig)
+	# End if/else block
+
+	fig.update_yaxes(
+		showline=True,
+		linewidth=2,
+		linecolor='black',
+		tickprefix = '$',
+		tickformat = ',.3r',
+		row = 1,
+		col = 1
+	)
+
+	return fig
+# End def
+
+# Two price lines sharing an x axis, each with its own y axis
+def _build_dual_line(meta: dict, data: dict):
+	first, second = meta["first"], meta["second"]
+	fig = make_subplots(specs=[[{"secondary_y": True}]])
+
+	# Add traces
+	fig.add_trace(
+		go.Scatter(x=data["first_time"], y=data["first_close"], name=f"Price of {first}"),
+		secondary_y=False,
+	)
+
+	fig.add_trace(
+		go.Scatter(x=data["second_time"], y=data["second_close"], name=f"Price of {second}"),
+		secondary_y=True,
+	)
+
+	# Configure Axes
+	fig.update_yaxes(title_text=f"<b>{first} price</b>", secondary_y=False)
+	fig.update_yaxes(title_text=f"<b>{second} price</b>", secondary_y=True)
+	fig.update_yaxes(tickprefix = '$', tickformat = ',.3r', secondary_y=False)
+	fig.update_yaxes(tickprefix = '$', tickformat = ',.3r', secondary_y=True)
+	fig.update_layout(title = f'<b>Price comparison of {first} and {second}</b>')
+	_style_xaxes(fig)
+	fig.update_yaxes(
+		showline=True,
+		linewidth=2,
+		linecolor='black'
+	)
+
+	# Move legend to top right of chart
+	fig.update_layout(legend=dict(
+		orientation="h",
+		yanchor="bottom",
+		y=1.02,
+		xanchor="right",
+		x=1
+	))
+
+	return fig
+# End def
+
+# Two price lines on top and their two volume lines below, each with its own y axis
+def _build_dual_price_volume(meta: dict, data: dict):
+	first, second = meta["first"], meta["second"]
+	fig = make_subplots(
+		rows = 2,
+		shared_xaxes = True,
+		vertical_spacing=0.03,
+		subplot_titles=(f'<b>Price comparison of {first} and {second}</b>', 'Volume'),
+		row_width=[0.2, 0.7],
+		specs=[[{"secondary_y": True}], [{"secondary_y": True}]]
+	)
+
+	# Add traces
+	fig.add_trace(
+		go.Scatter(x=data["first_time"], y=data["first_close"], name=f"Price of {first}", line=dict(color='firebrick')), row=1, col=1,
+		secondary_y=False
+	)
+
+	fig.add_trace(
+		go.Scatter(x=data["second_time"], y=data["second_close"], name=f"Price of {second}", line=dict(color='royalblue')), row=1, col=1,
+		secondary_y=True
+	)
+
+	fig.add_trace(
+		go.Scatter(x=data["first_time"], y=data["first_volume"], showlegend=False, name=f"{first} volume", line=dict(color='firebrick')), row=2, col=1, secondary_y=False
+	)
+
+	fig.add_trace(
+		go.Scatter(x=data["second_time"], y=data["second_volume"], showlegend=False, name=f"{second} volume", line=dict(color='royalblue')), row=2, col=1, secondary_y=True
+	)
+
+	# Configure Axes
+	fig.update_yaxes(title_text=f"<b>{first} price</b>", secondary_y=False, row=1, col=1)
+	fig.update_yaxes(title_text=f"<b>{second} price</b>", secondary_y=True, row=1, col=1)
+	fig.update_yaxes(tickprefix = '$', tickformat = ',.3r', secondary_y=False, row=1, col=1)
+	fig.update_yaxes(tickprefix = '$', tickformat = ',.3r', secondary_y=True, row=1, col=1)
+	_style_xaxes(fig)
+	fig.update_yaxes(
+		showline=True,
+		linewidth=2,
+		linecolor='black',
+		row=1,
+		col=1
+	)
+
+	# Move legend to top right of chart
+	fig.update_layout(legend=dict(
+		orientation="h",
+		yanchor="bottom",
+		y=1.04,
+		xanchor="right",
+		x=1
+	))
+
+	return fig
+# End def
+
+# One line per symbol showing its % change over the range. meta["names"] lists the symbols and
+# data holds "<n>_time" and "<n>_close" for the nth one.
+def _build_compare(meta: dict, data: dict):
+	fig = go.Figure()
+
+	# Add traces
+	for i, name in enumerate(meta["names"]):
+		fig.add_trace(go.Scatter(x=data[f"{i}_time"], y=data[f"{i}_close"], name=name, mode="lines"))
+	# End for
+
+	# Configure Axes
+	fig.update_layout(title = f'<b>Performance of {", ".join(meta["names"])}</b>')
+	_style_xaxes(fig)
+	fig.update_yaxes(
+		showline=True,
+		linewidth=2,
+		linecolor='black',
+		ticksuffix='%',
+		tickformat=',.1f',
+		zeroline=True,
+		zerolinecolor='black'
+	)
+
+	# Move legend to top right of chart
+	fig.update_layout(legend=dict(
+		orientation="h",
+		yanchor="bottom",
+		y=1.02,
+		xanchor="right",
+		x=1
+	))
+
+	return fig
+# End def
+
+plotly_builders = {
+	"price_volume": _build_price_volume,
+	"candlestick": _build_candlestick,
+	"dual_line": _build_dual_line,
+	"dual_price_volume": _build_dual_price_volume,
+	"compare": _build_compare
+}
+
+# Builds the plotly figure for a spec without rendering it
+def build_figure(spec: dict):
+	if spec["kind"] not in plotly_builders:
+		raise ValueError(f"\"{spec['kind']}\" is not a valid plotly chart kind!")
+	# End if
+
+	return plotly_builders[spec["kind"]](spec["meta"], spec["data"])
+# End def
+
+# The simple line graph is drawn with matplotlib rather than plotly
+def _build_matplotlib_line(meta: dict, data: dict):
+	fig, ax = plt.subplots()
+
+	try:
+		pd.Series(data["close"], index=data["time"]).plot(ax=ax, title=meta["title"])
+		ax.set_xlabel('Date & Military Time')
+		ax.set_ylabel('Price')
+	except Exception:
+		plt.close(fig)
+		raise
+	# End try/except block
+
+	return fig
+# End def
+
+# Draws and encodes a matplotlib figure, then frees it
+def _save_matplotlib(fig) -> bytes:
+	try:
+		image_buffer = io.BytesIO()
+		fig.savefig(image_buffer, format="PNG")
+		return image_buffer.getvalue()
+	finally:
+		plt.close(fig)
+	# End try/finally block
+# End def
+
+###
+# Downsampling
+###
+
+# Reduces every series in a spec to roughly meta["max_points"] points. Lines keep their shape with
+# LTTB; candles are re-aggregated into wider OHLC bars, half as many since each needs a few pixels.
+def downsample_data(kind: str, meta: dict, data: dict) -> dict:
+	max_points = meta.get("max_points")
+
+	if not max_points:
+		return data
+	# End if
+
+	if kind == "candlestick":
+		return downsample.ohlc(data["time"], data["open"], data["high"], data["low"], data["close"], data["volume"], max(max_points // 2, 1))
+	# End if
+
+	data = dict(data)
+
+	# Every series has its own "<prefix>time" column, e.g. "time", "first_time" or "0_time"
+	for prefix in [k[:-len("time")] for k in data if k.endswith("time")]:
+		if len(data[prefix + "time"]) <= max_points:
+			continue
+		# End if
+
+		# Series sharing an x axis keep the union of the points each one needs
+		columns = [prefix + c for c in ("close", "volume") if prefix + c in data]
+		keep = np.unique(np.concatenate([downsample.lttb(data[prefix + "time"], data[c], max_points) for c in columns]))
+
+		for column in [prefix + "time"] + columns:
+			data[column] = np.asarray(data[column])[keep]
+		# End for
+	# End for
+
+	return data
+# End def
+
+def _points(data: dict) -> int:
+	return sum(len(v) for k, v in data.items() if k.endswith("time"))
+# End def
+
+###
+# Render workers
+###
+
+# Per process state of a render worker
+_worker = {"renders": 0, "started_ms": 0.0, "kaleido": False}
+
+# kaleido's sync server runs its browser on a background thread. If that thread dies (Chrome
+# missing or crashed), write_image would wait on its queue forever, so check it before using it.
+# The server and its thread are private to kaleido; returns None if this version doesn't have them.
+def _kaleido_thread():
+	import kaleido
+
+	server = getattr(kaleido, "_global_server", None)
+	thread = getattr(server, "_thread", None)
+	return thread if hasattr(server, "is_running") and hasattr(thread, "is_alive") else None
+# End def
+
+def _kaleido_alive() -> bool:
+	import kaleido
+
+	thread = _kaleido_thread()
+	return thread is not None and kaleido._global_server.is_running() and thread.is_alive()
+# End def
+
+def _stop_kaleido() -> None:
+	import kaleido
+
+	try:
+		kaleido.stop_sync_server(silence_warnings=True)
+	except Exception as e:
+		logging.exception(e)
+	# End try/except block
+# End def
+
+# Starts a long lived kaleido browser in this process, so write_image reuses it instead of
+# launching Chromium for every render. If it can't start, or this kaleido version can't be
+# checked on, write_image falls back to a one-off browser.
+def _start_kaleido() -> None:
+	import kaleido
+
+	started = time.perf_counter()
+	_worker["kaleido"] = False
+
+	try:
+		kaleido.start_sync_server(silence_warnings=True)
+		thread = _kaleido_thread()
+
+		if thread is None:
+			logging.warning("Can't check on this kaleido version's renderer, rendering without it")
+		else:
+			# A missing browser kills the server thread straight away
+			thread.join(0.5)
+			_worker["kaleido"] = True
+		# End if/else block
+	except Exception as e:
+		logging.error('Ran into an error trying to start the kaleido renderer!')
+		logging.exception(e)
+	# End try/except block
+
+	if _worker["kaleido"] and not _kaleido_alive():
+		logging.error('The kaleido renderer failed to start, rendering without it!')
+	# End if
+
+	if not _kaleido_alive():
+		_stop_kaleido()
+	# End if
+
+	_worker["started_ms"] = (time.perf_counter() - started) * 1000
+# End def
+
+# Runs once in every new render worker
+def init_worker() -> None:
+	_start_kaleido()
+# End def
+
+# Resident memory of this worker plus the Chromium processes it owns
+def _worker_rss() -> int:
+	process = psutil.Process()
+	rss = process.memory_info().rss
+
+	for child in process.children(recursive=True):
+		try:
+			rss += child.memory_info().rss
+		except psutil.Error:
+			pass
+		# End try/except block
+	# End for
+
+	return rss
+# End def
+
+def _write_png(fig) -> bytes:
+	image_buffer = io.BytesIO()
+	fig.write_image(image_buffer, format="PNG")
+	return image_buffer.getvalue()
+# End def
+
+# Renders a spec to PNG bytes and returns them with timings for each stage.
+# This runs inside a render worker process.
+def render_job(spec: dict) -> tuple:
+	started = time.perf_counter()
+	data = downsample_data(spec["kind"], spec["meta"], spec["data"])
+	downsampled = time.perf_counter()
+
+	if spec["kind"] == "line":
+		fig = _build_matplotlib_line(spec["meta"], data)
+		built = time.perf_counter()
+		png = _save_matplotlib(fig)
+	else:
+		fig = build_figure({"kind": spec["kind"], "meta": spec["meta"], "data": data})
+		built = time.perf_counter()
+
+		if _worker["kaleido"] and not _kaleido_alive():
+			# The browser died since the last render; bring it back before queueing work on it
+			_stop_kaleido()
+			_start_kaleido()
+		# End if
+
+		png = _write_png(fig)
+	# End if/else block
+
+	finished = time.perf_counter()
+	_worker["renders"] += 1
+
+	return png, {
+		"kind": spec["kind"],
+		"points_in": _points(spec["data"]),
+		"points_out": _points(data),
+		"downsample_ms": (downsampled - started) * 1000,
+		"build_ms": (built - downsampled) * 1000,
+		"encode_ms": (finished - built) * 1000,
+		"cold": _worker["renders"] == 1,
+		"startup_ms": _worker["started_ms"],
+		"pid": os.getpid(),
+		"rss": _worker_rss()
+	}
+# End def
+
+# Renders a spec to PNG bytes in the current process
+def render_png(spec: dict) -> bytes:
+	return render_job(spec)[0]
+# End def
+
+# A tiny chart rendered by every new worker so the first real graph finds a warm browser
+warmup_spec = {
+	"kind": "price_volume",
+	"meta": {"title": "Warmup"},
+	"data": {"time": np.array(["2020-01-01", "2020-01-02"], dtype="datetime64[ns]"), "close": np.array([1.0, 2.0]), "volume": np.array([1.0, 1.0])}
+}
@@ -0,0 +1,145 @@
+# Copyright 2020 - Custom License - https://github.com/Tim-Dusek/DiscordStockBot/blob/master/LICENSE
+# Maintained by Tim-Dusek and cdchris12
+
+###
+# Import statements
+###
+
+import os, random, asyncio, logging
+import arrow
+import metrics
+
+###
+# Cryptocompare client
+###
+
+class CryptoCompareError(Exception):
+	pass
+# End class
+
+# HTTP statuses worth trying again: rate limited, or the server having a bad moment
+retry_statuses = {429, 500, 502, 503, 504}
+
+# An async client for the cryptocompare endpoints Stonk Bot uses. Every request goes through one
+# long lived aiohttp session, so connections (and their TLS handshakes) are kept alive and reused.
+# Failed requests are retried with exponential backoff and full jitter. Point `base_url` at a local
+# server to run against a stub.
+class CryptoCompareClient:
+	def __init__(self, base_url: str, api_key="", timeout=10.0, retries=3, backoff=0.25, max_connections=20):
+		self.base_url = base_url.rstrip("/")
+		self.api_key = api_key
+		self.timeout = timeout
+		self.retries = retries
+		self.backoff = backoff
+		self.max_connections = max_connections
+		self.session = None
+		self.requests = 0
+		self.retried = 0
+	# End def
+
+	# The session has to be created inside the running event loop, so it's made on first use
+	def _get_session(self):
+		import aiohttp
+
+		if self.session is None or self.session.closed:
+			headers = {"authorization": f"Apikey {self.api_key}"} if self.api_key else {}
+			self.session = aiohttp.ClientSession(
+				connector=aiohttp.TCPConnector(limit=self.max_connections, keepalive_timeout=60, ttl_dns_cache=300),
+				timeout=aiohttp.ClientTimeout(total=self.timeout, connect=min(self.timeout, 5.0)),
+				headers=headers
+			)
+		# End if
+
+		return self.session
+	# End def
+
+	async def close(self) -> None:
+		if self.session is not None:
+			await self.session.close()
+			self.session = None
+		# End if
+	# End def
+
+	async def _get(self, path: str, params: dict) -> dict:
+		import aiohttp
+
+		session = self._get_session()
+		url = f"{self.base_url}/{path}"
+
+		for attempt in range(self.retries + 1):
+			self.requests += 1
+
+			try:
+				async with session.get(url, params=params) as response:
+					if response.status in retry_statuses and attempt < self.retries:
+						raise aiohttp.ClientResponseError(response.request_info, response.history, status=response.status)
+					# End if
+
+					response.raise_for_status()
+					body = await response.json(content_type=None)
+				# End with
+			except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+				if attempt == self.retries or (isinstance(e, aiohttp.ClientResponseError) and e.status not in retry_statuses):
+					raise
+				# End if
+
+				self.retried += 1
+				delay = random.uniform(0, self.backoff * 2 ** attempt)
+				logging.info(f"cryptocompare request to {path} failed ({e!r}), retrying in {delay:.2f}s")
+				await asyncio.sleep(delay)
+				continue
+			# End try/except block
+
+			if isinstance(body, dict) and body.get("Response") == "Error":
+				raise CryptoCompareError(body.get("Message", "cryptocompare returned an error"))
+			# End if
+
+			return body
+		# End for
+	# End def
+
+	# Returns {"BTC": {"USD": 1.0, ...}} for one coin in one or more currencies
+	async def price(self, coin: str, currency="USD") -> dict:
+		return await self.price_multi([coin], currency)
+	# End def
+
+	# Returns {"BTC": {"USD": 1.0, "KRW": 1.0}, "ETH": {...}} for many coins and currencies in one request
+	async def price_multi(self, coins, currencies="USD") -> dict:
+		coins = [coins] if isinstance(coins, str) else coins
+		currencies = [currencies] if isinstance(currencies, str) else currencies
+		return await self._get("pricemulti", {"fsyms": ",".join(c.upper() for c in coins), "tsyms": ",".join(c.upper() for c in currencies)})
+	# End def
+
+	# Returns the last `limit` minute, hour or day candles for a coin ending at `to_ts`, oldest first
+	async def histo(self, period: str, coin: str, currency="USD", limit=1440, to_ts=None) -> list:
+		if period not in ("minute", "hour", "day"):
+			raise ValueError(f"\"{period}\" is not a vaild period to get historical crypto prices!")
+		# End if
+
+		body = await self._get(f"v2/histo{period}", {
+			"fsym": coin.upper(),
+			"tsym": currency.upper(),
+			"limit": int(limit),
+			"e": "CCCAGG",
+			"toTs": int(arrow.get(to_ts).timestamp()) if to_ts is not None else int(arrow.utcnow().timestamp())
+		})
+
+		return body["Data"]["Data"]
+	# End def
+
+	def stats(self) -> dict:
+		return {
+			"requests": self.requests,
+			"retried": self.retried
+		}
+	# End def
+# End class
+
+client = CryptoCompareClient(
+	base_url=os.environ.get("CryptoCompare_URL", "https://min-api.cryptocompare.com/data"),
+	api_key=os.environ.get("CryptoCompare_API_Key", os.environ.get("CRYPTOCOMPARE_API_KEY", "")),
+	timeout=float(os.environ.get("CryptoCompare_Timeout", 10)),
+	retries=int(os.environ.get("CryptoCompare_Retries", 3))
+)
+
+metrics.collectors.append(lambda: [(f"stonkbot_cryptocompare_{k}_total", {}, v) for k, v in client.stats().items()])
@@ -0,0 +1,270 @@
+# Copyright 2020 - Custom License - https://github.com/Tim-Dusek/DiscordStockBot/blob/master/LICENSE
+# Maintained by Tim-Dusek and cdchris12
+
+###
+# Import statements
+###
+
+import os, json, time, random, asyncio, logging
+import crypto_client, data_access, metrics
+
+###
+# Crypto feed
+###
+
+# Raised when cryptocompare closes the stream on us. `kind` is the message TYPE, "401" for a
+# missing or unusable API key and "429" for too many connections or subscriptions.
+class FeedError(Exception):
+	def __init__(self, message: str, kind: str):
+		super().__init__(message)
+		self.kind = kind
+	# End def
+# End class
+
+# Keeps the last price of a set of cryptocurrencies in memory so /cp and /kimchi can answer
+# without a round trip. Prices stream in over a websocket when there's a stream URL (cryptocompare's
+# streamer needs an API key); otherwise, or while the stream is down, the whole set is polled with one
+# batched pricemulti request. Prices older than `max_age` are treated as missing, and anything
+# missing, including coins outside the set, is fetched on demand.
+#
+# Point `url` at a local server to run against a fake stream. It should speak the cryptocompare
+# streamer protocol: a {"action": "SubAdd", "subs": [...]} message in, {"TYPE": "5", ...} out.
+class CryptoFeed:
+	def __init__(self, coins: list, currencies: list, url: str, api_key="", poll_interval=30.0, max_age=60.0, rate_limit_backoff=300.0):
+		self.coins = [coin.upper() for coin in coins]
+		self.currencies = [currency.upper() for currency in currencies]
+		self.url = url
+		self.api_key = api_key
+		self.poll_interval = poll_interval
+		self.max_age = max_age
+		self.rate_limit_backoff = rate_limit_backoff
+		self.prices = {}
+		self.task = None
+		self.streaming = False
+		self.updates = 0
+		self.polls = 0
+		self.reconnects = 0
+		self.hits = 0
+		self.misses = 0
+	# End def
+
+	def start(self) -> None:
+		# on_ready fires again after every reconnect
+		if self.task is None and self.coins:
+			self.task = asyncio.ensure_future(self._run())
+		# End if
+	# End def
+
+	# Only pairs in the followed set are kept, so the table stays small and every entry keeps getting refreshed
+	def _store(self, coin: str, currency: str, price: float) -> None:
+		if coin in self.coins and currency in self.currencies:
+			self.prices[(coin, currency)] = (price, time.monotonic())
+		# End if
+	# End def
+
+	# Returns the price of a coin in a currency from memory, or None if it's missing or stale
+	def price(self, coin: str, currency="USD"):
+		entry = self.prices.get((coin.upper(), currency.upper()))
+
+		if entry is None or time.monotonic() - entry[1] > self.max_age:
+			return None
+		# End if
+
+		return entry[0]
+	# End def
+
+	# Returns {"ETH": {"USD": 1.0, "KRW": 1.0}} like cryptocompare's pricemulti. Prices held in
+	# memory are served from it and the rest are fetched in one batched request.
+	async def get_prices(self, coins: list, currencies: list) -> dict:
+		result = {}
+		missing_coins, missing_currencies = set(), set()
+
+		for coin in coins:
+			for currency in currencies:
+				price = self.price(coin, currency)
+
+				if price is None:
+					missing_coins.add(coin.upper())
+					missing_currencies.add(currency.upper())
+				else:
+					result.setdefault(coin.upper(), {})[currency.upper()] = price
+				# End if/else block
+			# End for
+		# End for
+
+		if not missing_coins:
+			self.hits += 1
+			return result
+		# End if
+
+		self.misses += 1
+		fetched = await data_access.get_crypto_prices(sorted(missing_coins), sorted(missing_currencies))
+
+		for coin, quotes in fetched.items():
+			for currency, price in quotes.items():
+				self._store(coin, currency, float(price))
+				result.setdefault(coin, {})[currency] = float(price)
+			# End for
+		# End for
+
+		return result
+	# End def
+
+	def _handle(self, data: dict) -> None:
+		kind = data.get("TYPE")
+
+		# Current aggregate price updates; ones without a PRICE only carry volume changes
+		if kind == "5":
+			if "PRICE" in data:
+				self._store(data["FROMSYMBOL"], data["TOSYMBOL"], float(data["PRICE"]))
+				self.updates += 1
+			# End if
+		elif kind in ("401", "429"):
+			raise FeedError(data.get("MESSAGE", "cryptocompare closed the stream"), kind)
+		elif kind == "500":
+			logging.warning(f"cryptocompare stream error: {data.get('MESSAGE')} {data.get('PARAMETER', '')}")
+		# End if/elif block
+	# End def
+
+	async def _stream(self) -> None:
+		import aiohttp
+
+		url = self.url
+
+		if self.api_key and "api_key=" not in url:
+			url += ("&" if "?" in url else "?") + f"api_key={self.api_key}"
+		# End if
+
+		async with aiohttp.ClientSession() as session:
+			async with session.ws_connect(url, heartbeat=30) as ws:
+				await ws.send_json({
+					"action": "SubAdd",
+					"subs": [f"5~CCCAGG~{coin}~{currency}" for coin in self.coins for currency in self.currencies]
+				})
+				self.streaming = True
+				logging.info(f"Streaming prices for {len(self.coins)} cryptocurrencies")
+
+				try:
+					async for message in ws:
+						if message.type != aiohttp.WSMsgType.TEXT:
+							break
+						# End if
+
+						self._handle(json.loads(message.data))
+					# End for
+				finally:
+					self.streaming = False
+				# End try/finally block
+			# End with
+		# End with
+	# End def
+
+	async def _poll(self) -> None:
+		try:
+			fetched = await data_access.get_crypto_prices(self.coins, self.currencies)
+			self.polls += 1
+
+			for coin, quotes in fetched.items():
+				for currency, price in quotes.items():
+					self._store(coin, currency, float(price))
+				# End for
+			# End for
+		except Exception as e:
+			logging.error('Ran into an error trying to poll crypto prices!')
+			logging.exception(e)
+		# End try/except block
+	# End def
+
+	# Polls every poll_interval for `seconds`, always at least once
+	async def _poll_for(self, seconds: float) -> None:
+		deadline = time.monotonic() + seconds
+
+		while True:
+			await self._poll()
+			remaining = deadline - time.monotonic()
+
+			if remaining <= 0:
+				return
+			# End if
+
+			await asyncio.sleep(min(self.poll_interval, remaining))
+		# End while
+	# End def
+
+	# Streams for as long as the connection holds, and polls while it's down. Attempts back off
+	# exponentially with jitter up to a minute while the stream keeps failing. Being rate limited
+	# backs off from rate_limit_backoff up to an hour instead, since reconnecting sooner only keeps
+	# the limit in place, and a rejected API key won't start working, so that stops streaming for good.
+	async def _run(self) -> None:
+		failures = 0
+		limited = 0
+
+		while True:
+			if not self.url:
+				await self._poll()
+				await asyncio.sleep(self.poll_interval)
+				continue
+			# End if
+
+			started = time.monotonic()
+			delay = None
+
+			try:
+				await self._stream()
+			except asyncio.CancelledError:
+				raise
+			except FeedError as e:
+				if e.kind == "401":
+					logging.error(f'cryptocompare refused the price stream ({e}), polling crypto prices instead!')
+					self.url = ""
+					continue
+				# End if
+
+				limited += 1
+				delay = min(3600, self.rate_limit_backoff * 2 ** (limited - 1))
+				logging.warning(f'cryptocompare rate limited the price stream ({e}), trying again in {delay:.0f}s')
+			except Exception as e:
+				logging.error(f'Ran into an error streaming crypto prices from {self.url}!')
+				logging.exception(e)
+			# End try/except block
+
+			# A connection that held for a while was healthy, so start backing off afresh
+			healthy = time.monotonic() - started > 60
+			failures = 0 if healthy else failures + 1
+
+			if healthy and delay is None:
+				limited = 0
+			# End if
+
+			self.reconnects += 1
+			await self._poll_for(delay if delay is not None else random.uniform(0, min(60, 2 ** failures)))
+		# End while
+	# End def
+
+	def stats(self) -> dict:
+		return {
+			"pairs": len(self.prices),
+			"streaming": int(self.streaming),
+			"updates": self.updates,
+			"polls": self.polls,
+			"reconnects": self.reconnects,
+			"hits": self.hits,
+			"misses": self.misses
+		}
+	# End def
+# End class
+
+feed = CryptoFeed(
+	coins=[coin for coin in os.environ.get("Crypto_Feed_Coins", "BTC,ETH").split(",") if coin],
+	currencies=[currency for currency in os.environ.get("Crypto_Feed_Currencies", "USD,KRW").split(",") if currency],
+	url=os.environ.get("Crypto_Stream_URL", "wss://streamer.cryptocompare.com/v2" if crypto_client.client.api_key else ""),
+	api_key=crypto_client.client.api_key,
+	poll_interval=float(os.environ.get("Crypto_Poll_Interval", 30)),
+	max_age=float(os.environ.get("Crypto_Max_Age", 60)),
+	rate_limit_backoff=float(os.environ.get("Crypto_Rate_Limit_Backoff", 300))
+)
+
+metrics.collectors.append(lambda: [
+	(f"stonkbot_crypto_feed_{k}" + ("_total" if k in ("updates", "polls", "reconnects", "hits", "misses") else ""), {}, v)
+	for k, v in feed.stats().items()
+])
@@ -0,0 +1,612 @@
+# Copyright 2020 - Custom License - https://github.com/Tim-Dusek/DiscordStockBot/blob/master/LICENSE
+# Maintained by Tim-Dusek and cdchris12
+
+###
+# Import statements
+###
+
+import os, re, time, asyncio, functools
+import arrow
+import cache, crypto_client, market_calendar, metrics, singleflight, ohlcv_store
+from concurrent.futures import ThreadPoolExecutor
+
+# yfinance, pandas and googlesearch are imported where they're
+# used, in the worker threads, so they load on first use instead of at bot startup
+
+###
+# Worker pool
+###
+
+# The upstream libraries Stonk Bot uses (yfinance, googlesearch) are synchronous,
+# so calls are handed to a bounded pool of worker threads and awaited from the event loop
+max_workers = int(os.environ.get("Data_Workers", 8))
+executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="stonk-data")
+
+# Quick lookups (quotes, prices) get their own small pool, so they are never
+# stuck behind history downloads for graphs
+fast_workers = int(os.environ.get("Fast_Data_Workers", 4))
+fast_executor = ThreadPoolExecutor(max_workers=fast_workers, thread_name_prefix="stonk-fast")
+
+async def _run_in(pool: ThreadPoolExecutor, func, args: tuple, kwargs: dict):
+	loop = asyncio.get_running_loop()
+	started = time.perf_counter()
+
+	try:
+		return await loop.run_in_executor(pool, functools.partial(func, *args, **kwargs))
+	finally:
+		metrics.upstream_seconds.observe(time.perf_counter() - started, getattr(func, "__name__", "call"))
+	# End try/finally block
+# End def
+
+async def run_blocking(func, *args, **kwargs):
+	return await _run_in(executor, func, args, kwargs)
+# End def
+
+async def run_fast(func, *args, **kwargs):
+	return await _run_in(fast_executor, func, args, kwargs)
+# End def
+
+###
+# OHLCV store
+###
+
+_store = None
+
+# Bars persist on disk under Data_Dir, capped at Store_MB
+def get_store() -> ohlcv_store.OHLCVStore:
+	global _store
+
+	if _store is None:
+		_store = ohlcv_store.OHLCVStore(
+			os.path.join(os.environ.get("Data_Dir", "data"), "ohlcv.sqlite3"),
+			int(os.environ.get("Store_MB", 256)) * 1024 * 1024
+		)
+	# End if
+
+	return _store
+# End def
+
+###
+# Stocks
+###
+
+def _history(company: str, interval: str, start=None, end=None, period=None, prepost=False):
+	import yfinance as yf
+
+	ticker = yf.Ticker(company)
+
+	if period:
+		return ticker.history(period=period, interval=interval, prepost=prepost)
+	elif start and end:
+		return ticker.history(start=start, end=end, interval=interval, prepost=prepost)
+	else:
+		return None
+	# End if/elif/else block
+# End def
+
+# Bar sizes kept in the OHLCV store, with how far back yfinance serves them.
+# A stored series that ends further back than that can't be extended and is fetched again in full.
+stored_intervals = {"1d": None, "1h": 730 * 86400, "5m": 60 * 86400, "1m": 7 * 86400}
+
+# Converts a yfinance period into the epoch time its range starts at, or None if it can't be.
+# Periods under a week count trading days rather than calendar days, so they always go upstream.
+def period_start(period: str, now=None):
+	now = now or arrow.utcnow()
+
+	if period == "max":
+		return 0
+	# End if
+
+	match = re.fullmatch(r"(\d+)(d|mo|y)", period)
+
+	if not match or (match.group(2) == "d" and int(match.group(1)) < 7):
+		return None
+	# End if
+
+	unit = {"d": "days", "mo": "months", "y": "years"}[match.group(2)]
+	return int(now.shift(**{unit: -int(match.group(1))}).timestamp())
+# End def
+
+# Converts a yfinance history DataFrame into OHLCV store rows
+def _frame_rows(res) -> list:
+	return list(zip(
+		res.index.as_unit("s").asi8.tolist(),
+		res["Open"].tolist(),
+		res["High"].tolist(),
+		res["Low"].tolist(),
+		res["Close"].tolist(),
+		res["Volume"].tolist(),
+		[None] * len(res)
+	))
+# End def
+
+# Converts OHLCV store rows back into a DataFrame shaped like a yfinance history result
+def _rows_frame(rows: list, interval: str):
+	import pandas as pd
+
+	res = pd.DataFrame(rows, columns=["ts", "Open", "High", "Low", "Close", "Volume", "VolumeTo"])
+	res.index = pd.DatetimeIndex(pd.to_datetime(res["ts"], unit="s", utc=True)).tz_convert("America/New_York")
+	res.index.name = "Date" if interval == "1d" else "Datetime"
+	return res.drop(columns=["ts", "VolumeTo"])
+# End def
+
+# True if a split or dividend landed after `since`. yfinance back-adjusts every earlier bar when
+# that happens, so the stored bars no longer line up with new ones.
+def _adjusted_since(res, since: int) -> bool:
+	newer = res[res.index.as_unit("s").asi8 > since]
+
+	for column in ("Dividends", "Stock Splits"):
+		if column in newer and (newer[column] != 0).any():
+			return True
+		# End if
+	# End for
+
+	return False
+# End def
+
+# Returns price history like _history, but serves it from the OHLCV store where possible.
+# Only the bars from the last stored one on are fetched upstream; the last stored bar is fetched
+# again since it may have still been live when it was written.
+def _stored_history(company: str, interval: str, start=None, end=None, period=None, prepost=False):
+	import yfinance as yf
+
+	now = arrow.utcnow()
+
+	if interval not in stored_intervals:
+		return _history(company, interval, start=start, end=end, period=period, prepost=prepost)
+	# End if
+
+	if period:
+		want_start, want_end = period_start(period, now), None
+	else:
+		want_start, want_end = int(arrow.get(start).timestamp()), int(arrow.get(end).timestamp())
+	# End if/else block
+
+	if want_start is None:
+		return _history(company, interval, start=start, end=end, period=period, prepost=prepost)
+	# End if
+
+	store = get_store()
+	series = f"stock:{company.upper()}:{interval}:{'ext' if prepost and interval != '1d' else 'rth'}"
+	coverage = store.coverage(series)
+	retention = stored_intervals[interval]
+	extendable = (
+		coverage is not None
+		and (coverage[2] or coverage[0] <= want_start)
+		and (retention is None or coverage[1] >= now.timestamp() - retention)
+	)
+
+	if extendable:
+		delta = yf.Ticker(company).history(start=arrow.get(coverage[1]).datetime, interval=interval, prepost=prepost)
+
+		if _adjusted_since(delta, coverage[1]):
+			extendable = False
+		else:
+			store.write(series, _frame_rows(delta))
+		# End if/else block
+	# End if
+
+	if not extendable:
+		res = _history(company, interval, start=start, end=end, period=period, prepost=prepost)
+
+		if res is None or res.empty:
+			return res
+		# End if
+
+		store.write(series, _frame_rows(res), reset=True, complete=(period == "max"))
+	# End if
+
+	return _rows_frame(store.read(series, want_start, want_end), interval)
+# End def
+
+# Length of each yfinance interval in seconds
+interval_seconds = {
+	"1m": 60, "2m": 120, "5m": 300, "15m": 900, "30m": 1800, "60m": 3600, "90m": 5400, "1h": 3600,
+	"1d": 86400, "5d": 432000, "1wk": 604800, "1mo": 2678400, "3mo": 7862400
+}
+
+# History DataFrames are cached in memory, bounded by History_Cache_MB
+history_cache = cache.Cache(
+	"history",
+	int(os.environ.get("History_Cache_MB", 64)) * 1024 * 1024,
+	sizeof=lambda res: int(res.memory_usage(index=True, deep=True).sum())
+)
+history_flight = singleflight.SingleFlight("history")
+
+# Builds the history cache key. Commands pass start/end relative to "now", so they are floored
+# to the interval (at most a day) to let repeated commands within the same bar share an entry.
+def history_key(company: str, interval: str, start=None, end=None, period=None, prepost=False) -> tuple:
+	if period:
+		window = period
+	else:
+		step = min(interval_seconds.get(interval, 60), 86400)
+		window = (
+			int(arrow.get(start).timestamp()) // step * step,
+			int(arrow.get(end).timestamp()) // step * step
+		)
+	# End if/else block
+
+	return (company.upper(), window, interval, prepost)
+# End def
+
+# Returns the epoch time a history result fetched at `now` goes stale.
+# Nothing changes while the market is closed, so closed-market results live until the next open.
+# During a session daily bars live until the close and intraday bars for one interval (at most 15 minutes).
+def history_expiry(interval: str, prepost=False, now=None) -> float:
+	now = now or arrow.utcnow()
+
+	if not market_calendar.is_open(now, prepost=prepost):
+		return market_calendar.next_open(now, prepost=prepost).timestamp()
+	# End if
+
+	session_close = market_calendar.next_close(now, prepost=prepost).timestamp()
+	step = interval_seconds.get(interval, 60)
+
+	if step >= 86400:
+		return session_close
+	# End if
+
+	return min(now.timestamp() + min(step, 900), session_close)
+# End def
+
+# Returns a DataFrame of price history for a ticker symbol, or None if no time range was given.
+# The DataFrame may be shared with other callers through the cache, so it must not be modified.
+@metrics.timed("fetch")
+async def get_history(company: str, interval: str, start=None, end=None, period=None, prepost=False):
+	if not period and not (start and end):
+		return None
+	# End if
+
+	key = history_key(company, interval, start=start, end=end, period=period, prepost=prepost)
+	res = history_cache.get(key)
+
+	if res is not None:
+		return res
+	# End if
+
+	return await history_flight.do(key, _load_history, key, company, interval, start, end, period, prepost)
+# End def
+
+async def _load_history(key: tuple, company: str, interval: str, start, end, period, prepost: bool):
+	res = await run_blocking(_stored_history, company, interval, start=start, end=end, period=period, prepost=prepost)
+
+	if res is not None and not res.empty:
+		history_cache.put(key, res, expires_at=history_expiry(interval, prepost=prepost))
+	# End if
+
+	return res
+# End def
+
+# Downloads history for many ticker symbols in one threaded yf.download call and splits it per symbol.
+# yf.download lines every symbol up on one index, so each symbol's frame drops the rows it has no bars for.
+# yf.download strips the timezone from daily bars by default, which would read as UTC midnight
+# (8pm the day before in New York), so it's kept, and any naive index left is taken as Eastern.
+def _download(companies: list, interval: str, start=None, end=None, period=None, prepost=False) -> dict:
+	import pandas as pd, yfinance as yf
+
+	if period:
+		res = yf.download(companies, period=period, interval=interval, prepost=prepost, group_by="ticker", threads=True, auto_adjust=True, ignore_tz=False, progress=False)
+	else:
+		res = yf.download(companies, start=start, end=end, interval=interval, prepost=prepost, group_by="ticker", threads=True, auto_adjust=True, ignore_tz=False, progress=False)
+	# End if/else block
+
+	if isinstance(res.index, pd.DatetimeIndex) and res.index.tz is None:
+		res.index = res.index.tz_localize("America/New_York")
+	# End if
+
+	frames = {}
+
+	for company in companies:
+		if isinstance(res.columns, pd.MultiIndex):
+			frame = res[company] if company in res.columns.get_level_values(0) else res.iloc[0:0, 0:0]
+		else:
+			frame = res
+		# End if/else block
+
+		frames[company] = frame.dropna(how="all")
+	# End for
+
+	return frames
+# End def
+
+# Returns {symbol: history DataFrame} for several ticker symbols, in the order given.
+# Symbols in the history cache are served from it and the rest are fetched in one batched request,
+# so latency stays roughly flat as the number of symbols grows.
+@metrics.timed("fetch")
+async def get_histories(companies: list, interval: str, start=None, end=None, period=None, prepost=False):
+	if not period and not (start and end):
+		return None
+	# End if
+
+	companies = list(dict.fromkeys(company.upper() for company in companies))
+	results = {}
+	missing = []
+
+	for company in companies:
+		res = history_cache.get(history_key(company, interval, start=start, end=end, period=period, prepost=prepost))
+
+		if res is None:
+			missing.append(company)
+		else:
+			results[company] = res
+		# End if/else block
+	# End for
+
+	if missing:
+		batch_key = (tuple(missing),) + history_key("", interval, start=start, end=end, period=period, prepost=prepost)[1:]
+		results.update(await history_flight.do(batch_key, _load_histories, missing, interval, start, end, period, prepost))
+	# End if
+
+	return {company: results[company] for company in companies}
+# End def
+
+async def _load_histories(companies: list, interval: str, start, end, period, prepost: bool) -> dict:
+	frames = await run_blocking(_download, companies, interval, start=start, end=end, period=period, prepost=prepost)
+
+	for company, res in frames.items():
+		if not res.empty:
+			history_cache.put(
+				history_key(company, interval, start=start, end=end, period=period, prepost=prepost),
+				res,
+				expires_at=history_expiry(interval, prepost=prepost)
+			)
+		# End if
+	# End for
+
+	return frames
+# End def
+
+# Last prices are cached on their own, as the history cache keeps minute bars for up to a minute
+# and a live price shouldn't be older than whoever polls it asks for
+last_price_cache = cache.Cache("last_price", 1024 * 1024, sizeof=lambda price: 64)
+last_price_flight = singleflight.SingleFlight("last_price")
+
+# Returns {symbol: last traded price} for several ticker symbols, including pre and post market
+# trades, from one batched minute history request. Prices are reused for up to `max_age` seconds
+# while any session is open. Symbols without any bars are left out.
+@metrics.timed("fetch")
+async def get_last_prices(companies: list, max_age=15.0) -> dict:
+	companies = list(dict.fromkeys(company.upper() for company in companies))
+	prices = {}
+	missing = []
+
+	for company in companies:
+		price = last_price_cache.get((company, max_age))
+
+		if price is None:
+			missing.append(company)
+		else:
+			prices[company] = price
+		# End if/else block
+	# End for
+
+	if missing:
+		prices.update(await last_price_flight.do((tuple(missing), max_age), _load_last_prices, missing, max_age))
+	# End if
+
+	return {company: prices[company] for company in companies if company in prices}
+# End def
+
+async def _load_last_prices(companies: list, max_age: float) -> dict:
+	# Measured from when the request went out, so a poller asking every `max_age` seconds always gets a fresh price
+	now = arrow.utcnow()
+	frames = await run_blocking(_download, companies, "1m", period="1d", prepost=True)
+	prices = {}
+
+	if market_calendar.is_open(now, prepost=True):
+		expires_at = now.timestamp() + max_age
+	else:
+		expires_at = market_calendar.next_open(now, prepost=True).timestamp()
+	# End if/else block
+
+	for company, res in frames.items():
+		closes = res["Close"].dropna() if "Close" in res else ()
+
+		if len(closes):
+			prices[company] = float(closes.iloc[-1])
+			last_price_cache.put((company, max_age), prices[company], expires_at=expires_at)
+		# End if
+	# End for
+
+	return prices
+# End def
+
+# `ticker.info` is one of yfinance's slowest calls, so each fetch is split into two cached views:
+# the quote fields that move during the day, and the full profile (sector, summary, employees, ...)
+quote_fields = (
+	"ask", "bid", "volume", "open", "dayHigh", "dayLow", "previousClose",
+	"regularMarketPrice", "currentPrice", "averageVolume", "beta"
+)
+quote_ttl = int(os.environ.get("Quote_TTL", 15))
+profile_ttl = int(os.environ.get("Profile_TTL", 86400))
+
+quote_cache = cache.Cache("quote", 4 * 1024 * 1024, sizeof=lambda info: len(repr(info)))
+profile_cache = cache.Cache("profile", 32 * 1024 * 1024, sizeof=lambda info: len(repr(info)))
+quote_flight = singleflight.SingleFlight("quote")
+
+# Quotes move through pre and post market, but nothing moves overnight or on weekends
+def quote_expiry(now=None) -> float:
+	now = now or arrow.utcnow()
+
+	if market_calendar.is_open(now, prepost=True):
+		return now.timestamp() + quote_ttl
+	# End if
+
+	return market_calendar.next_open(now, prepost=True).timestamp()
+# End def
+
+def _info(company: str) -> dict:
+	import yfinance as yf
+	return yf.Ticker(company).info
+# End def
+
+async def _fetch_info(company: str) -> dict:
+	return await quote_flight.do(company.upper(), _load_info, company)
+# End def
+
+async def _load_info(company: str) -> dict:
+	info = await run_fast(_info, company)
+
+	quote_cache.put(company.upper(), {f: info[f] for f in quote_fields if f in info}, expires_at=quote_expiry())
+	profile_cache.put(company.upper(), info, expires_at=time.time() + profile_ttl)
+
+	return info
+# End def
+
+# Returns the fast changing quote fields (bid/ask/volume/...) for a ticker symbol
+@metrics.timed("fetch")
+async def get_quote(company: str) -> dict:
+	quote = quote_cache.get(company.upper())
+
+	if quote is None:
+		info = await _fetch_info(company)
+		quote = {f: info[f] for f in quote_fields if f in info}
+	# End if
+
+	return quote
+# End def
+
+# Returns the full `info` dict for a ticker symbol. Quote fields in it may be up to a day old.
+@metrics.timed("fetch")
+async def get_profile(company: str) -> dict:
+	profile = profile_cache.get(company.upper())
+
+	if profile is None:
+		profile = await _fetch_info(company)
+	# End if
+
+	return profile
+# End def
+
+# Returns the analyst recommendations yfinance has for a ticker symbol
+def _recommendations(company: str):
+	import yfinance as yf
+	return yf.Ticker(company).recommendations
+# End def
+
+@metrics.timed("fetch")
+async def get_recommendations(company: str):
+	return await run_blocking(_recommendations, company)
+# End def
+
+###
+# Crypto
+###
+
+# Length of each cryptocompare candle in seconds
+crypto_seconds = {"minute": 60, "hour": 3600, "day": 86400}
+
+def _crypto_coverage(series: str):
+	return get_store().coverage(series)
+# End def
+
+def _store_crypto_history(series: str, res: list, reset: bool, start_ts: int, end_ts: int) -> list:
+	store = get_store()
+	store.write(series, [
+		(int(f['time']), float(f['open']), float(f['high']), float(f['low']), float(f['close']), float(f['volumefrom']), float(f['volumeto']))
+		for f in res
+	], reset=reset)
+
+	return [
+		{"time": ts, "open": o, "high": h, "low": l, "close": c, "volumefrom": vf, "volumeto": vt}
+		for ts, o, h, l, c, vf, vt in store.read(series, start_ts, end_ts)
+	]
+# End def
+
+# Returns the last `units` candles for a cryptocurrency, serving them from the OHLCV store where
+# possible. Only the candles from the last stored one on are fetched upstream.
+async def _stored_crypto_history(crypto: str, period: str, units: int, to_ts) -> list:
+	if period not in crypto_seconds:
+		raise ValueError(f"\"{period}\" is not a vaild period to get historical crypto prices!")
+	# End if
+
+	step = crypto_seconds[period]
+	end_ts = int(arrow.get(to_ts).timestamp()) // step * step
+	want_start = end_ts - units * step
+
+	series = f"crypto:{crypto.upper()}:{period}"
+	coverage = await run_blocking(_crypto_coverage, series)
+
+	if coverage is not None and coverage[0] <= want_start <= coverage[1]:
+		res = await crypto_client.client.histo(period, crypto, 'USD', limit=max((end_ts - coverage[1]) // step, 1), to_ts=to_ts)
+		reset = False
+	else:
+		res = await crypto_client.client.histo(period, crypto, 'USD', limit=units, to_ts=to_ts)
+		reset = True
+	# End if/else block
+
+	if not res:
+		return res
+	# End if
+
+	return await run_blocking(_store_crypto_history, series, res, reset, want_start, end_ts)
+# End def
+
+crypto_flight = singleflight.SingleFlight("crypto_history")
+
+# Returns the last `units` candles for a cryptocurrency, ending at `to_ts` (defaults to now).
+# Identical requests ending within the same minute share one upstream call.
+@metrics.timed("fetch")
+async def get_crypto_history(crypto: str, period: str, units: int, to_ts=None) -> list:
+	if to_ts is None:
+		to_ts = arrow.utcnow().datetime
+	# End if
+
+	key = (crypto.upper(), period, units, int(arrow.get(to_ts).timestamp()) // 60)
+	return await crypto_flight.do(key, _stored_crypto_history, crypto, period, units, to_ts)
+# End def
+
+# Returns prices for many cryptocurrencies in many currencies from one request,
+# e.g. {"ETH": {"USD": 1.0, "KRW": 1.0}}
+@metrics.timed("fetch")
+async def get_crypto_prices(cryptos: list, currencies: list) -> dict:
+	return await crypto_client.client.price_multi(cryptos, currencies)
+# End def
+
+###
+# News
+###
+
+# Returns the first `num` Google search results for a query
+def _search(query: str, num: int) -> list:
+	from googlesearch import search
+	return list(search(query, tld='com', lang='en', num=num, start=0, stop=num, pause=1.0))
+# End def
+
+# Search results barely move over a few minutes, so they are cached per normalized query
+news_ttl = int(os.environ.get("News_TTL", 600))
+news_cache = cache.Cache("news", 1024 * 1024, sizeof=lambda links: sum(len(link) for link in links))
+news_flight = singleflight.SingleFlight("news")
+
+def news_key(query: str, num: int) -> tuple:
+	return (" ".join(query.lower().split()), num)
+# End def
+
+# Returns the cached results for a query, or None if it has to be searched. Only peeks, as the
+# search_news call that follows counts the hit or miss.
+def cached_news(query: str, num=3):
+	return news_cache.peek(news_key(query, num))
+# End def
+
+@metrics.timed("fetch")
+async def search_news(query: str, num=3) -> list:
+	key = news_key(query, num)
+	links = news_cache.get(key)
+
+	if links is None:
+		links = await news_flight.do(key, _load_news, key, num)
+	# End if
+
+	return links
+# End def
+
+async def _load_news(key: tuple, num: int) -> list:
+	links = await run_blocking(_search, key[0], num)
+
+	# Don't hold on to an empty page, Google may just be throttling us
+	if links:
+		news_cache.put(key, links, expires_at=time.time() + news_ttl)
+	# End if
+
+	return links
+# End def
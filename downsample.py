@@ -0,0 +1,84 @@
+# Copyright 2020 - Custom License - https://github.com/Tim-Dusek/DiscordStockBot/blob/master/LICENSE
+# Maintained by Tim-Dusek and cdchris12
+
+###
+# Import statements
+###
+
+import numpy as np
+
+###
+# Downsampling
+###
+
+# Converts an x axis (numbers or datetime64) into float64 so triangle areas can be computed
+def _numeric(x) -> np.ndarray:
+	x = np.asarray(x)
+
+	if np.issubdtype(x.dtype, np.datetime64):
+		return x.astype("datetime64[ns]").astype(np.int64).astype(np.float64)
+	# End if
+
+	return x.astype(np.float64)
+# End def
+
+# Largest-Triangle-Three-Buckets: returns the indices of `threshold` points that keep the visual
+# shape of the line through (x, y). The first and last points are always kept, and from every
+# bucket in between the point forming the largest triangle with the previously kept point and the
+# average of the next bucket is picked.
+def lttb(x, y, threshold: int) -> np.ndarray:
+	n = len(y)
+
+	if threshold >= n or threshold < 3:
+		return np.arange(n)
+	# End if
+
+	x = _numeric(x)
+	y = np.asarray(y, dtype=np.float64)
+
+	# Bucket edges for the n - 2 points between the first and last
+	edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+	counts = np.diff(edges)
+
+	# Average of each bucket, used as the third corner of the triangles in the bucket before it.
+	# The final bucket looks ahead to the last point instead.
+	avg_x = np.append(np.add.reduceat(x[:n - 1], edges[:-1]) / counts, x[-1])[1:]
+	avg_y = np.append(np.add.reduceat(y[:n - 1], edges[:-1]) / counts, y[-1])[1:]
+
+	selected = np.empty(threshold, dtype=np.int64)
+	selected[0] = 0
+	selected[-1] = n - 1
+	previous = 0
+
+	for i in range(threshold - 2):
+		start, end = edges[i], edges[i + 1]
+		px, py = x[previous], y[previous]
+		areas = np.abs((px - avg_x[i]) * (y[start:end] - py) - (px - x[start:end]) * (avg_y[i] - py))
+		previous = start + int(areas.argmax())
+		selected[i + 1] = previous
+	# End for
+
+	return selected
+# End def
+
+# Re-aggregates OHLCV bars into at most `buckets` wider bars: each keeps its first time and open,
+# the highest high, the lowest low, its last close and the summed volume
+def ohlc(time, open_, high, low, close, volume, buckets: int) -> dict:
+	n = len(close)
+
+	if buckets >= n or buckets < 1:
+		return {"time": time, "open": open_, "high": high, "low": low, "close": close, "volume": volume}
+	# End if
+
+	starts = np.linspace(0, n, buckets, endpoint=False).astype(np.int64)
+	ends = np.append(starts[1:], n) - 1
+
+	return {
+		"time": np.asarray(time)[starts],
+		"open": np.asarray(open_)[starts],
+		"high": np.maximum.reduceat(np.asarray(high), starts),
+		"low": np.minimum.reduceat(np.asarray(low), starts),
+		"close": np.asarray(close)[ends],
+		"volume": np.add.reduceat(np.asarray(volume), starts)
+	}
+# End def
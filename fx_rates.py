@@ -0,0 +1,123 @@
+# Copyright 2020 - Custom License - https://github.com/Tim-Dusek/DiscordStockBot/blob/master/LICENSE
+# Maintained by Tim-Dusek and cdchris12
+
+###
+# Import statements
+###
+
+import os, time, logging
+import data_access, metrics, scheduler, singleflight
+
+###
+# FX rates
+###
+
+# The ECB publishes its reference rates once a day, around 16:00 CET on working days
+ecb_url = "https://www.ecb.europa.eu/stats/eurofxref/eurofxref.zip"
+refresh_offset = 15 * 3600 + 30 * 60
+
+# Keeps the latest ECB reference rate of every currency, as units per euro, so converting is two
+# dict lookups. Only the single day rates file is parsed, never the full history
+# currency_converter loads by default. The table is swapped whole on refresh; if a refresh
+# fails the old rates stay in use, and before the first download the rates bundled with
+# currency_converter are used.
+class FXRates:
+	def __init__(self, url: str, timeout=30.0):
+		self.url = url
+		self.timeout = timeout
+		self.rates = None
+		self.date = None
+		self.loaded_at = None
+		self.refreshes = 0
+		self.failures = 0
+		self.flight = singleflight.SingleFlight("fx_rates")
+	# End def
+
+	# Downloads and parses the rates file, returning (date, {currency: units per euro})
+	def _download(self) -> tuple:
+		from urllib.request import urlopen
+		from currency_converter import CurrencyConverter
+		from currency_converter.currency_converter import get_lines_from_zip
+
+		content = urlopen(self.url, timeout=self.timeout).read()
+		converter = CurrencyConverter(currency_file=None)
+		converter.load_lines(get_lines_from_zip(content) if self.url.endswith(".zip") else content.decode("utf-8").splitlines())
+		return self._table(converter)
+	# End def
+
+	def _bundled(self) -> tuple:
+		from currency_converter import CurrencyConverter, SINGLE_DAY_CURRENCY_FILE
+		return self._table(CurrencyConverter(currency_file=SINGLE_DAY_CURRENCY_FILE))
+	# End def
+
+	def _table(self, converter) -> tuple:
+		date = converter.bounds["EUR"].last_date
+		return (date, {currency: float(converter.convert(1, "EUR", currency)) for currency in converter.currencies})
+	# End def
+
+	# Fetches the latest rates. Takes the time it was scheduled for so it can run as a scheduler job.
+	async def refresh(self, when=None) -> None:
+		await self.flight.do("refresh", self._refresh)
+	# End def
+
+	async def _refresh(self) -> None:
+		try:
+			date, rates = await data_access.run_blocking(self._download)
+		except Exception as e:
+			self.failures += 1
+			logging.error(f'Ran into an error trying to download FX rates from {self.url}!')
+			logging.exception(e)
+
+			if self.rates is not None:
+				return
+			# End if
+
+			date, rates = await data_access.run_blocking(self._bundled)
+		# End try/except block
+
+		self.rates, self.date, self.loaded_at = rates, date, time.time()
+		self.refreshes += 1
+		logging.info(f"Loaded {len(rates)} FX rates from {date}")
+	# End def
+
+	# Loads the rates if they never have been
+	async def ensure_loaded(self) -> None:
+		if self.rates is None:
+			await self.refresh()
+		# End if
+	# End def
+
+	def convert(self, amount: float, from_currency: str, to_currency: str) -> float:
+		if self.rates is None:
+			raise RuntimeError("FX rates haven't been loaded yet!")
+		# End if
+
+		for currency in (from_currency, to_currency):
+			if currency not in self.rates:
+				raise ValueError(f"{currency} is not a supported currency")
+			# End if
+		# End for
+
+		return amount / self.rates[from_currency] * self.rates[to_currency]
+	# End def
+
+	def stats(self) -> dict:
+		return {
+			"currencies": len(self.rates or ()),
+			"age_seconds": time.time() - self.loaded_at if self.loaded_at else 0,
+			"refreshes": self.refreshes,
+			"failures": self.failures
+		}
+	# End def
+# End class
+
+rates = FXRates(os.environ.get("FX_Rates_URL", ecb_url))
+
+# next_run function refreshing the rates once a day, shortly after the ECB publishes them
+def next_refresh(after: float) -> float:
+	return scheduler.every(86400)(after - refresh_offset) + refresh_offset
+# End def
+
+metrics.collectors.append(lambda: [
+	(f"stonkbot_fx_{k}" + ("_total" if k in ("refreshes", "failures") else ""), {}, v) for k, v in rates.stats().items()
+])
@@ -0,0 +1,235 @@
+# Copyright 2020 - Custom License - https://github.com/Tim-Dusek/DiscordStockBot/blob/master/LICENSE
+# Maintained by Tim-Dusek and cdchris12
+
+###
+# Import statements
+###
+
+import os, math, time, asyncio, functools
+import metrics
+from collections import deque
+
+###
+# Rate limits
+###
+
+# Refills `rate` tokens per second up to `burst`; each job takes one
+class TokenBucket:
+	def __init__(self, rate: float, burst: float):
+		self.rate = rate
+		self.burst = burst
+		self.tokens = burst
+		self.updated = time.monotonic()
+	# End def
+
+	def _refill(self) -> None:
+		now = time.monotonic()
+		self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+		self.updated = now
+	# End def
+
+	# Returns how many seconds until a token is available, 0 if one is now
+	def wait(self) -> float:
+		self._refill()
+		return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+	# End def
+
+	# Takes a token and returns 0, or returns how many seconds until one is available
+	def take(self) -> float:
+		wait = self.wait()
+
+		if not wait:
+			self.tokens -= 1
+		# End if
+
+		return wait
+	# End def
+
+	def full(self) -> bool:
+		self._refill()
+		return self.tokens >= self.burst
+	# End def
+# End class
+
+# One bucket per key (a user or channel id), created on first use
+class RateLimiter:
+	def __init__(self, per_minute: float, burst: float):
+		self.rate = per_minute / 60
+		self.burst = burst
+		self.buckets = {}
+	# End def
+
+	# Returns how many seconds until `key` may go, without using up anything
+	def wait(self, key) -> float:
+		bucket = self.buckets.get(key)
+		return bucket.wait() if bucket is not None else 0.0
+	# End def
+
+	def take(self, key) -> float:
+		bucket = self.buckets.get(key)
+
+		if bucket is None:
+			# Full buckets behave like new ones, so they can be dropped to bound memory
+			if len(self.buckets) >= 10000:
+				self.buckets = {k: b for k, b in self.buckets.items() if not b.full()}
+			# End if
+
+			bucket = self.buckets[key] = TokenBucket(self.rate, self.burst)
+		# End if
+
+		return bucket.take()
+	# End def
+# End class
+
+###
+# Job queue
+###
+
+# Runs heavy commands (graphs, whois, news) at most `max_running` at a time. Later ones wait in a
+# FIFO of at most `max_queued`, and are told their place in line; past that they are turned away
+# at once instead of piling up. Users and channels are also rate limited with token buckets.
+# Commands that don't go through the queue are never stuck behind it.
+class JobQueue:
+	def __init__(self, max_running: int, max_queued: int, user_limiter: RateLimiter, channel_limiter: RateLimiter):
+		self.max_running = max_running
+		self.max_queued = max_queued
+		self.user_limiter = user_limiter
+		self.channel_limiter = channel_limiter
+		self.running = 0
+		self.waiting = deque()
+		self.completed = 0
+		self.rejected = 0
+		self.limited = 0
+	# End def
+
+	def _free(self) -> bool:
+		return self.running < self.max_running and not self.waiting
+	# End def
+
+	def _full(self) -> bool:
+		return not self._free() and len(self.waiting) >= self.max_queued
+	# End def
+
+	# Takes a slot, waiting in line for one if they're all in use
+	async def _acquire(self, ctx) -> None:
+		if self._free():
+			self.running += 1
+			return
+		# End if
+
+		waiter = asyncio.get_running_loop().create_future()
+		self.waiting.append(waiter)
+
+		try:
+			await ctx.send(f"I'm busy right now, you're number {len(self.waiting)} in line!")
+			await waiter
+		except BaseException:
+			# Cancelled, or the message couldn't be sent: leave the line, and if our slot was
+			# handed over in the meantime, pass it on so it isn't lost
+			if waiter in self.waiting:
+				self.waiting.remove(waiter)
+			elif waiter.done() and not waiter.cancelled():
+				self._release()
+			# End if/elif block
+
+			raise
+		# End try/except block
+	# End def
+
+	# Hands the slot to the next job in line, or frees it
+	def _release(self) -> None:
+		while self.waiting:
+			waiter = self.waiting.popleft()
+
+			if not waiter.done():
+				waiter.set_result(None)
+				return
+			# End if
+		# End while
+
+		self.running -= 1
+	# End def
+
+	# Returns 0 if the author and channel may run a job now, or how many seconds until they can.
+	# Nothing is used up; see _take.
+	def _limited(self, ctx) -> float:
+		author, channel = getattr(ctx, "author", None), getattr(ctx, "channel", None)
+		return max(
+			self.user_limiter.wait(author.id) if author is not None else 0.0,
+			self.channel_limiter.wait(channel.id) if channel is not None else 0.0
+		)
+	# End def
+
+	# Uses up the author's and channel's tokens, once every check has passed
+	def _take(self, ctx) -> None:
+		author, channel = getattr(ctx, "author", None), getattr(ctx, "channel", None)
+
+		if author is not None:
+			self.user_limiter.take(author.id)
+		# End if
+
+		if channel is not None:
+			self.channel_limiter.take(channel.id)
+		# End if
+	# End def
+
+	async def run(self, ctx, func, *args, **kwargs):
+		wait = self._limited(ctx)
+
+		if wait:
+			self.limited += 1
+			seconds = math.ceil(wait)
+			await ctx.send(f"Slow down! You can ask for that again in {seconds} second{'s' if seconds != 1 else ''}.")
+			return None
+		# End if
+
+		if self._full():
+			self.rejected += 1
+			await ctx.send(f"I'm busy with {self.running + len(self.waiting)} requests right now, please try again in a minute!")
+			return None
+		# End if
+
+		self._take(ctx)
+		queued = time.perf_counter()
+		await self._acquire(ctx)
+		metrics.observe("queue", time.perf_counter() - queued)
+
+		try:
+			return await func(ctx, *args, **kwargs)
+		finally:
+			self.completed += 1
+			self._release()
+		# End try/finally block
+	# End def
+
+	def stats(self) -> dict:
+		return {
+			"running": self.running,
+			"waiting": len(self.waiting),
+			"completed": self.completed,
+			"rejected": self.rejected,
+			"limited": self.limited
+		}
+	# End def
+# End class
+
+jobs = JobQueue(
+	max_running=int(os.environ.get("Job_Workers", os.cpu_count() or 1)),
+	max_queued=int(os.environ.get("Job_Queue", 20)),
+	user_limiter=RateLimiter(float(os.environ.get("User_Jobs_Per_Minute", 6)), float(os.environ.get("User_Job_Burst", 3))),
+	channel_limiter=RateLimiter(float(os.environ.get("Channel_Jobs_Per_Minute", 20)), float(os.environ.get("Channel_Job_Burst", 10)))
+)
+
+metrics.collectors.append(lambda: [
+	(f"stonkbot_jobs_{k}" + ("_total" if k in ("completed", "rejected", "limited") else ""), {}, v) for k, v in jobs.stats().items()
+])
+
+# Decorator sending a command or graph builder, which takes ctx first, through the job queue
+def heavy(func):
+	@functools.wraps(func)
+	async def wrapper(ctx, *args, **kwargs):
+		return await jobs.run(ctx, func, *args, **kwargs)
+	# End def
+
+	return wrapper
+# End def
@@ -0,0 +1,185 @@
+# Copyright 2020 - Custom License - https://github.com/Tim-Dusek/DiscordStockBot/blob/master/LICENSE
+# Maintained by Tim-Dusek and cdchris12
+
+###
+# Import statements
+###
+
+import arrow, bisect, datetime
+
+###
+# Trading hours
+###
+
+# Regular and extended (pre/post market) trading hours, as (hour, minute) in Eastern time
+regular_hours = ((9, 30), (16, 0))
+extended_hours = ((4, 0), (20, 0))
+
+# On early close days the regular session ends at 1:00 pm and post market at 5:00 pm
+early_close_hours = ((9, 30), (13, 0))
+early_extended_hours = ((4, 0), (17, 0))
+
+###
+# Calendar
+###
+
+# Sessions are precomputed a year at a time from the NYSE holiday calendar plus the exchange's
+# early close rules. Per day lookups go through dicts keyed by date, and next open/close lookups
+# bisect sorted arrays of epoch seconds. A year is built the first time anything asks about it
+# (each build also covers the following year, so lookups near New Year's find the next session).
+_years = set()
+_closures = {}
+_sessions = {}
+_regular_opens, _regular_closes = [], []
+_extended_opens, _extended_closes = [], []
+_closed_opens = []
+
+def _at(day: datetime.date, hour: int, minute: int) -> int:
+	return arrow.Arrow(day.year, day.month, day.day, hour, minute, tzinfo='US/Eastern').int_timestamp
+# End def
+
+# The NYSE closes at 1:00 pm on the day after Thanksgiving, on Christmas Eve and on July 3rd
+# when the 4th falls Tuesday through Friday
+def _is_early_close(day: datetime.date, closures: dict) -> bool:
+	if day.month == 11 and closures.get(day - datetime.timedelta(days=1)) == "Thanksgiving Day":
+		return True
+	# End if
+
+	if day.month == 12 and day.day == 24:
+		return True
+	# End if
+
+	return day.month == 7 and day.day == 3 and day.weekday() < 4
+# End def
+
+def _build(year: int) -> None:
+	import holidays
+
+	closures = dict(holidays.NYSE(years=year))
+	_closures.update(closures)
+	day = datetime.date(year, 1, 1)
+
+	while day.year == year:
+		if day.weekday() < 5 and day not in closures:
+			early = _is_early_close(day, closures)
+			(regular_open, regular_close) = early_close_hours if early else regular_hours
+			(extended_open, extended_close) = early_extended_hours if early else extended_hours
+
+			_sessions[day] = (
+				_at(day, *regular_open), _at(day, *regular_close),
+				_at(day, *extended_open), _at(day, *extended_close),
+				early
+			)
+		# End if
+
+		day += datetime.timedelta(days=1)
+	# End while
+
+	_years.add(year)
+	days = sorted(_sessions)
+	_regular_opens[:] = [_sessions[d][0] for d in days]
+	_regular_closes[:] = [_sessions[d][1] for d in days]
+	_extended_opens[:] = [_sessions[d][2] for d in days]
+	_extended_closes[:] = [_sessions[d][3] for d in days]
+	_closed_opens[:] = sorted(_at(d, *regular_hours[0]) for d in _closures if d.weekday() < 5)
+# End def
+
+def _ensure(year: int) -> None:
+	for y in (year, year + 1):
+		if y not in _years:
+			_build(y)
+		# End if
+	# End for
+# End def
+
+def _now(now=None) -> arrow.Arrow:
+	return (now or arrow.utcnow()).to('US/Eastern')
+# End def
+
+def _date(day) -> datetime.date:
+	if isinstance(day, arrow.Arrow):
+		return day.to('US/Eastern').date()
+	elif isinstance(day, datetime.datetime):
+		return day.date()
+	# End if/elif block
+
+	return day
+# End def
+
+def _times(prepost: bool) -> tuple:
+	return (_extended_opens, _extended_closes) if prepost else (_regular_opens, _regular_closes)
+# End def
+
+def _eastern(timestamp: int) -> arrow.Arrow:
+	return arrow.get(timestamp).to('US/Eastern')
+# End def
+
+###
+# Lookups
+###
+
+# Returns True if the exchange trades on `day` (a date, datetime or arrow)
+def is_session(day) -> bool:
+	day = _date(day)
+	_ensure(day.year)
+	return day in _sessions
+# End def
+
+# Returns the name of the holiday the exchange is closed for on `day`, or "" if there isn't one
+def holiday_name(day) -> str:
+	day = _date(day)
+	_ensure(day.year)
+	return _closures.get(day, "")
+# End def
+
+# Returns True if the exchange closes early on `day`
+def is_early_close(day) -> bool:
+	day = _date(day)
+	_ensure(day.year)
+	return day in _sessions and _sessions[day][4]
+# End def
+
+# Returns (open, close) for the session on `day` in Eastern time, or None if the exchange is closed
+def session(day, prepost=False):
+	day = _date(day)
+	_ensure(day.year)
+
+	if day not in _sessions:
+		return None
+	# End if
+
+	regular_open, regular_close, extended_open, extended_close, early = _sessions[day]
+	return (_eastern(extended_open), _eastern(extended_close)) if prepost else (_eastern(regular_open), _eastern(regular_close))
+# End def
+
+# Returns True if the market is trading at `now` (defaults to the current time)
+def is_open(now=None, prepost=False) -> bool:
+	eastern = _now(now)
+	_ensure(eastern.year)
+	opens, closes = _times(prepost)
+	i = bisect.bisect_right(opens, eastern.int_timestamp) - 1
+	return i >= 0 and eastern.int_timestamp < closes[i]
+# End def
+
+# Returns the first session open after `now`
+def next_open(now=None, prepost=False) -> arrow.Arrow:
+	eastern = _now(now)
+	_ensure(eastern.year)
+	opens, closes = _times(prepost)
+	return _eastern(opens[bisect.bisect_right(opens, eastern.int_timestamp)])
+# End def
+
+# Returns the first session close after `now`
+def next_close(now=None, prepost=False) -> arrow.Arrow:
+	eastern = _now(now)
+	_ensure(eastern.year)
+	opens, closes = _times(prepost)
+	return _eastern(closes[bisect.bisect_right(closes, eastern.int_timestamp)])
+# End def
+
+# Returns when the market would have opened on the next weekday it is closed for a holiday
+def next_closure(now=None) -> arrow.Arrow:
+	eastern = _now(now)
+	_ensure(eastern.year)
+	return _eastern(_closed_opens[bisect.bisect_right(_closed_opens, eastern.int_timestamp)])
+# End def
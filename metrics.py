@@ -0,0 +1,283 @@
+# Copyright 2020 - Custom License - https://github.com/Tim-Dusek/DiscordStockBot/blob/master/LICENSE
+# Maintained by Tim-Dusek and cdchris12
+
+###
+# Import statements
+###
+
+import os, time, bisect, asyncio, logging, functools, contextvars
+import cache, singleflight
+from contextlib import contextmanager
+
+###
+# Histograms
+###
+
+# Latency buckets in seconds, from a cache hit up to a slow max graph
+buckets = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# A Prometheus style histogram with one series per label set. Each series is
+# [count of each bucket, +Inf count, sum].
+class Histogram:
+	def __init__(self, name: str, help_text: str, label_names: tuple):
+		self.name = name
+		self.help_text = help_text
+		self.label_names = label_names
+		self.series = {}
+	# End def
+
+	def observe(self, seconds: float, *labels) -> None:
+		series = self.series.get(labels)
+
+		if series is None:
+			series = self.series[labels] = [[0] * len(buckets), 0, 0.0]
+		# End if
+
+		i = bisect.bisect_left(buckets, seconds)
+
+		if i < len(buckets):
+			series[0][i] += 1
+		# End if
+
+		series[1] += 1
+		series[2] += seconds
+	# End def
+
+	# Returns (count, mean, p50, p95) for a label set. Quantiles are the upper bound of the bucket they fall in.
+	def summary(self, *labels) -> tuple:
+		counts, count, total = self.series[labels]
+		return (count, total / count, self._quantile(counts, count, 0.5), self._quantile(counts, count, 0.95))
+	# End def
+
+	def _quantile(self, counts: list, count: int, q: float) -> float:
+		seen = 0
+
+		for bound, n in zip(buckets, counts):
+			seen += n
+
+			if seen >= q * count:
+				return bound
+			# End if
+		# End for
+
+		return float("inf")
+	# End def
+
+	def exposition(self) -> list:
+		lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+
+		for labels, (counts, count, total) in sorted(self.series.items()):
+			label_text = ",".join(f'{k}="{v}"' for k, v in zip(self.label_names, labels))
+			seen = 0
+
+			for bound, n in zip(buckets, counts):
+				seen += n
+				lines.append(f'{self.name}_bucket{{{label_text},le="{bound}"}} {seen}')
+			# End for
+
+			lines.append(f'{self.name}_bucket{{{label_text},le="+Inf"}} {count}')
+			lines.append(f"{self.name}_sum{{{label_text}}} {total}")
+			lines.append(f"{self.name}_count{{{label_text}}} {count}")
+		# End for
+
+		return lines
+	# End def
+# End class
+
+command_seconds = Histogram("stonkbot_command_seconds", "Time spent in each stage of a command", ("command", "stage"))
+upstream_seconds = Histogram("stonkbot_upstream_seconds", "Time spent in each blocking upstream call", ("call",))
+render_seconds = Histogram("stonkbot_render_seconds", "Time spent in each stage of a render worker job", ("kind", "stage"))
+histograms = [command_seconds, upstream_seconds, render_seconds]
+
+###
+# Command timers
+###
+
+# The command being run by the current task and when it started, set before every command is invoked
+current_command = contextvars.ContextVar("current_command", default="none")
+command_started = contextvars.ContextVar("command_started", default=None)
+
+def start_command(name: str) -> None:
+	current_command.set(name)
+	command_started.set(time.perf_counter())
+# End def
+
+def finish_command() -> None:
+	started = command_started.get()
+
+	if started is not None:
+		observe("total", time.perf_counter() - started)
+	# End if
+# End def
+
+# Times a stage (fetch, parse, render, upload) of the current command
+@contextmanager
+def timer(stage: str):
+	started = time.perf_counter()
+
+	try:
+		yield
+	finally:
+		command_seconds.observe(time.perf_counter() - started, current_command.get(), stage)
+	# End try/finally block
+# End def
+
+def observe(stage: str, seconds: float) -> None:
+	command_seconds.observe(seconds, current_command.get(), stage)
+# End def
+
+# Decorator timing every call of a function, sync or async, as a stage of whichever command made it
+def timed(stage: str):
+	def decorate(func):
+		if asyncio.iscoroutinefunction(func):
+			@functools.wraps(func)
+			async def wrapper(*args, **kwargs):
+				with timer(stage):
+					return await func(*args, **kwargs)
+				# End with
+			# End def
+		else:
+			@functools.wraps(func)
+			def wrapper(*args, **kwargs):
+				with timer(stage):
+					return func(*args, **kwargs)
+				# End with
+			# End def
+		# End if/else block
+
+		return wrapper
+	# End def
+
+	return decorate
+# End def
+
+###
+# Exposition
+###
+
+# Counters other modules want exported, as functions returning [(name, labels dict, value)].
+# They're called on every scrape, so the numbers are always current.
+collectors = []
+
+def exposition() -> str:
+	lines = []
+
+	for histogram in histograms:
+		lines.extend(histogram.exposition())
+	# End for
+
+	typed = set()
+
+	for collect in collectors:
+		for name, labels, value in collect():
+			if name not in typed:
+				lines.append(f"# TYPE {name} {'counter' if name.endswith('_total') else 'gauge'}")
+				typed.add(name)
+			# End if
+
+			label_text = ",".join(f'{k}="{v}"' for k, v in labels.items())
+			lines.append(f"{name}{{{label_text}}} {value}")
+		# End for
+	# End for
+
+	return "\n".join(lines) + "\n"
+# End def
+
+_process = None
+
+# Process counters from psutil. CPU percent is measured since the previous call.
+def process_stats() -> dict:
+	global _process
+
+	if _process is None:
+		import psutil
+		_process = psutil.Process()
+	# End if
+
+	process = _process
+
+	with process.oneshot():
+		return {
+			"rss": process.memory_info().rss,
+			"cpu_percent": process.cpu_percent(interval=None),
+			"cpu_seconds": sum(process.cpu_times()[:2]),
+			"threads": process.num_threads(),
+			"uptime": time.time() - process.create_time()
+		}
+	# End with
+# End def
+
+def _process_samples() -> list:
+	stats = process_stats()
+
+	return [
+		("stonkbot_resident_memory_bytes", {}, stats["rss"]),
+		("stonkbot_cpu_seconds_total", {}, stats["cpu_seconds"]),
+		("stonkbot_threads", {}, stats["threads"])
+	]
+# End def
+
+def _cache_samples() -> list:
+	samples = []
+
+	for c in cache.caches:
+		labels = {"cache": c.name}
+		samples += [
+			("stonkbot_cache_hits_total", labels, c.hits),
+			("stonkbot_cache_misses_total", labels, c.misses),
+			("stonkbot_cache_evictions_total", labels, c.evictions),
+			("stonkbot_cache_bytes", labels, c.bytes),
+			("stonkbot_cache_entries", labels, len(c))
+		]
+	# End for
+
+	for flight in singleflight.flights:
+		labels = {"flight": flight.name}
+		samples += [
+			("stonkbot_singleflight_started_total", labels, flight.started),
+			("stonkbot_singleflight_joined_total", labels, flight.joined),
+			("stonkbot_singleflight_in_flight", labels, len(flight.in_flight))
+		]
+	# End for
+
+	return samples
+# End def
+
+collectors += [_process_samples, _cache_samples]
+
+###
+# HTTP endpoint
+###
+
+# Serves /metrics on Metrics_Host:Metrics_Port (127.0.0.1:9150 by default); a port of 0 turns it off
+metrics_host = os.environ.get("Metrics_Host", "127.0.0.1")
+metrics_port = int(os.environ.get("Metrics_Port", 9150))
+_runner = None
+
+async def start_server() -> None:
+	global _runner
+
+	# on_ready fires again after every reconnect
+	if _runner is not None or not metrics_port:
+		return
+	# End if
+
+	from aiohttp import web
+
+	async def handle(request):
+		return web.Response(body=exposition().encode(), headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"})
+	# End def
+
+	app = web.Application()
+	app.router.add_get("/metrics", handle)
+	_runner = web.AppRunner(app, access_log=None)
+	await _runner.setup()
+
+	try:
+		await web.TCPSite(_runner, metrics_host, metrics_port).start()
+		logging.info(f"Serving metrics on http://{metrics_host}:{metrics_port}/metrics")
+	except OSError as e:
+		logging.error(f'Ran into an error trying to serve metrics on port {metrics_port}!')
+		logging.exception(e)
+	# End try/except block
+# End def
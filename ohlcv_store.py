@@ -0,0 +1,151 @@
+# Copyright 2020 - Custom License - https://github.com/Tim-Dusek/DiscordStockBot/blob/master/LICENSE
+# Maintained by Tim-Dusek and cdchris12
+
+###
+# Import statements
+###
+
+import os, time, sqlite3, threading, logging
+
+###
+# OHLCV store
+###
+
+# Bars are kept on disk in SQLite, one row per (series, timestamp). A series is one symbol at one
+# bar size, e.g. "stock:AAPL:1d:rth" or "crypto:BTC:minute". Alongside the bars each series records
+# the contiguous range it covers, so callers know whether they only need to fetch the bars after
+# `last_ts` or have to fetch the whole range again.
+#
+# The store is shared by the data worker threads, so every statement runs under one lock.
+class OHLCVStore:
+	def __init__(self, path: str, max_bytes: int):
+		self.path = path
+		self.max_bytes = max_bytes
+		self.lock = threading.Lock()
+
+		if os.path.dirname(path):
+			os.makedirs(os.path.dirname(path), exist_ok=True)
+		# End if
+
+		self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+
+		with self.lock:
+			# auto_vacuum only takes effect on a new database, which is the only time it matters
+			self.conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+			self.conn.execute("PRAGMA journal_mode = WAL")
+			self.conn.execute(
+				"CREATE TABLE IF NOT EXISTS bars ("
+				"series TEXT NOT NULL, ts INTEGER NOT NULL, "
+				"open REAL, high REAL, low REAL, close REAL, volume REAL, volume_to REAL, "
+				"PRIMARY KEY (series, ts)) WITHOUT ROWID"
+			)
+			self.conn.execute(
+				"CREATE TABLE IF NOT EXISTS series ("
+				"series TEXT PRIMARY KEY, first_ts INTEGER NOT NULL, last_ts INTEGER NOT NULL, "
+				"complete INTEGER NOT NULL DEFAULT 0, last_access REAL NOT NULL)"
+			)
+		# End with
+	# End def
+
+	# Returns (first_ts, last_ts, complete) for a series, or None if nothing is stored for it
+	def coverage(self, series: str):
+		with self.lock:
+			row = self.conn.execute("SELECT first_ts, last_ts, complete FROM series WHERE series = ?", (series,)).fetchone()
+		# End with
+
+		if row is None:
+			return None
+		# End if
+
+		return (row[0], row[1], bool(row[2]))
+	# End def
+
+	# Upserts bars, given as (ts, open, high, low, close, volume, volume_to) tuples sorted by ts.
+	# With `reset` the series' previous bars are dropped first, for when the new bars don't join up with them.
+	# `complete` marks a series that holds the symbol's entire history.
+	def write(self, series: str, rows: list, reset=False, complete=False) -> None:
+		if not rows:
+			return
+		# End if
+
+		with self.lock:
+			self.conn.execute("BEGIN")
+
+			try:
+				previous = self.conn.execute("SELECT first_ts, last_ts, complete FROM series WHERE series = ?", (series,)).fetchone()
+
+				if reset and previous is not None:
+					self.conn.execute("DELETE FROM bars WHERE series = ?", (series,))
+					previous = None
+				# End if
+
+				self.conn.executemany(
+					"INSERT OR REPLACE INTO bars (series, ts, open, high, low, close, volume, volume_to) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+					[(series, *row) for row in rows]
+				)
+
+				first_ts, last_ts = rows[0][0], rows[-1][0]
+
+				if previous is not None:
+					first_ts = min(first_ts, previous[0])
+					last_ts = max(last_ts, previous[1])
+					complete = complete or bool(previous[2])
+				# End if
+
+				self.conn.execute(
+					"INSERT OR REPLACE INTO series (series, first_ts, last_ts, complete, last_access) VALUES (?, ?, ?, ?, ?)",
+					(series, first_ts, last_ts, int(complete), time.time())
+				)
+				self.conn.execute("COMMIT")
+			except Exception:
+				self.conn.execute("ROLLBACK")
+				raise
+			# End try/except block
+
+			self._prune(keep=series)
+		# End with
+	# End def
+
+	# Returns the stored bars of a series with start_ts <= ts <= end_ts, oldest first
+	def read(self, series: str, start_ts=None, end_ts=None) -> list:
+		with self.lock:
+			rows = self.conn.execute(
+				"SELECT ts, open, high, low, close, volume, volume_to FROM bars WHERE series = ? AND ts >= ? AND ts <= ? ORDER BY ts",
+				(series, start_ts if start_ts is not None else -2**62, end_ts if end_ts is not None else 2**62)
+			).fetchall()
+			self.conn.execute("UPDATE series SET last_access = ? WHERE series = ?", (time.time(), series))
+		# End with
+
+		return rows
+	# End def
+
+	# Bytes of the database file actually holding data
+	def used_bytes(self) -> int:
+		page_size = self.conn.execute("PRAGMA page_size").fetchone()[0]
+		page_count = self.conn.execute("PRAGMA page_count").fetchone()[0]
+		freelist_count = self.conn.execute("PRAGMA freelist_count").fetchone()[0]
+		return (page_count - freelist_count) * page_size
+	# End def
+
+	# Drops the least recently read series until the store is back under its size cap.
+	# Must be called with the lock held.
+	def _prune(self, keep: str) -> None:
+		if self.used_bytes() <= self.max_bytes:
+			return
+		# End if
+
+		victims = self.conn.execute("SELECT series FROM series WHERE series != ? ORDER BY last_access", (keep,)).fetchall()
+
+		for (victim,) in victims:
+			logging.info(f"OHLCV store is over {self.max_bytes} bytes, dropping {victim}")
+			self.conn.execute("DELETE FROM bars WHERE series = ?", (victim,))
+			self.conn.execute("DELETE FROM series WHERE series = ?", (victim,))
+
+			if self.used_bytes() <= self.max_bytes:
+				break
+			# End if
+		# End for
+
+		self.conn.execute("PRAGMA incremental_vacuum")
+	# End def
+# End class
@@ -0,0 +1,65 @@
+# Copyright 2020 - Custom License - https://github.com/Tim-Dusek/DiscordStockBot/blob/master/LICENSE
+# Maintained by Tim-Dusek and cdchris12
+
+###
+# Import statements
+###
+
+import metrics
+
+# numpy and pandas are imported inside the parsers so they load with the first graph, not at startup
+
+###
+# Parsing
+###
+
+# Converts epoch seconds into US/Eastern wall clock times, as naive datetime64 values so plotly
+# draws them exactly as the clock in New York read
+def eastern_times(epoch):
+	import pandas as pd
+	return pd.to_datetime(epoch, unit="s", utc=True).tz_convert("US/Eastern").tz_localize(None).to_numpy()
+# End def
+
+# Parses cryptocompare candles into NumPy columns with one pass over the rows.
+# Prices are rounded to cents and volume is volumefrom + volumeto, as the graphs have always shown.
+@metrics.timed("parse")
+def parse_crypto_rows(rows: list) -> dict:
+	import numpy as np
+
+	table = np.array(
+		[(f['time'], f['open'], f['high'], f['low'], f['close'], f['volumefrom'], f['volumeto']) for f in rows],
+		dtype=np.float64
+	).reshape(-1, 7)
+
+	return {
+		"time": eastern_times(table[:, 0].astype(np.int64)),
+		"open": np.round(table[:, 1], 2),
+		"high": np.round(table[:, 2], 2),
+		"low": np.round(table[:, 3], 2),
+		"close": np.round(table[:, 4], 2),
+		"volume": table[:, 5] + table[:, 6]
+	}
+# End def
+
+# Normalizes a yfinance history DataFrame into NumPy columns: one tz_convert of the index to
+# US/Eastern wall clock time, and every OHLCV column rounded to cents
+@metrics.timed("parse")
+def normalize_history(res) -> dict:
+	import numpy as np, pandas as pd
+
+	index = pd.DatetimeIndex(res.index)
+
+	# Matches arrow, which treated naive timestamps as UTC
+	if index.tz is None:
+		index = index.tz_localize("UTC")
+	# End if
+
+	return {
+		"time": index.tz_convert("US/Eastern").tz_localize(None).to_numpy(),
+		"open": np.round(res["Open"].to_numpy(dtype=np.float64), 2),
+		"high": np.round(res["High"].to_numpy(dtype=np.float64), 2),
+		"low": np.round(res["Low"].to_numpy(dtype=np.float64), 2),
+		"close": np.round(res["Close"].to_numpy(dtype=np.float64), 2),
+		"volume": np.round(res["Volume"].to_numpy(dtype=np.float64), 2)
+	}
+# End def
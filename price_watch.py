@@ -0,0 +1,310 @@
+# Copyright 2020 - Custom License - https://github.com/Tim-Dusek/DiscordStockBot/blob/master/LICENSE
+# Maintained by Tim-Dusek and cdchris12
+
+###
+# Import statements
+###
+
+import os, time, asyncio, logging
+import arrow, discord
+import crypto_client, crypto_feed, data_access, metrics, scheduler
+
+###
+# Price watch
+###
+
+# Symbols are ("stock", "AAPL") or ("crypto", "BTC")
+STOCK, CRYPTO = "stock", "crypto"
+
+# Everything one channel watches, and the message showing it
+class ChannelWatch:
+	def __init__(self, channel):
+		self.channel = channel
+		self.symbols = []
+		self.message = None
+		self.content = None
+	# End def
+# End class
+
+# Follows prices for every channel from one poller. Each tick gathers the distinct symbols watched
+# anywhere, fetches all the stocks in one batched history request and all the cryptos in one
+# cryptocompare pricemulti request, and then edits one message per channel with the new prices.
+# Upstream cost grows with the number of distinct symbols, not with the number of watchers.
+#
+# Other live features ride on the same poll: `sources` are functions returning more symbols to
+# fetch, and `listeners` are awaited with {symbol: price} after every tick. Whatever changes what a
+# source returns calls `changed()`, so the poll is only scheduled while there's something to poll.
+#
+# Stock prices are reused for at most `max_age` seconds, which should stay under the tick interval
+# so every tick sees a fresh price.
+class PriceWatch:
+	def __init__(self, max_per_channel=10, max_age=15.0):
+		self.max_per_channel = max_per_channel
+		self.max_age = max_age
+		self.channels = {}
+		self.locks = {}
+		self.prices = {}
+		self.previous = {}
+		self.updated = None
+		self.sources = []
+		self.listeners = []
+		self.task = None
+		self.schedule = None
+		self.interval = None
+		self.ticks = 0
+		self.skipped = 0
+		self.edits = 0
+	# End def
+
+	def symbols(self) -> set:
+		symbols = {symbol for watch in self.channels.values() for symbol in watch.symbols}
+
+		for source in self.sources:
+			symbols.update(source())
+		# End for
+
+		return symbols
+	# End def
+
+	# Ticks every `interval` seconds on `schedule` whenever something is watched
+	def run_on(self, schedule: scheduler.Scheduler, interval: float) -> None:
+		self.schedule = schedule
+		self.interval = interval
+		self.changed()
+	# End def
+
+	# Adds the tick to the schedule when the first symbol is watched and takes it off once the last
+	# one goes, so an idle bot isn't woken every interval for nothing
+	def changed(self) -> None:
+		if self.schedule is None:
+			return
+		# End if
+
+		watching = bool(self.symbols())
+
+		if watching and not self.schedule.has("price_watch"):
+			self.schedule.add("price_watch", scheduler.every(self.interval), self.tick)
+		elif not watching:
+			self.schedule.remove("price_watch")
+		# End if/elif block
+	# End def
+
+	# Returns {symbol: price} for the symbols given, in at most two upstream requests
+	async def lookup(self, symbols) -> dict:
+		stocks = sorted(name for kind, name in symbols if kind == STOCK)
+		cryptos = sorted(name for kind, name in symbols if kind == CRYPTO)
+		stock_prices, crypto_prices = await asyncio.gather(
+			data_access.get_last_prices(stocks, max_age=self.max_age) if stocks else _empty(),
+			_crypto_prices(cryptos) if cryptos else _empty()
+		)
+
+		prices = {(STOCK, name): price for name, price in stock_prices.items()}
+		prices.update({(CRYPTO, name): quote["USD"] for name, quote in crypto_prices.items() if "USD" in quote})
+		return prices
+	# End def
+
+	# Changes to a channel's watch list await a price lookup or a message, so they're made under the
+	# channel's lock to keep two commands from both passing the duplicate and limit checks
+	def _lock(self, channel) -> asyncio.Lock:
+		return self.locks.setdefault(channel.id, asyncio.Lock())
+	# End def
+
+	# Starts watching a symbol in the channel and returns its price, or None if it has no price
+	async def add(self, channel, kind: str, name: str):
+		async with self._lock(channel):
+			return await self._add(channel, (kind, name.upper()))
+		# End with
+	# End def
+
+	async def _add(self, channel, symbol: tuple):
+		watch = self.channels.get(channel.id)
+
+		if watch is not None and symbol in watch.symbols:
+			return self.prices.get(symbol)
+		# End if
+
+		if watch is not None and len(watch.symbols) >= self.max_per_channel:
+			raise ValueError(f"This channel is already watching {self.max_per_channel} symbols!")
+		# End if
+
+		price = self.prices.get(symbol)
+
+		if price is None:
+			price = (await self.lookup([symbol])).get(symbol)
+
+			if price is None:
+				return None
+			# End if
+
+			self.prices[symbol] = price
+		# End if
+
+		watch = self.channels.setdefault(channel.id, ChannelWatch(channel))
+		watch.symbols.append(symbol)
+		self.changed()
+		await self._show(watch)
+		return price
+	# End def
+
+	# Stops watching a symbol in the channel, or everything if `kind` is None. Returns False if it wasn't watched.
+	async def remove(self, channel, kind=None, name="") -> bool:
+		async with self._lock(channel):
+			return await self._remove(channel, kind, name)
+		# End with
+	# End def
+
+	async def _remove(self, channel, kind, name: str) -> bool:
+		watch = self.channels.get(channel.id)
+
+		if watch is None:
+			return False
+		# End if
+
+		if kind is None:
+			watch.symbols = []
+		elif (kind, name.upper()) in watch.symbols:
+			watch.symbols.remove((kind, name.upper()))
+		else:
+			return False
+		# End if/elif/else block
+
+		if not watch.symbols:
+			del self.channels[channel.id]
+		# End if
+
+		self.changed()
+		await self._show(watch)
+		return True
+	# End def
+
+	# Scheduler job. A tick that's still running when the next one is due means upstream is slow,
+	# so that tick is skipped rather than stacking requests on top of it.
+	async def tick(self, when=None) -> None:
+		if not self.symbols():
+			return
+		# End if
+
+		if self.task is not None and not self.task.done():
+			self.skipped += 1
+			return
+		# End if
+
+		self.task = asyncio.ensure_future(self._tick())
+	# End def
+
+	async def _tick(self) -> None:
+		try:
+			prices = await self.lookup(self.symbols())
+		except Exception as e:
+			logging.error('Ran into an error trying to fetch watched prices!')
+			logging.exception(e)
+			return
+		# End try/except block
+
+		# Symbols unwatched during the fetch are dropped, and ones with no new price keep their last one
+		self.previous = self.prices
+		self.prices = {symbol: prices.get(symbol, self.previous.get(symbol)) for symbol in self.symbols()}
+		self.updated = time.time()
+		self.ticks += 1
+
+		await asyncio.gather(*(self._show(watch) for watch in list(self.channels.values())))
+
+		for listener in self.listeners:
+			try:
+				await listener(prices)
+			except Exception as e:
+				logging.error('Ran into an error handing watched prices to a listener!')
+				logging.exception(e)
+			# End try/except block
+		# End for
+	# End def
+
+	def _format(self, watch: ChannelWatch) -> str:
+		if not watch.symbols:
+			return "Not watching anything anymore."
+		# End if
+
+		updated = arrow.get(self.updated or time.time()).to("US/Eastern").format("h:mm:ss A")
+		lines = [f":eyes: Watching (updated {updated} ET):"]
+
+		for symbol in watch.symbols:
+			price, before = self.prices.get(symbol), self.previous.get(symbol)
+
+			if price is None:
+				lines.append(f"\t{symbol[1]}: no price yet")
+				continue
+			# End if
+
+			arrow_text = ""
+			if before is not None and price != before:
+				arrow_text = " :arrow_up_small:" if price > before else " :arrow_down_small:"
+			# End if
+
+			lines.append(f"\t{symbol[1]}: ${price:,.2f}{arrow_text}")
+		# End for
+
+		return "\n".join(lines)
+	# End def
+
+	# Edits the channel's watch message, sending a new one if there's none yet or it was deleted
+	async def _show(self, watch: ChannelWatch) -> None:
+		content = self._format(watch)
+
+		if content == watch.content:
+			return
+		# End if
+
+		try:
+			if watch.message is not None:
+				try:
+					await watch.message.edit(content=content)
+				except discord.NotFound:
+					watch.message = None
+				# End try/except block
+			# End if
+
+			if watch.message is None:
+				watch.message = await watch.channel.send(content)
+			# End if
+
+			watch.content = content
+			self.edits += 1
+		except Exception as e:
+			logging.error(f'Ran into an error trying to update the price watch in channel {watch.channel.id}!')
+			logging.exception(e)
+		# End try/except block
+	# End def
+
+	def stats(self) -> dict:
+		return {
+			"channels": len(self.channels),
+			"symbols": len(self.symbols()),
+			"ticks": self.ticks,
+			"skipped": self.skipped,
+			"edits": self.edits
+		}
+	# End def
+# End class
+
+async def _empty() -> dict:
+	return {}
+# End def
+
+# Coins the crypto feed follows are read from memory. Unknown coins come back as missing keys,
+# or as an error if every coin asked for is unknown.
+async def _crypto_prices(cryptos: list) -> dict:
+	try:
+		return await crypto_feed.feed.get_prices(cryptos, ["USD"])
+	except crypto_client.CryptoCompareError:
+		return {}
+	# End try/except block
+# End def
+
+watch_interval = int(os.environ.get("Watch_Interval", 15))
+
+# Half the interval, so a tick that fires a little early still fetches while watches added between ticks share it
+watcher = PriceWatch(max_per_channel=int(os.environ.get("Watch_Max_Symbols", 10)), max_age=watch_interval / 2)
+
+metrics.collectors.append(lambda: [
+	(f"stonkbot_watch_{k}" + ("_total" if k in ("ticks", "skipped", "edits") else ""), {}, v) for k, v in watcher.stats().items()
+])
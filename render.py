@@ -0,0 +1,197 @@
+# Copyright 2020 - Custom License - https://github.com/Tim-Dusek/DiscordStockBot/blob/master/LICENSE
+# Maintained by Tim-Dusek and cdchris12
+
+###
+# Import statements
+###
+
+import os, json, time, hashlib, asyncio, logging, multiprocessing
+import cache, metrics, singleflight
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+###
+# Downsampling
+###
+
+# Series longer than this are reduced before plotting; about the pixel width of the PNG.
+# Builders put it in meta["max_points"], so each command can pick its own (0 turns it off).
+default_max_points = int(os.environ.get("Max_Points", 700))
+
+###
+# Render pool
+###
+
+# Entry points run in the worker processes. They import the chart code on first use, so the bot
+# process itself never loads it.
+def _init_worker() -> None:
+	import charts
+	charts.init_worker()
+# End def
+
+# Renders a spec, or the warmup chart when there is none, returning (png, stats)
+def _render_job(spec) -> tuple:
+	import charts
+	return charts.render_job(spec if spec is not None else charts.warmup_spec)
+# End def
+
+# Owns the pool of render worker processes: sized to the machine's cores, spawned rather than
+# forked so they never inherit the bot's event loop or threads, warmed on startup, replaced after
+# Render_Recycle_After renders each or when a worker (with its browser) grows past Render_Max_RSS_MB,
+# and rebuilt if a worker dies.
+class Renderer:
+	def __init__(self, max_workers: int, recycle_after: int, max_rss: int):
+		self.max_workers = max_workers
+		self.recycle_after = recycle_after
+		self.max_rss = max_rss
+		self.pool = None
+		self.renders = 0
+		self.cold_renders = 0
+		self.restarts = 0
+		self.recycles = 0
+		self.last_stats = {}
+		self.started = False
+	# End def
+
+	def _new_pool(self) -> ProcessPoolExecutor:
+		return ProcessPoolExecutor(
+			max_workers=self.max_workers,
+			mp_context=multiprocessing.get_context("spawn"),
+			initializer=_init_worker,
+			max_tasks_per_child=self.recycle_after or None
+		)
+	# End def
+
+	def get_pool(self) -> ProcessPoolExecutor:
+		if self.pool is None:
+			self.pool = self._new_pool()
+		# End if
+
+		return self.pool
+	# End def
+
+	# Swaps in a fresh pool. Jobs already running on the old one are left to finish.
+	def recycle(self) -> None:
+		old, self.pool = self.pool, self._new_pool()
+
+		if old is not None:
+			old.shutdown(wait=False)
+		# End if
+	# End def
+
+	# Starts every worker and renders the warmup chart on each, so no user pays for a cold browser
+	async def start(self) -> None:
+		# on_ready fires again after every reconnect
+		if self.started:
+			return
+		# End if
+
+		self.started = True
+		started = time.perf_counter()
+		results = await asyncio.gather(*[self.render(None) for _ in range(self.max_workers)], return_exceptions=True)
+		failures = [r for r in results if isinstance(r, Exception)]
+
+		for failure in failures:
+			logging.error('Ran into an error trying to warm up a render worker!', exc_info=failure)
+		# End for
+
+		logging.info(f"Warmed {self.max_workers - len(failures)}/{self.max_workers} render workers in {(time.perf_counter() - started) * 1000:.0f}ms")
+	# End def
+
+	async def render(self, spec) -> bytes:
+		loop = asyncio.get_running_loop()
+		started = time.perf_counter()
+
+		try:
+			png, stats = await loop.run_in_executor(self.get_pool(), _render_job, spec)
+		except BrokenProcessPool:
+			logging.error('A render worker died, restarting the render pool!')
+			self.restarts += 1
+			self.recycle()
+			png, stats = await loop.run_in_executor(self.get_pool(), _render_job, spec)
+		# End try/except block
+
+		stats["total_ms"] = (time.perf_counter() - started) * 1000
+		self.renders += 1
+		self.cold_renders += stats["cold"]
+		self.last_stats = stats
+
+		for stage in ("downsample", "build", "encode", "total"):
+			metrics.render_seconds.observe(stats[f"{stage}_ms"] / 1000, stats["kind"], stage)
+		# End for
+
+		logging.info(
+			f"Rendered {stats['kind']} graph in {stats['total_ms']:.0f}ms on a {'cold' if stats['cold'] else 'warm'} worker "
+			f"(downsample {stats['downsample_ms']:.0f}ms, build {stats['build_ms']:.0f}ms, encode {stats['encode_ms']:.0f}ms, "
+			f"{stats['points_in']} -> {stats['points_out']} points)"
+		)
+
+		if self.max_rss and stats["rss"] > self.max_rss:
+			logging.info(f"Render worker {stats['pid']} is using {stats['rss'] // (1024 * 1024)}MB, recycling the render pool")
+			self.recycles += 1
+			self.recycle()
+		# End if
+
+		return png
+	# End def
+
+	def stats(self) -> dict:
+		return {
+			"renders": self.renders,
+			"cold_renders": self.cold_renders,
+			"restarts": self.restarts,
+			"recycles": self.recycles
+		}
+	# End def
+# End class
+
+renderer = Renderer(
+	max_workers=int(os.environ.get("Render_Workers", os.cpu_count() or 1)),
+	recycle_after=int(os.environ.get("Render_Recycle_After", 500)),
+	max_rss=int(os.environ.get("Render_Max_RSS_MB", 1024)) * 1024 * 1024
+)
+
+metrics.collectors.append(lambda: [(f"stonkbot_render_{k}_total", {}, v) for k, v in renderer.stats().items()])
+
+render_flight = singleflight.SingleFlight("render")
+
+# Renders a chart spec in the worker pool and returns the PNG bytes.
+# When `key` is given, concurrent renders of the same key share one worker job.
+@metrics.timed("render")
+async def render(spec: dict, key=None) -> bytes:
+	if key is None:
+		return await renderer.render(spec)
+	# End if
+
+	return await render_flight.do(key, renderer.render, spec)
+# End def
+
+###
+# PNG cache
+###
+
+# Rendered PNGs are cached by content address, bounded by PNG_Cache_MB
+png_cache = cache.Cache("png", int(os.environ.get("PNG_Cache_MB", 32)) * 1024 * 1024, sizeof=len)
+
+# How long a crypto graph stays current for each candle period. The live candle keeps moving,
+# so this is shorter than the candle itself for hour and day graphs.
+crypto_refresh_seconds = {"minute": 60, "hour": 300, "day": 3600}
+
+# Content address of a rendered chart: a hash of the chart kind, its meta (titles, axis config)
+# and markers identifying the data drawn, such as the data's last timestamp
+def chart_key(kind: str, meta: dict, *markers) -> str:
+	payload = json.dumps([kind, meta, markers], sort_keys=True, default=str)
+	return hashlib.sha256(payload.encode()).hexdigest()
+# End def
+
+# Identifies a yfinance history result by its range, length and last bar
+def history_marker(res) -> tuple:
+	return (len(res), str(res.index[0]), str(res.index[-1]), float(res['Close'].iloc[-1]))
+# End def
+
+# Identifies a crypto history request without fetching it: the candle period, the number of
+# candles and the refresh window the request falls in
+def crypto_marker(period: str, units: int, now=None) -> tuple:
+	step = crypto_refresh_seconds.get(period, 60)
+	return (period, units, int(now or time.time()) // step * step)
+# End def
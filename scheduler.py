@@ -0,0 +1,140 @@
+# Copyright 2020 - Custom License - https://github.com/Tim-Dusek/DiscordStockBot/blob/master/LICENSE
+# Maintained by Tim-Dusek and cdchris12
+
+###
+# Import statements
+###
+
+import time, heapq, asyncio, logging
+
+###
+# Scheduler
+###
+
+# Runs jobs at computed wall clock times from one task. Each job has a `next_run(after)` function
+# returning the epoch seconds of its first run strictly after `after`, so a job fires exactly once
+# per event. The task sleeps until the earliest job is due; adding a job wakes it to re-plan.
+# Jobs run as their own tasks, so a slow one never holds up the others.
+#
+# Sleeps are capped at `max_sleep` so the plan follows the wall clock if it jumps (NTP, suspend).
+# A job that was due while the loop was stalled runs once, and is then planned from the current
+# time rather than fired again for every run it missed.
+class Scheduler:
+	def __init__(self, name: str, max_sleep=3600):
+		self.name = name
+		self.max_sleep = max_sleep
+		self.jobs = []
+		self.pending = []
+		self.sequence = 0
+		self.wakeup = asyncio.Event()
+		self.task = None
+		self.running = set()
+		self.wakeups = 0
+		self.runs = 0
+	# End def
+
+	# Adds a job calling `await func(when)` at every time `next_run` produces, starting after now.
+	# Its first run is planned by the scheduler task, so adding jobs at import costs nothing.
+	def add(self, name: str, next_run, func) -> None:
+		self.pending.append((name, next_run, func))
+		self.wakeup.set()
+	# End def
+
+	# Removes the job called `name`, returning False if there's none. A run already going carries on.
+	def remove(self, name: str) -> bool:
+		found = self.has(name)
+		self.jobs = [job for job in self.jobs if job[2] != name]
+		heapq.heapify(self.jobs)
+		self.pending = [job for job in self.pending if job[0] != name]
+		return found
+	# End def
+
+	def has(self, name: str) -> bool:
+		return any(job[2] == name for job in self.jobs) or any(job[0] == name for job in self.pending)
+	# End def
+
+	def _push(self, when: float, name: str, next_run, func) -> None:
+		self.sequence += 1
+		heapq.heappush(self.jobs, (when, self.sequence, name, next_run, func))
+	# End def
+
+	def start(self) -> None:
+		# on_ready fires again after every reconnect
+		if self.task is None:
+			self.task = asyncio.ensure_future(self._run())
+		# End if
+	# End def
+
+	async def _run(self) -> None:
+		while True:
+			self.wakeup.clear()
+
+			while self.pending:
+				name, next_run, func = self.pending.pop(0)
+				self._push(next_run(time.time()), name, next_run, func)
+			# End while
+
+			if self.jobs:
+				delay = min(self.jobs[0][0] - time.time(), self.max_sleep)
+			else:
+				delay = self.max_sleep
+			# End if/else block
+
+			if delay > 0:
+				try:
+					await asyncio.wait_for(self.wakeup.wait(), timeout=delay)
+				except asyncio.TimeoutError:
+					pass
+				# End try/except block
+
+				self.wakeups += 1
+				continue
+			# End if
+
+			when, _, name, next_run, func = heapq.heappop(self.jobs)
+			self._push(next_run(max(when, time.time())), name, next_run, func)
+			self.runs += 1
+
+			# Keep a reference so the task isn't garbage collected while it runs
+			task = asyncio.ensure_future(self._call(name, func, when))
+			self.running.add(task)
+			task.add_done_callback(self.running.discard)
+		# End while
+	# End def
+
+	async def _call(self, name: str, func, when: float) -> None:
+		try:
+			logging.debug(f"{self.name} scheduler running {name} due at {when}")
+			await func(when)
+		except Exception as e:
+			logging.error(f"Ran into an error running the scheduled job {name}!")
+			logging.exception(e)
+		# End try/except block
+	# End def
+
+	# Returns when each job next runs, soonest first
+	def upcoming(self) -> list:
+		return [(name, when) for when, _, name, _, _ in sorted(self.jobs)]
+	# End def
+
+	def stats(self) -> dict:
+		return {
+			"jobs": len(self.jobs),
+			"running": len(self.running),
+			"wakeups": self.wakeups,
+			"runs": self.runs
+		}
+	# End def
+# End class
+
+# next_run function for a job repeating every `seconds`, aligned to multiples of it
+def every(seconds: float):
+	def next_run(after: float) -> float:
+		when = (after // seconds + 1) * seconds
+
+		# Float rounding can land back on `after` itself
+		return when if when > after else when + seconds
+	# End def
+
+	return next_run
+# End def
@@ -0,0 +1,63 @@
+# Copyright 2020 - Custom License - https://github.com/Tim-Dusek/DiscordStockBot/blob/master/LICENSE
+# Maintained by Tim-Dusek and cdchris12
+
+###
+# Import statements
+###
+
+import asyncio
+
+###
+# Single flight
+###
+
+# Every single flight created, so their counters can be exported
+flights = []
+
+# Coalesces concurrent identical work. While a call for a key is running, later calls for the
+# same key await the same future instead of starting their own. Once it finishes the key is free
+# again, so results are never reused past the flight; pair this with a cache for that.
+class SingleFlight:
+	def __init__(self, name: str):
+		self.name = name
+		self.in_flight = {}
+		self.started = 0
+		self.joined = 0
+		flights.append(self)
+	# End def
+
+	async def do(self, key, func, *args, **kwargs):
+		future = self.in_flight.get(key)
+
+		if future is None:
+			self.started += 1
+			future = asyncio.ensure_future(func(*args, **kwargs))
+			self.in_flight[key] = future
+			future.add_done_callback(lambda f: self._done(key, f))
+		else:
+			self.joined += 1
+		# End if/else block
+
+		# Shield the shared future so one caller being cancelled doesn't cancel it for everyone else
+		return await asyncio.shield(future)
+	# End def
+
+	def _done(self, key, future) -> None:
+		if self.in_flight.get(key) is future:
+			del self.in_flight[key]
+		# End if
+
+		# Mark the exception as retrieved in case every caller was cancelled before it landed
+		if not future.cancelled():
+			future.exception()
+		# End if
+	# End def
+
+	def stats(self) -> dict:
+		return {
+			"in_flight": len(self.in_flight),
+			"started": self.started,
+			"joined": self.joined
+		}
+	# End def
+# End class
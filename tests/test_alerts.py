@@ -0,0 +1,110 @@
+# Copyright 2020 - Custom License - https://github.com/Tim-Dusek/DiscordStockBot/blob/master/LICENSE
+# Maintained by Tim-Dusek and cdchris12
+
+###
+# Import statements
+###
+
+import os, json, tempfile, unittest
+import alerts
+
+###
+# Price alerts
+###
+
+BTC = ("crypto", "BTC")
+AAPL = ("stock", "AAPL")
+
+class CheckTest(unittest.TestCase):
+	def setUp(self):
+		self.book = alerts.AlertBook(os.path.join(tempfile.mkdtemp(), "alerts.json"))
+	# End def
+
+	def ids(self, triggered: list) -> list:
+		return sorted(alert.id for alert, price in triggered)
+	# End def
+
+	def test_rising_prices_trigger_above_alerts(self):
+		low = self.book.add(AAPL, True, 100.0, 1, 1)
+		high = self.book.add(AAPL, True, 110.0, 1, 1)
+		self.book.add(AAPL, False, 90.0, 1, 1)
+
+		self.assertEqual(self.book.check({AAPL: 99.0}), [])
+		self.assertEqual(self.ids(self.book.check({AAPL: 105.0})), [low.id])
+		self.assertEqual(self.ids(self.book.check({AAPL: 110.0})), [high.id])
+		self.assertEqual(len(self.book.alerts), 1)
+	# End def
+
+	def test_falling_prices_trigger_below_alerts(self):
+		first = self.book.add(BTC, False, 50000.0, 1, 1)
+		second = self.book.add(BTC, False, 40000.0, 2, 1)
+		self.book.add(BTC, True, 70000.0, 1, 1)
+
+		triggered = self.book.check({BTC: 39000.0, AAPL: 1.0})
+
+		self.assertEqual(self.ids(triggered), [first.id, second.id])
+		self.assertEqual([price for alert, price in triggered], [39000.0, 39000.0])
+		self.assertEqual(self.book.stats()["triggered"], 2)
+	# End def
+
+	def test_changes_are_announced(self):
+		calls = []
+		self.book.on_change.append(lambda: calls.append(sorted(self.book.symbols())))
+		alert = self.book.add(AAPL, True, 100.0, 1, 1)
+		self.book.check({AAPL: 99.0})
+		self.book.check({AAPL: 100.0})
+
+		self.assertEqual(calls, [[AAPL], []])
+		self.assertIsNone(self.book.remove(alert.id, 1))
+	# End def
+
+	def test_removed_alerts_never_trigger(self):
+		removed = self.book.add(AAPL, True, 100.0, 1, 1)
+		kept = self.book.add(AAPL, True, 101.0, 1, 1)
+
+		self.assertIsNone(self.book.remove(removed.id, user_id=2))
+		self.assertIs(self.book.remove(removed.id, user_id=1), removed)
+
+		# The removed alert is still in the heap, and is skipped once popped
+		self.assertEqual(len(self.book.books[AAPL][0]), 2)
+		self.assertEqual(self.ids(self.book.check({AAPL: 200.0})), [kept.id])
+		self.assertEqual(self.book.stats()["triggered"], 1)
+		self.assertNotIn(AAPL, self.book.books)
+	# End def
+# End class
+
+class PersistenceTest(unittest.IsolatedAsyncioTestCase):
+	async def test_alerts_and_ids_survive_a_restart(self):
+		path = os.path.join(tempfile.mkdtemp(), "data", "alerts.json")
+		book = alerts.AlertBook(path)
+		await book.load()
+		book.add(AAPL, True, 100.0, 1, 10)
+		removed = book.add(BTC, False, 50000.0, 2, 20)
+		book.remove(removed.id, 2)
+		await book.save()
+
+		with open(path) as f:
+			self.assertEqual(json.load(f)["next_id"], 3)
+		# End with
+
+		restarted = alerts.AlertBook(path)
+		await restarted.load()
+
+		self.assertEqual([alert.describe() for alert in restarted.alerts.values()], ["#1: AAPL > $100.00"])
+		self.assertEqual(restarted.for_user(1)[0].channel_id, 10)
+		self.assertEqual(restarted.add(BTC, True, 1.0, 2, 20).id, 3)
+		self.assertEqual(restarted.per_user, {1: 1, 2: 1})
+		self.assertEqual(restarted.check({AAPL: 100.0})[0][0].id, 1)
+	# End def
+
+	async def test_missing_file_starts_empty(self):
+		book = alerts.AlertBook(os.path.join(tempfile.mkdtemp(), "alerts.json"))
+		await book.load()
+
+		self.assertEqual((book.alerts, book.next_id, book.loaded), ({}, 1, True))
+	# End def
+# End class
+
+if __name__ == "__main__":
+	unittest.main()
+# End if
@@ -0,0 +1,89 @@
+# Copyright 2020 - Custom License - https://github.com/Tim-Dusek/DiscordStockBot/blob/master/LICENSE
+# Maintained by Tim-Dusek and cdchris12
+
+###
+# Import statements
+###
+
+import time, unittest
+import cache
+
+###
+# Cache
+###
+
+class CacheTest(unittest.TestCase):
+	def setUp(self):
+		# Every value counts as its own length in bytes
+		self.cache = cache.Cache("test", 10, sizeof=len)
+	# End def
+
+	def test_least_recently_used_entries_are_evicted_over_budget(self):
+		self.cache.put("a", "aaaa")
+		self.cache.put("b", "bbbb")
+		self.assertEqual(self.cache.get("a"), "aaaa")
+
+		# "b" is now the least recently used, so it goes to make room
+		self.cache.put("c", "cccc")
+
+		self.assertIsNone(self.cache.get("b"))
+		self.assertEqual(self.cache.get("a"), "aaaa")
+		self.assertEqual(self.cache.get("c"), "cccc")
+		self.assertEqual((self.cache.bytes, self.cache.evictions), (8, 1))
+	# End def
+
+	def test_replacing_an_entry_frees_its_old_size(self):
+		self.cache.put("a", "aaaaaaaa")
+		self.cache.put("a", "aa")
+		self.cache.put("b", "bbbbbbbb")
+
+		self.assertEqual(self.cache.get("a"), "aa")
+		self.assertEqual((self.cache.bytes, self.cache.evictions), (10, 0))
+	# End def
+
+	def test_oversized_values_are_not_cached(self):
+		self.cache.put("a", "aaaa")
+		self.cache.put("big", "x" * 11)
+
+		self.assertIsNone(self.cache.get("big"))
+		self.assertEqual(self.cache.get("a"), "aaaa")
+	# End def
+
+	def test_expired_entries_are_misses(self):
+		self.cache.put("old", "o", expires_at=time.time() - 1)
+		self.cache.put("new", "n", expires_at=time.time() + 60)
+		self.cache.put("forever", "f")
+
+		self.assertIsNone(self.cache.peek("old"))
+		self.assertEqual(self.cache.get("old", "default"), "default")
+		self.assertEqual(self.cache.get("new"), "n")
+		self.assertEqual(self.cache.get("forever"), "f")
+		self.assertNotIn("old", self.cache.entries)
+		self.assertEqual(self.cache.bytes, 2)
+	# End def
+
+	def test_stats_count_hits_and_misses(self):
+		self.cache.put("a", "a")
+		self.cache.get("a")
+		self.cache.get("a")
+		self.cache.get("b")
+		self.cache.peek("a")
+		self.cache.peek("b")
+
+		self.assertEqual(self.cache.stats(), {"entries": 1, "bytes": 1, "hits": 2, "misses": 1, "evictions": 0})
+		self.assertIn(self.cache, cache.caches)
+	# End def
+
+	def test_peek_leaves_the_lru_order_alone(self):
+		self.cache.put("a", "aaaa")
+		self.cache.put("b", "bbbb")
+		self.cache.peek("a")
+		self.cache.put("c", "cccc")
+
+		self.assertIsNone(self.cache.get("a"))
+	# End def
+# End class
+
+if __name__ == "__main__":
+	unittest.main()
+# End if
@@ -0,0 +1,151 @@
+# Copyright 2020 - Custom License - https://github.com/Tim-Dusek/DiscordStockBot/blob/master/LICENSE
+# Maintained by Tim-Dusek and cdchris12
+
+###
+# Import statements
+###
+
+import unittest
+import aiohttp
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+import crypto_client
+
+###
+# Cryptocompare client
+###
+
+# A local stand in for min-api.cryptocompare.com. `failures` holds statuses to answer with
+# before the real response, one per request.
+class StubServer:
+	def __init__(self):
+		self.failures = []
+		self.requests = []
+		app = web.Application()
+		app.router.add_get("/data/pricemulti", self.pricemulti)
+		app.router.add_get("/data/v2/histoday", self.histoday)
+		self.server = TestServer(app)
+	# End def
+
+	def _fail(self, request):
+		self.requests.append(request)
+
+		if self.failures:
+			return web.Response(status=self.failures.pop(0))
+		# End if
+
+		return None
+	# End def
+
+	async def pricemulti(self, request):
+		failed = self._fail(request)
+
+		if failed is not None:
+			return failed
+		# End if
+
+		if request.query["fsyms"] == "NOPE":
+			return web.json_response({"Response": "Error", "Message": "There is no data for any of the toSymbols NOPE ."})
+		# End if
+
+		return web.json_response({
+			coin: {currency: 2.0 for currency in request.query["tsyms"].split(",")}
+			for coin in request.query["fsyms"].split(",")
+		})
+	# End def
+
+	async def histoday(self, request):
+		failed = self._fail(request)
+
+		if failed is not None:
+			return failed
+		# End if
+
+		return web.json_response({"Response": "Success", "Data": {"Data": [
+			{"time": 1719446400, "close": 1.0},
+			{"time": 1719532800, "close": 2.0}
+		]}})
+	# End def
+# End class
+
+class CryptoCompareClientTest(unittest.IsolatedAsyncioTestCase):
+	async def asyncSetUp(self):
+		self.stub = StubServer()
+		await self.stub.server.start_server()
+		self.client = crypto_client.CryptoCompareClient(
+			base_url=str(self.stub.server.make_url("/data")),
+			api_key="secret",
+			retries=2,
+			backoff=0.001
+		)
+	# End def
+
+	async def asyncTearDown(self):
+		await self.client.close()
+		await self.stub.server.close()
+	# End def
+
+	async def test_price_multi_batches_coins_and_currencies(self):
+		prices = await self.client.price_multi(["btc", "eth"], ["usd", "krw"])
+
+		self.assertEqual(prices, {"BTC": {"USD": 2.0, "KRW": 2.0}, "ETH": {"USD": 2.0, "KRW": 2.0}})
+		self.assertEqual(len(self.stub.requests), 1)
+		self.assertEqual(self.stub.requests[0].headers["authorization"], "Apikey secret")
+	# End def
+
+	async def test_histo_returns_candles(self):
+		candles = await self.client.histo("day", "btc", limit=2, to_ts=1719532800)
+
+		self.assertEqual([candle["close"] for candle in candles], [1.0, 2.0])
+		self.assertEqual(self.stub.requests[0].query["toTs"], "1719532800")
+	# End def
+
+	async def test_server_errors_are_retried(self):
+		self.stub.failures = [503, 429]
+		prices = await self.client.price("btc")
+
+		self.assertEqual(prices, {"BTC": {"USD": 2.0}})
+		self.assertEqual(self.client.stats(), {"requests": 3, "retried": 2})
+	# End def
+
+	async def test_gives_up_after_the_last_retry(self):
+		self.stub.failures = [503, 503, 503, 503]
+
+		with self.assertRaises(aiohttp.ClientResponseError) as raised:
+			await self.client.price("btc")
+		# End with
+
+		self.assertEqual(raised.exception.status, 503)
+		self.assertEqual(len(self.stub.requests), 3)
+	# End def
+
+	async def test_client_errors_are_not_retried(self):
+		self.stub.failures = [404]
+
+		with self.assertRaises(aiohttp.ClientResponseError):
+			await self.client.price("btc")
+		# End with
+
+		self.assertEqual(self.client.stats()["retried"], 0)
+	# End def
+
+	async def test_error_body_raises(self):
+		with self.assertRaises(crypto_client.CryptoCompareError):
+			await self.client.price("nope")
+		# End with
+	# End def
+
+	async def test_session_is_reused_and_closed(self):
+		await self.client.price("btc")
+		session = self.client.session
+		await self.client.price("eth")
+
+		self.assertIs(self.client.session, session)
+		await self.client.close()
+		self.assertTrue(session.closed)
+	# End def
+# End class
+
+if __name__ == "__main__":
+	unittest.main()
+# End if
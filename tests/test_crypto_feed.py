@@ -0,0 +1,145 @@
+# Copyright 2020 - Custom License - https://github.com/Tim-Dusek/DiscordStockBot/blob/master/LICENSE
+# Maintained by Tim-Dusek and cdchris12
+
+###
+# Import statements
+###
+
+import asyncio, unittest
+from unittest import mock
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+import crypto_client, crypto_feed
+
+###
+# Crypto feed
+###
+
+# A local stand in for cryptocompare: the streamer on /v2 and pricemulti on /data/pricemulti.
+# Every stream connection is answered with a price for each pair subscribed to, followed by
+# `closing` if it's set, e.g. a 401 or 429 message.
+class StubServer:
+	def __init__(self):
+		self.connections = 0
+		self.subs = []
+		self.closing = None
+		self.pricemulti_requests = []
+		app = web.Application()
+		app.router.add_get("/v2", self.stream)
+		app.router.add_get("/data/pricemulti", self.pricemulti)
+		self.server = TestServer(app)
+	# End def
+
+	async def stream(self, request):
+		self.connections += 1
+		ws = web.WebSocketResponse()
+		await ws.prepare(request)
+		self.subs = (await ws.receive_json())["subs"]
+
+		for sub in self.subs:
+			kind, market, coin, currency = sub.split("~")
+			await ws.send_json({"TYPE": "5", "MARKET": market, "FROMSYMBOL": coin, "TOSYMBOL": currency, "PRICE": 100.0})
+		# End for
+
+		if self.closing is not None:
+			await ws.send_json(self.closing)
+		# End if
+
+		# Hold the connection open until the client goes away
+		async for message in ws:
+			pass
+		# End for
+
+		return ws
+	# End def
+
+	async def pricemulti(self, request):
+		self.pricemulti_requests.append(dict(request.query))
+		return web.json_response({
+			coin: {currency: 1.0 for currency in request.query["tsyms"].split(",")}
+			for coin in request.query["fsyms"].split(",")
+		})
+	# End def
+# End class
+
+class CryptoFeedTest(unittest.IsolatedAsyncioTestCase):
+	async def asyncSetUp(self):
+		self.stub = StubServer()
+		await self.stub.server.start_server()
+		self.client = crypto_client.CryptoCompareClient(base_url=str(self.stub.server.make_url("/data")), retries=0)
+		self.patch = mock.patch.object(crypto_client, "client", self.client)
+		self.patch.start()
+		self.feed = crypto_feed.CryptoFeed(
+			coins=["btc", "eth"],
+			currencies=["usd"],
+			url=str(self.stub.server.make_url("/v2")),
+			poll_interval=0.05,
+			rate_limit_backoff=300.0
+		)
+	# End def
+
+	async def asyncTearDown(self):
+		if self.feed.task is not None:
+			self.feed.task.cancel()
+			await asyncio.gather(self.feed.task, return_exceptions=True)
+		# End if
+
+		self.patch.stop()
+		await self.client.close()
+		await self.stub.server.close()
+	# End def
+
+	async def wait_for(self, condition, timeout=2.0) -> None:
+		async def wait():
+			while not condition():
+				await asyncio.sleep(0.01)
+			# End while
+		# End def
+
+		await asyncio.wait_for(wait(), timeout)
+	# End def
+
+	async def test_streamed_prices_are_served_from_memory(self):
+		self.feed.start()
+		await self.wait_for(lambda: self.feed.updates == 2)
+
+		self.assertEqual(self.stub.subs, ["5~CCCAGG~BTC~USD", "5~CCCAGG~ETH~USD"])
+		self.assertEqual(await self.feed.get_prices(["btc", "ETH"], ["usd"]), {"BTC": {"USD": 100.0}, "ETH": {"USD": 100.0}})
+		self.assertEqual((self.feed.hits, self.feed.misses), (1, 0))
+		self.assertEqual(self.stub.pricemulti_requests, [])
+	# End def
+
+	async def test_unknown_coins_are_fetched_on_demand(self):
+		self.feed.start()
+		await self.wait_for(lambda: self.feed.updates == 2)
+
+		prices = await self.feed.get_prices(["BTC", "DOGE"], ["USD"])
+
+		self.assertEqual(prices, {"BTC": {"USD": 100.0}, "DOGE": {"USD": 1.0}})
+		self.assertEqual(self.stub.pricemulti_requests, [{"fsyms": "DOGE", "tsyms": "USD"}])
+		self.assertEqual(self.feed.misses, 1)
+	# End def
+
+	async def test_rejected_key_stops_streaming(self):
+		self.stub.closing = {"TYPE": "401", "MESSAGE": "UNAUTHORIZED"}
+		self.feed.start()
+		await self.wait_for(lambda: self.feed.polls >= 3)
+
+		self.assertEqual(self.feed.url, "")
+		self.assertEqual(self.stub.connections, 1)
+	# End def
+
+	async def test_rate_limit_backs_off_and_keeps_polling(self):
+		self.stub.closing = {"TYPE": "429", "MESSAGE": "TOO_MANY_SOCKETS_MAX_1_PER_CLIENT"}
+		self.feed.start()
+		await self.wait_for(lambda: self.feed.polls >= 3)
+
+		self.assertEqual(self.stub.connections, 1)
+		self.assertFalse(self.feed.streaming)
+		self.assertEqual(self.feed.price("BTC"), 1.0)
+	# End def
+# End class
+
+if __name__ == "__main__":
+	unittest.main()
+# End if
@@ -0,0 +1,78 @@
+# Copyright 2020 - Custom License - https://github.com/Tim-Dusek/DiscordStockBot/blob/master/LICENSE
+# Maintained by Tim-Dusek and cdchris12
+
+###
+# Import statements
+###
+
+import unittest
+from unittest import mock
+import numpy as np, pandas as pd
+import data_access, parsing
+
+###
+# Batched history downloads
+###
+
+# Stands in for yf.download on two symbols of daily bars. Like yfinance, it drops the timezone
+# from daily bars unless it's asked to keep it.
+def fake_download(tickers, ignore_tz=None, **kwargs):
+	index = pd.DatetimeIndex(["2024-06-27", "2024-06-28"])
+
+	if ignore_tz is False:
+		index = index.tz_localize("America/New_York")
+	# End if
+
+	columns = pd.MultiIndex.from_product([tickers, ["Open", "High", "Low", "Close", "Volume"]])
+	return pd.DataFrame(np.ones((len(index), len(columns))), index=index, columns=columns)
+# End def
+
+class DownloadDatesTest(unittest.TestCase):
+	def dates(self, download) -> list:
+		with mock.patch("yfinance.download", download):
+			frames = data_access._download(["AAPL", "MSFT"], "1d", start="2024-06-27", end="2024-06-29")
+		# End with
+
+		return [str(day)[:16] for day in parsing.normalize_history(frames["MSFT"])["time"]]
+	# End def
+
+	def test_daily_bars_keep_their_dates(self):
+		self.assertEqual(self.dates(fake_download), ["2024-06-27T00:00", "2024-06-28T00:00"])
+	# End def
+
+	def test_naive_daily_bars_are_read_as_eastern(self):
+		naive = lambda tickers, **kwargs: fake_download(tickers)
+		self.assertEqual(self.dates(naive), ["2024-06-27T00:00", "2024-06-28T00:00"])
+	# End def
+# End class
+
+###
+# News cache
+###
+
+class NewsCacheTest(unittest.IsolatedAsyncioTestCase):
+	def setUp(self):
+		data_access.news_cache.clear()
+		data_access.news_cache.hits = data_access.news_cache.misses = 0
+	# End def
+
+	# The same sequence send_news runs: peek to decide on the notice, then search
+	async def send_news(self, query: str) -> list:
+		data_access.cached_news(query)
+		return await data_access.search_news(query)
+	# End def
+
+	async def test_each_search_counts_once(self):
+		with mock.patch.object(data_access, "_search", lambda query, num: ["https://example.com/news"]):
+			await self.send_news("Stock Market")
+			await self.send_news("stock  market")
+		# End with
+
+		stats = data_access.news_cache.stats()
+		self.assertEqual((stats["hits"], stats["misses"]), (1, 1))
+	# End def
+# End class
+
+if __name__ == "__main__":
+	unittest.main()
+# End if
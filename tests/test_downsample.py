@@ -0,0 +1,110 @@
+# Copyright 2020 - Custom License - https://github.com/Tim-Dusek/DiscordStockBot/blob/master/LICENSE
+# Maintained by Tim-Dusek and cdchris12
+
+###
+# Import statements
+###
+
+import unittest
+import numpy as np
+import downsample
+
+###
+# Downsampling
+###
+
+class LTTBTest(unittest.TestCase):
+	def test_keeps_first_and_last_points_and_the_length(self):
+		rng = np.random.default_rng(1)
+		y = np.cumsum(rng.normal(size=10000))
+
+		for max_points in (3, 4, 100, 999, 9999):
+			with self.subTest(max_points=max_points):
+				selected = downsample.lttb(np.arange(10000), y, max_points)
+
+				self.assertEqual(len(selected), max_points)
+				self.assertEqual((selected[0], selected[-1]), (0, 9999))
+				self.assertTrue((np.diff(selected) > 0).all())
+			# End with
+		# End for
+	# End def
+
+	def test_keeps_spikes(self):
+		y = np.zeros(1000)
+		y[123], y[777] = 50.0, -50.0
+		selected = downsample.lttb(np.arange(1000), y, 20)
+
+		self.assertIn(123, selected)
+		self.assertIn(777, selected)
+	# End def
+
+	def test_datetime_axis(self):
+		x = np.arange("2024-01-01", "2024-04-10", dtype="datetime64[D]")
+		selected = downsample.lttb(x, np.sin(np.arange(len(x)) / 5), 30)
+
+		self.assertEqual(len(selected), 30)
+		self.assertEqual((selected[0], selected[-1]), (0, len(x) - 1))
+	# End def
+
+	def test_short_series_are_left_alone(self):
+		for n, max_points in ((10, 10), (10, 50), (10, 2)):
+			with self.subTest(n=n, max_points=max_points):
+				self.assertEqual(downsample.lttb(np.arange(n), np.arange(n), max_points).tolist(), list(range(n)))
+			# End with
+		# End for
+	# End def
+# End class
+
+class OHLCTest(unittest.TestCase):
+	def bars(self, n: int) -> dict:
+		rng = np.random.default_rng(2)
+		close = 100 + np.cumsum(rng.normal(size=n))
+		open_ = close + rng.normal(size=n)
+
+		return {
+			"time": np.arange(n) * 60,
+			"open_": open_,
+			"high": np.maximum(open_, close) + rng.random(n),
+			"low": np.minimum(open_, close) - rng.random(n),
+			"close": close,
+			"volume": rng.integers(1, 1000, n).astype(np.float64)
+		}
+	# End def
+
+	def test_each_bucket_keeps_its_extremes(self):
+		bars = self.bars(1003)
+		result = downsample.ohlc(**bars, buckets=10)
+		starts = np.linspace(0, 1003, 10, endpoint=False).astype(np.int64)
+		ends = np.append(starts[1:], 1003)
+
+		self.assertEqual(len(result["close"]), 10)
+
+		for i, (start, end) in enumerate(zip(starts, ends)):
+			with self.subTest(bucket=i):
+				self.assertEqual(result["time"][i], bars["time"][start])
+				self.assertEqual(result["open"][i], bars["open_"][start])
+				self.assertEqual(result["high"][i], bars["high"][start:end].max())
+				self.assertEqual(result["low"][i], bars["low"][start:end].min())
+				self.assertEqual(result["close"][i], bars["close"][end - 1])
+				self.assertEqual(result["volume"][i], bars["volume"][start:end].sum())
+			# End with
+		# End for
+
+		# Nothing is lost across the whole range
+		self.assertEqual(result["high"].max(), bars["high"].max())
+		self.assertEqual(result["low"].min(), bars["low"].min())
+		self.assertEqual((result["open"][0], result["close"][-1]), (bars["open_"][0], bars["close"][-1]))
+		self.assertAlmostEqual(result["volume"].sum(), bars["volume"].sum())
+	# End def
+
+	def test_short_series_are_left_alone(self):
+		bars = self.bars(5)
+		result = downsample.ohlc(**bars, buckets=5)
+
+		self.assertIs(result["close"], bars["close"])
+	# End def
+# End class
+
+if __name__ == "__main__":
+	unittest.main()
+# End if
@@ -0,0 +1,90 @@
+# Copyright 2020 - Custom License - https://github.com/Tim-Dusek/DiscordStockBot/blob/master/LICENSE
+# Maintained by Tim-Dusek and cdchris12
+
+###
+# Import statements
+###
+
+import asyncio, unittest
+import job_queue
+
+###
+# Job queue
+###
+
+class FakeContext:
+	def __init__(self, user_id: int, channel_id: int, fail_send=False):
+		self.author = type("Author", (), {"id": user_id})()
+		self.channel = type("Channel", (), {"id": channel_id})()
+		self.fail_send = fail_send
+		self.sent = []
+	# End def
+
+	async def send(self, message: str) -> None:
+		if self.fail_send:
+			raise RuntimeError("Missing Permissions")
+		# End if
+
+		self.sent.append(message)
+	# End def
+# End class
+
+def make_queue(max_running=1, max_queued=5, user_burst=100.0, channel_burst=100.0) -> job_queue.JobQueue:
+	return job_queue.JobQueue(
+		max_running=max_running,
+		max_queued=max_queued,
+		user_limiter=job_queue.RateLimiter(60, user_burst),
+		channel_limiter=job_queue.RateLimiter(60, channel_burst)
+	)
+# End def
+
+class JobQueueTest(unittest.IsolatedAsyncioTestCase):
+	async def test_failed_place_in_line_message_frees_the_slot(self):
+		jobs = make_queue()
+		release = asyncio.Event()
+
+		async def job(ctx):
+			await release.wait()
+		# End def
+
+		running = asyncio.ensure_future(jobs.run(FakeContext(1, 1), job))
+		await asyncio.sleep(0)
+
+		with self.assertRaises(RuntimeError):
+			await jobs.run(FakeContext(2, 1, fail_send=True), job)
+		# End with
+
+		release.set()
+		await running
+
+		self.assertEqual(jobs.stats()["running"], 0)
+		self.assertEqual(jobs.stats()["waiting"], 0)
+	# End def
+
+	async def test_rejected_jobs_keep_their_tokens(self):
+		jobs = make_queue(max_queued=0, user_burst=1.0)
+		release = asyncio.Event()
+
+		async def job(ctx):
+			await release.wait()
+		# End def
+
+		running = asyncio.ensure_future(jobs.run(FakeContext(1, 1), job))
+		await asyncio.sleep(0)
+
+		# The queue is full, so user 2 is turned away without spending their only token
+		await jobs.run(FakeContext(2, 1), job)
+		self.assertEqual(jobs.stats()["rejected"], 1)
+
+		release.set()
+		await running
+
+		await jobs.run(FakeContext(2, 1), job)
+		self.assertEqual(jobs.stats()["limited"], 0)
+		self.assertEqual(jobs.stats()["completed"], 2)
+	# End def
+# End class
+
+if __name__ == "__main__":
+	unittest.main()
+# End if
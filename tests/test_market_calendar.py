@@ -0,0 +1,118 @@
+# Copyright 2020 - Custom License - https://github.com/Tim-Dusek/DiscordStockBot/blob/master/LICENSE
+# Maintained by Tim-Dusek and cdchris12
+
+###
+# Import statements
+###
+
+import datetime, unittest
+import arrow
+import market_calendar
+
+###
+# Market calendar
+###
+
+def eastern(text: str) -> arrow.Arrow:
+	return arrow.get(text, tzinfo="US/Eastern")
+# End def
+
+def clock(moment: arrow.Arrow) -> str:
+	return moment.to("US/Eastern").format("YYYY-MM-DD HH:mm")
+# End def
+
+# (day, holiday name, regular session, extended session); sessions as ("HH:mm", "HH:mm") or None
+days = [
+	("2026-10-16", "", ("09:30", "16:00"), ("04:00", "20:00")),
+	("2026-10-17", "", None, None),
+	("2026-04-03", "Good Friday", None, None),
+	("2026-07-02", "", ("09:30", "16:00"), ("04:00", "20:00")),
+	("2026-07-03", "Independence Day (observed)", None, None),
+	("2026-11-26", "Thanksgiving Day", None, None),
+	("2026-11-27", "", ("09:30", "13:00"), ("04:00", "17:00")),
+	("2026-12-24", "", ("09:30", "13:00"), ("04:00", "17:00")),
+	("2026-12-25", "Christmas Day", None, None),
+	("2027-01-01", "New Year's Day", None, None),
+	("2027-07-02", "", ("09:30", "16:00"), ("04:00", "20:00"))
+]
+
+# (now, prepost, next open, next close)
+next_times = [
+	# Friday after the close, over the weekend
+	("2026-10-16 16:30", False, "2026-10-19 09:30", "2026-10-19 16:00"),
+	("2026-10-16 20:30", True, "2026-10-19 04:00", "2026-10-19 20:00"),
+	("2026-10-17 12:00", False, "2026-10-19 09:30", "2026-10-19 16:00"),
+	# During a session, the close is today's
+	("2026-10-19 10:00", False, "2026-10-20 09:30", "2026-10-19 16:00"),
+	("2026-10-19 17:00", True, "2026-10-20 04:00", "2026-10-19 20:00"),
+	# Over Thanksgiving into the early close
+	("2026-11-25 16:30", False, "2026-11-27 09:30", "2026-11-27 13:00"),
+	("2026-11-27 14:00", True, "2026-11-30 04:00", "2026-11-27 17:00"),
+	# Christmas Eve's early close, Christmas and the weekend after
+	("2026-12-24 13:30", False, "2026-12-28 09:30", "2026-12-28 16:00"),
+	# Over New Year's, which the year built for 2026 has to cover
+	("2026-12-31 16:30", False, "2027-01-04 09:30", "2027-01-04 16:00")
+]
+
+class CalendarTest(unittest.TestCase):
+	def test_days(self):
+		for day, holiday, regular, extended in days:
+			with self.subTest(day=day):
+				date = datetime.date.fromisoformat(day)
+
+				self.assertEqual(market_calendar.holiday_name(date), holiday)
+				self.assertEqual(market_calendar.is_session(date), regular is not None)
+				self.assertEqual(market_calendar.is_early_close(date), regular is not None and regular[1] == "13:00")
+
+				for prepost, hours in ((False, regular), (True, extended)):
+					times = market_calendar.session(date, prepost=prepost)
+					self.assertEqual(times and tuple(moment.format("HH:mm") for moment in times), hours)
+				# End for
+			# End with
+		# End for
+	# End def
+
+	def test_next_open_and_close(self):
+		for now, prepost, next_open, next_close in next_times:
+			with self.subTest(now=now, prepost=prepost):
+				self.assertEqual(clock(market_calendar.next_open(eastern(now), prepost=prepost)), next_open)
+				self.assertEqual(clock(market_calendar.next_close(eastern(now), prepost=prepost)), next_close)
+			# End with
+		# End for
+	# End def
+
+	def test_is_open(self):
+		for now, prepost, expected in (
+			("2026-10-16 09:29", False, False),
+			("2026-10-16 09:30", False, True),
+			("2026-10-16 16:00", False, False),
+			("2026-10-16 19:59", True, True),
+			("2026-11-27 13:30", False, False),
+			("2026-11-27 13:30", True, True),
+			("2026-11-27 17:00", True, False),
+			("2026-11-26 12:00", True, False),
+			("2026-10-17 12:00", True, False)
+		):
+			with self.subTest(now=now, prepost=prepost):
+				self.assertEqual(market_calendar.is_open(eastern(now), prepost=prepost), expected)
+			# End with
+		# End for
+	# End def
+
+	def test_next_closure_skips_weekend_holidays(self):
+		# Independence Day 2027 is a Sunday, observed on Monday the 5th
+		for now, closure in (
+			("2026-11-20 12:00", "2026-11-26 09:30"),
+			("2026-11-26 10:00", "2026-12-25 09:30"),
+			("2027-06-21 12:00", "2027-07-05 09:30")
+		):
+			with self.subTest(now=now):
+				self.assertEqual(clock(market_calendar.next_closure(eastern(now))), closure)
+			# End with
+		# End for
+	# End def
+# End class
+
+if __name__ == "__main__":
+	unittest.main()
+# End if
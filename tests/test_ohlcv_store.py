@@ -0,0 +1,167 @@
+# Copyright 2020 - Custom License - https://github.com/Tim-Dusek/DiscordStockBot/blob/master/LICENSE
+# Maintained by Tim-Dusek and cdchris12
+
+###
+# Import statements
+###
+
+import os, tempfile, unittest
+from unittest import mock
+import arrow, numpy as np, pandas as pd
+import crypto_client, data_access, ohlcv_store
+
+###
+# OHLCV store
+###
+
+def bars(start_ts: int, count: int, step=60, price=1.0) -> list:
+	return [(start_ts + i * step, price, price, price, price, 10.0, None) for i in range(count)]
+# End def
+
+class StoreTest(unittest.TestCase):
+	def setUp(self):
+		self.path = os.path.join(tempfile.mkdtemp(), "data", "ohlcv.sqlite3")
+		self.store = ohlcv_store.OHLCVStore(self.path, 64 * 1024 * 1024)
+	# End def
+
+	def test_writes_extend_coverage(self):
+		self.store.write("crypto:BTC:minute", bars(600, 5))
+		self.store.write("crypto:BTC:minute", bars(840, 3, price=2.0))
+
+		# The overlapping bar at 840 is replaced by the newer write
+		rows = self.store.read("crypto:BTC:minute")
+		self.assertEqual([row[0] for row in rows], [600, 660, 720, 780, 840, 900, 960])
+		self.assertEqual(rows[4][4], 2.0)
+		self.assertEqual(self.store.coverage("crypto:BTC:minute"), (600, 960, False))
+		self.assertEqual([row[0] for row in self.store.read("crypto:BTC:minute", 700, 900)], [720, 780, 840, 900])
+	# End def
+
+	def test_reset_drops_old_bars_and_complete_sticks(self):
+		self.store.write("stock:AAPL:1d:rth", bars(0, 5, step=86400), complete=True)
+		self.store.write("stock:AAPL:1d:rth", bars(86400 * 10, 2, step=86400))
+		self.assertEqual(self.store.coverage("stock:AAPL:1d:rth"), (0, 86400 * 11, True))
+
+		self.store.write("stock:AAPL:1d:rth", bars(86400 * 20, 2, step=86400), reset=True)
+		self.assertEqual(self.store.coverage("stock:AAPL:1d:rth"), (86400 * 20, 86400 * 21, False))
+		self.assertEqual(len(self.store.read("stock:AAPL:1d:rth")), 2)
+	# End def
+
+	def test_bars_survive_reopening(self):
+		self.store.write("crypto:ETH:hour", bars(3600, 24, step=3600))
+		self.assertEqual(self.store.conn.execute("PRAGMA journal_mode").fetchone()[0], "wal")
+
+		# Reopened without closing first, as after a crash, so the bars are still only in the WAL
+		reopened = ohlcv_store.OHLCVStore(self.path, 64 * 1024 * 1024)
+
+		self.assertEqual(reopened.coverage("crypto:ETH:hour"), (3600, 3600 * 24, False))
+		self.assertEqual(reopened.read("crypto:ETH:hour"), self.store.read("crypto:ETH:hour"))
+	# End def
+
+	def test_prune_drops_least_recently_read_series(self):
+		empty = self.store.used_bytes()
+		self.store.write("a", bars(0, 2000))
+		size = self.store.used_bytes() - empty
+
+		# Room for two series but not three
+		self.store.max_bytes = empty + int(size * 2.5)
+		self.store.write("b", bars(0, 2000))
+		self.store.read("a")
+		self.store.write("c", bars(0, 2000))
+
+		self.assertIsNotNone(self.store.coverage("a"))
+		self.assertIsNone(self.store.coverage("b"))
+		self.assertIsNotNone(self.store.coverage("c"))
+		self.assertEqual(self.store.read("b"), [])
+		self.assertLessEqual(self.store.used_bytes(), self.store.max_bytes)
+	# End def
+
+	def test_prune_keeps_the_series_being_written(self):
+		empty = self.store.used_bytes()
+		self.store.max_bytes = empty + 4096
+		self.store.write("a", bars(0, 2000))
+
+		self.assertEqual(len(self.store.read("a")), 2000)
+	# End def
+# End class
+
+###
+# Delta fetches
+###
+
+# Stands in for cryptocompare's histo endpoints: `limit` candles before `to_ts` and the one at it
+class FakeHisto:
+	def __init__(self):
+		self.limits = []
+	# End def
+
+	async def __call__(self, period, coin, currency="USD", limit=1440, to_ts=None) -> list:
+		self.limits.append(limit)
+		step = data_access.crypto_seconds[period]
+		end_ts = int(arrow.get(to_ts).timestamp()) // step * step
+
+		return [
+			{"time": ts, "open": 1.0, "high": 1.0, "low": 1.0, "close": ts / step, "volumefrom": 1.0, "volumeto": 1.0}
+			for ts in range(end_ts - limit * step, end_ts + step, step)
+		]
+	# End def
+# End class
+
+class DeltaFetchTest(unittest.IsolatedAsyncioTestCase):
+	def setUp(self):
+		self.store = ohlcv_store.OHLCVStore(os.path.join(tempfile.mkdtemp(), "ohlcv.sqlite3"), 64 * 1024 * 1024)
+		self.patch = mock.patch.object(data_access, "_store", self.store)
+		self.patch.start()
+	# End def
+
+	def tearDown(self):
+		self.patch.stop()
+	# End def
+
+	async def test_crypto_history_fetches_only_new_candles(self):
+		histo = FakeHisto()
+		start = 1719590400
+
+		with mock.patch.object(crypto_client.client, "histo", histo):
+			first = await data_access._stored_crypto_history("BTC", "minute", 60, start)
+			later = await data_access._stored_crypto_history("BTC", "minute", 60, start + 5 * 60)
+		# End with
+
+		self.assertEqual(histo.limits, [60, 5])
+		self.assertEqual(len(first), 61)
+		self.assertEqual([candle["time"] for candle in later], list(range(start - 55 * 60, start + 6 * 60, 60)))
+	# End def
+
+	async def test_stock_history_fetches_from_the_last_stored_bar(self):
+		days = pd.date_range(end=arrow.utcnow().floor("day").shift(days=-1).datetime, periods=400, freq="1D", tz="UTC").tz_convert("America/New_York")
+		full = pd.DataFrame({"Open": 1.0, "High": 1.0, "Low": 1.0, "Close": np.arange(400.0), "Volume": 1.0}, index=days)
+		newest = days[-1] + pd.Timedelta(days=1)
+		delta_starts = []
+
+		class FakeTicker:
+			def __init__(self, company):
+				pass
+			# End def
+
+			def history(self, start=None, **kwargs):
+				delta_starts.append(int(arrow.get(start).timestamp()))
+				return pd.DataFrame({"Open": 1.0, "High": 1.0, "Low": 1.0, "Close": [399.5, 400.0], "Volume": 1.0}, index=pd.DatetimeIndex([days[-1], newest]))
+			# End def
+		# End class
+
+		with mock.patch.object(data_access, "_history", lambda *a, **kw: full), mock.patch("yfinance.Ticker", FakeTicker):
+			first = await data_access.run_blocking(data_access._stored_history, "AAPL", "1d", period="1y")
+			later = await data_access.run_blocking(data_access._stored_history, "AAPL", "1d", period="1y")
+		# End with
+
+		# The year asked for is served, and the second call only fetched from the last stored bar on
+		self.assertEqual(first["Close"].iloc[-1], 399.0)
+		self.assertLess(len(first), 400)
+		self.assertEqual(delta_starts, [int(days[-1].timestamp())])
+		self.assertEqual(later["Close"].tolist()[-3:], [398.0, 399.5, 400.0])
+		self.assertEqual(later.index[-1], newest)
+	# End def
+# End class
+
+if __name__ == "__main__":
+	unittest.main()
+# End if
@@ -0,0 +1,126 @@
+# Copyright 2020 - Custom License - https://github.com/Tim-Dusek/DiscordStockBot/blob/master/LICENSE
+# Maintained by Tim-Dusek and cdchris12
+
+###
+# Import statements
+###
+
+import asyncio, unittest
+from unittest import mock
+import pandas as pd
+import data_access, market_calendar, price_watch, scheduler
+
+###
+# Price watch
+###
+
+class FakeMessage:
+	async def edit(self, content: str) -> None:
+		self.content = content
+	# End def
+# End class
+
+class FakeChannel:
+	def __init__(self, channel_id: int):
+		self.id = channel_id
+	# End def
+
+	async def send(self, content: str) -> FakeMessage:
+		return FakeMessage()
+	# End def
+# End class
+
+class WatchListTest(unittest.IsolatedAsyncioTestCase):
+	def setUp(self):
+		self.watcher = price_watch.PriceWatch(max_per_channel=1)
+		self.lookups = 0
+
+		# A slow upstream, so concurrent commands are all waiting on it at once
+		async def lookup(symbols):
+			self.lookups += 1
+			await asyncio.sleep(0.05)
+			return {symbol: 1.0 for symbol in symbols}
+		# End def
+
+		self.watcher.lookup = lookup
+	# End def
+
+	async def test_concurrent_adds_of_one_symbol_watch_it_once(self):
+		channel = FakeChannel(1)
+		await asyncio.gather(*(self.watcher.add(channel, price_watch.STOCK, "aapl") for i in range(3)))
+
+		self.assertEqual(self.watcher.channels[1].symbols, [(price_watch.STOCK, "AAPL")])
+		self.assertEqual(self.lookups, 1)
+	# End def
+
+	async def test_concurrent_adds_respect_the_limit(self):
+		channel = FakeChannel(1)
+		results = await asyncio.gather(
+			self.watcher.add(channel, price_watch.STOCK, "AAPL"),
+			self.watcher.add(channel, price_watch.STOCK, "MSFT"),
+			return_exceptions=True
+		)
+
+		self.assertEqual(len(self.watcher.channels[1].symbols), 1)
+		self.assertIsInstance(results[1], ValueError)
+	# End def
+# End class
+
+class ScheduleTest(unittest.IsolatedAsyncioTestCase):
+	async def test_ticks_are_scheduled_only_while_watching(self):
+		schedule = scheduler.Scheduler("test")
+		watcher = price_watch.PriceWatch()
+		watcher.prices[(price_watch.STOCK, "AAPL")] = 1.0
+		alert_symbols = set()
+		watcher.sources.append(lambda: alert_symbols)
+		watcher.run_on(schedule, 15)
+		channel = FakeChannel(1)
+
+		self.assertFalse(schedule.has("price_watch"))
+		await watcher.add(channel, price_watch.STOCK, "AAPL")
+		self.assertTrue(schedule.has("price_watch"))
+
+		alert_symbols.add((price_watch.CRYPTO, "BTC"))
+		await watcher.remove(channel)
+		self.assertTrue(schedule.has("price_watch"))
+
+		alert_symbols.clear()
+		watcher.changed()
+		self.assertFalse(schedule.has("price_watch"))
+	# End def
+# End class
+
+###
+# Last prices
+###
+
+class LastPricesTest(unittest.IsolatedAsyncioTestCase):
+	def setUp(self):
+		data_access.last_price_cache.clear()
+		self.downloads = 0
+	# End def
+
+	def fake_download(self, companies, interval, **kwargs) -> dict:
+		self.downloads += 1
+		return {company: pd.DataFrame({"Close": [1.0, float(self.downloads)]}) for company in companies}
+	# End def
+
+	async def test_prices_are_no_older_than_max_age(self):
+		with mock.patch.object(data_access, "_download", self.fake_download), \
+			mock.patch.object(market_calendar, "is_open", lambda now, prepost=False: True):
+			first = await data_access.get_last_prices(["aapl", "MSFT"], max_age=0.1)
+			again = await data_access.get_last_prices(["AAPL"], max_age=0.1)
+			await asyncio.sleep(0.15)
+			later = await data_access.get_last_prices(["AAPL"], max_age=0.1)
+		# End with
+
+		self.assertEqual(first, {"AAPL": 1.0, "MSFT": 1.0})
+		self.assertEqual(again, {"AAPL": 1.0})
+		self.assertEqual(later, {"AAPL": 2.0})
+		self.assertEqual(self.downloads, 2)
+	# End def
+# End class
+
+if __name__ == "__main__":
+	unittest.main()
+# End if
@@ -0,0 +1,90 @@
+# Copyright 2020 - Custom License - https://github.com/Tim-Dusek/DiscordStockBot/blob/master/LICENSE
+# Maintained by Tim-Dusek and cdchris12
+
+###
+# Import statements
+###
+
+import time, asyncio, unittest
+import scheduler
+
+###
+# Scheduler
+###
+
+class SchedulerTest(unittest.IsolatedAsyncioTestCase):
+	async def test_stalled_loop_runs_missed_job_once(self):
+		runs = []
+
+		async def job(when: float) -> None:
+			runs.append(when)
+		# End def
+
+		schedule = scheduler.Scheduler("test")
+		schedule.add("job", scheduler.every(0.1), job)
+		schedule.start()
+		await asyncio.sleep(0.25)
+
+		# Block the event loop for ten intervals
+		time.sleep(1.0)
+		before = len(runs)
+		await asyncio.sleep(0.25)
+		schedule.task.cancel()
+
+		# One catch up run plus the two or three due since, not the ten it missed as well
+		self.assertLessEqual(len(runs) - before, 4)
+	# End def
+
+	async def test_slow_job_does_not_hold_up_others(self):
+		fast_runs = []
+
+		async def slow(when: float) -> None:
+			await asyncio.sleep(10)
+		# End def
+
+		async def fast(when: float) -> None:
+			fast_runs.append(when)
+		# End def
+
+		schedule = scheduler.Scheduler("test")
+		schedule.add("slow", scheduler.every(0.05), slow)
+		schedule.add("fast", scheduler.every(0.1), fast)
+		schedule.start()
+		await asyncio.sleep(0.45)
+		schedule.task.cancel()
+
+		for task in schedule.running:
+			task.cancel()
+		# End for
+
+		self.assertGreaterEqual(len(fast_runs), 3)
+	# End def
+
+	async def test_removed_job_stops_running(self):
+		runs = []
+
+		async def job(when: float) -> None:
+			runs.append(when)
+		# End def
+
+		schedule = scheduler.Scheduler("test")
+		schedule.add("job", scheduler.every(0.05), job)
+		self.assertTrue(schedule.has("job"))
+		schedule.start()
+		await asyncio.sleep(0.12)
+
+		self.assertTrue(schedule.remove("job"))
+		self.assertFalse(schedule.has("job"))
+		self.assertFalse(schedule.remove("job"))
+		before = len(runs)
+		await asyncio.sleep(0.15)
+		schedule.task.cancel()
+
+		self.assertGreater(before, 0)
+		self.assertEqual(len(runs), before)
+	# End def
+# End class
+
+if __name__ == "__main__":
+	unittest.main()
+# End if
@@ -0,0 +1,82 @@
+# Copyright 2020 - Custom License - https://github.com/Tim-Dusek/DiscordStockBot/blob/master/LICENSE
+# Maintained by Tim-Dusek and cdchris12
+
+###
+# Import statements
+###
+
+import asyncio, unittest
+import singleflight
+
+###
+# Single flight
+###
+
+class SingleFlightTest(unittest.IsolatedAsyncioTestCase):
+	def setUp(self):
+		self.flight = singleflight.SingleFlight("test")
+		self.calls = []
+	# End def
+
+	async def fetch(self, key: str) -> str:
+		self.calls.append(key)
+		await asyncio.sleep(0.05)
+		return key.upper()
+	# End def
+
+	async def fail(self, key: str) -> str:
+		self.calls.append(key)
+		await asyncio.sleep(0.05)
+		raise ValueError(f"no data for {key}")
+	# End def
+
+	async def test_concurrent_callers_share_one_call(self):
+		results = await asyncio.gather(*(self.flight.do("aapl", self.fetch, "aapl") for i in range(5)))
+
+		self.assertEqual(results, ["AAPL"] * 5)
+		self.assertEqual(self.calls, ["aapl"])
+		self.assertEqual(self.flight.stats(), {"in_flight": 0, "started": 1, "joined": 4})
+	# End def
+
+	async def test_different_keys_run_separately(self):
+		results = await asyncio.gather(self.flight.do("a", self.fetch, "a"), self.flight.do("b", self.fetch, "b"))
+
+		self.assertEqual(results, ["A", "B"])
+		self.assertEqual(sorted(self.calls), ["a", "b"])
+	# End def
+
+	async def test_results_are_not_reused_after_the_flight(self):
+		await self.flight.do("a", self.fetch, "a")
+		await self.flight.do("a", self.fetch, "a")
+
+		self.assertEqual(self.calls, ["a", "a"])
+	# End def
+
+	async def test_errors_reach_every_caller(self):
+		results = await asyncio.gather(*(self.flight.do("x", self.fail, "x") for i in range(3)), return_exceptions=True)
+
+		self.assertEqual([type(result) for result in results], [ValueError] * 3)
+		self.assertEqual(self.calls, ["x"])
+
+		# The failure isn't remembered, so the next call tries again
+		with self.assertRaises(ValueError):
+			await self.flight.do("x", self.fail, "x")
+		# End with
+
+		self.assertEqual(self.calls, ["x", "x"])
+	# End def
+
+	async def test_one_caller_cancelling_leaves_the_others(self):
+		first = asyncio.ensure_future(self.flight.do("a", self.fetch, "a"))
+		second = asyncio.ensure_future(self.flight.do("a", self.fetch, "a"))
+		await asyncio.sleep(0.01)
+		first.cancel()
+
+		self.assertEqual(await second, "A")
+		self.assertTrue(first.cancelled())
+	# End def
+# End class
+
+if __name__ == "__main__":
+	unittest.main()
+# End if